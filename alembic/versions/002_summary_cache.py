@@ -0,0 +1,29 @@
+"""Add summary_cache table for map-reduce document summaries
+
+Revision ID: 002_summary_cache
+Revises: 001_initial_setup
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_summary_cache'
+down_revision = '001_initial_setup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('summary_cache',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('summary_cache')
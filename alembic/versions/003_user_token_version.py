@@ -0,0 +1,25 @@
+"""Add token_version to users for token revocation and principal cache
+
+Revision ID: 003_user_token_version
+Revises: 002_summary_cache
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_user_token_version'
+down_revision = '002_summary_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users',
+        sa.Column('token_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
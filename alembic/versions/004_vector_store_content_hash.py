@@ -0,0 +1,33 @@
+"""Add content_hash to vector_store for incremental re-indexing
+
+Revision ID: 004_vector_store_content_hash
+Revises: 003_user_token_version
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_vector_store_content_hash'
+down_revision = '003_user_token_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('vector_store',
+        sa.Column('content_hash', sa.String(length=64), nullable=True)
+    )
+    # Mesmo hash de chunk_content_hash (SHA-256 hex do texto em UTF-8)
+    op.execute(
+        "UPDATE vector_store SET content_hash = encode(sha256(convert_to(chunk_text, 'UTF8')), 'hex')"
+    )
+    op.create_index(
+        'ix_vector_store_document_id_content_hash', 'vector_store', ['document_id', 'content_hash'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vector_store_document_id_content_hash', table_name='vector_store')
+    op.drop_column('vector_store', 'content_hash')
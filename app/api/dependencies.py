@@ -1,21 +1,26 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 from jose import JWTError
-from app.db.database import get_db
+from app.db.database import get_async_db, AnySession
+from app.db.replicas import open_read_session
 from app.core.security import decode_access_token
-from app.repositories.user_repository import UserRepository
+from app.repositories.user_repository import AsyncUserRepository
+from app.core.principal_cache import principal_cache
+from app.core.rate_limit import api_rate_limiter
 from app.models.user import User
-from typing import Optional
+from typing import AsyncGenerator, Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_async_db)
 ) -> User:
     """
     Dependency para obter usuário autenticado
+
+    Consulta primeiro o cache de usuários por (user_id, versão do token);
+    o banco só é acessado em cache miss.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,18 +36,31 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
 
-    user_repo = UserRepository(db)
-    user = user_repo.get_by_username(username)
+    user_id = payload.get("user_id")
+    token_version = payload.get("ver", 0)
+
+    if user_id is not None:
+        cached_user = await principal_cache.get(user_id, token_version)
+        if cached_user is not None and cached_user.username == username:
+            return cached_user
+
+    user_repo = AsyncUserRepository(db)
+    user = await user_repo.get_by_username(username)
 
     if user is None:
         raise credentials_exception
 
+    # Token emitido antes de troca de senha/desativação (revogado)
+    if (user.token_version or 0) != token_version:
+        raise credentials_exception
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Usuário inativo"
         )
 
+    await principal_cache.set(user)
     return user
 
 async def get_current_active_superuser(
@@ -55,3 +73,27 @@ async def get_current_active_superuser(
             detail="Sem permissão suficiente"
         )
     return current_user
+
+async def get_read_db(
+    current_user: User = Depends(get_current_user)
+) -> AsyncGenerator[AnySession, None]:
+    """
+    Dependency para consultas somente leitura (busca, listagem, chat)
+
+    Vai a uma réplica de leitura quando configurada, exceto logo após uma
+    escrita do próprio usuário (read-your-writes).
+    """
+    async with open_read_session(current_user.id) as db:
+        yield db
+
+def rate_limited(operation: str):
+    """
+    Dependency que aplica o rate limit do usuário para a operação
+
+    Uso: `dependencies=[Depends(rate_limited("search"))]` na rota. Excesso
+    retorna 429 com Retry-After.
+    """
+    async def check_rate_limit(current_user: User = Depends(get_current_user)) -> None:
+        await api_rate_limiter.check(current_user, operation)
+
+    return check_rate_limit
@@ -0,0 +1 @@
+from app.api.v1.endpoints.admin import router
@@ -0,0 +1,75 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from app.api.dependencies import get_current_active_superuser
+from app.core.config import settings
+from app.core.profiler import profiling
+from app.models.user import User
+from app.schemas.profiling import ProfilingEnable, ProfilingStatus, ProfileReportList
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+@router.get("/profiling", response_model=ProfilingStatus)
+async def profiling_status(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Estado do profiling sob demanda, comum a todos os workers (somente admin)"""
+    return profiling.status()
+
+@router.post("/profiling", response_model=ProfilingStatus)
+async def enable_profiling(
+    data: ProfilingEnable,
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Ativa o profiling sob demanda (somente admin)
+
+    Gera uma chave nova: requisições com o header `X-Profile: <header_key>`
+    são amostradas e salvas como flame graph. Com `sample_every` > 0,
+    também amostra 1 a cada N requisições. Expira após `ttl_minutes`.
+    A ativação vale para todos os workers (em até 1 s).
+
+    - **sample_every**: Amostrar 1 a cada N requisições (0 = só via header)
+    - **ttl_minutes**: Minutos até desativar automaticamente
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Profiling desabilitado na configuração (PROFILING_ENABLED)"
+        )
+    return profiling.enable(data.sample_every, data.ttl_minutes)
+
+@router.delete("/profiling", response_model=ProfilingStatus)
+async def disable_profiling(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Desativa o profiling sob demanda (somente admin)"""
+    return profiling.disable()
+
+@router.get("/profiling/reports", response_model=ProfileReportList)
+async def list_profile_reports(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Lista relatórios de profiling salvos, do mais recente ao mais antigo (somente admin)"""
+    reports = await asyncio.get_running_loop().run_in_executor(None, profiling.store.list)
+    return {"reports": reports, "total": len(reports)}
+
+@router.get("/profiling/reports/{name}", response_class=PlainTextResponse)
+async def get_profile_report(
+    name: str,
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Relatório em pilhas colapsadas (somente admin)
+
+    Formato aceito por flamegraph.pl e speedscope.
+
+    - **name**: Nome do relatório (header `X-Profile-Report` da requisição)
+    """
+    collapsed = await asyncio.get_running_loop().run_in_executor(None, profiling.store.read, name)
+    if collapsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Relatório não encontrado"
+        )
+    return PlainTextResponse(collapsed)
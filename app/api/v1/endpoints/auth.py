@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import AnySession, get_async_db
 from app.schemas.auth import Token, LoginRequest
-from app.schemas.user import UserCreate, UserResponse
+from app.schemas.user import UserCreate, UserResponse, PasswordChange, UserActiveUpdate
 from app.services.auth_service import AuthService
-from app.core.exceptions import AuthenticationError
-from app.api.dependencies import get_current_user
+from app.core.exceptions import AuthenticationError, NotFoundError
+from app.core.principal_cache import principal_cache
+from app.core.rate_limit import check_login_rate
+from app.api.dependencies import get_current_user, get_current_active_superuser
 from app.models.user import User
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -14,7 +15,8 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AnySession = Depends(get_async_db)
 ):
     """
     Registra novo usuário
@@ -23,9 +25,11 @@ async def register(
     - **username**: Nome de usuário único
     - **password**: Senha (mínimo 8 caracteres)
     """
+    await check_login_rate(None, request.client.host if request.client else None)
+
     try:
         auth_service = AuthService(db)
-        user = auth_service.register_user(user_data)
+        user = await auth_service.register_user(user_data)
         return user
     except AuthenticationError as e:
         raise HTTPException(
@@ -35,18 +39,23 @@ async def register(
 
 @router.post("/login", response_model=Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_async_db)
 ):
     """
     Login e geração de token JWT
 
     - **username**: Nome de usuário
     - **password**: Senha
+
+    Tentativas são limitadas por username e por IP (429 com `Retry-After`).
     """
+    await check_login_rate(form_data.username, request.client.host if request.client else None)
+
     try:
         auth_service = AuthService(db)
-        user = auth_service.authenticate_user(form_data.username, form_data.password)
+        user = await auth_service.authenticate_user(form_data.username, form_data.password)
         token = auth_service.create_token(user)
 
         return {"access_token": token, "token_type": "bearer"}
@@ -67,3 +76,60 @@ async def get_me(
     Requer autenticação via token JWT
     """
     return current_user
+
+@router.post("/change-password", response_model=UserResponse)
+async def change_password(
+    password_data: PasswordChange,
+    current_user: User = Depends(get_current_user),
+    db: AnySession = Depends(get_async_db)
+):
+    """
+    Troca a senha do usuário autenticado
+
+    Todos os tokens emitidos anteriormente deixam de ser aceitos;
+    é necessário fazer login novamente.
+    """
+    try:
+        auth_service = AuthService(db)
+        return await auth_service.change_password(
+            current_user.id,
+            password_data.current_password,
+            password_data.new_password
+        )
+    except AuthenticationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.patch("/users/{user_id}/active", response_model=UserResponse)
+async def set_user_active(
+    user_id: int,
+    active_data: UserActiveUpdate,
+    current_user: User = Depends(get_current_active_superuser),
+    db: AnySession = Depends(get_async_db)
+):
+    """
+    Ativa ou desativa usuário (somente admin)
+
+    Os tokens do usuário são revogados e o cache de autenticação invalidado.
+    """
+    try:
+        auth_service = AuthService(db)
+        return await auth_service.set_active(user_id, active_data.is_active)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+@router.get("/cache/stats")
+async def principal_cache_stats(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Métricas do cache de usuários autenticados (somente admin)
+
+    `db_queries_saved` conta as consultas ao banco evitadas pelo cache.
+    """
+    return principal_cache.stats()
@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.api.dependencies import get_current_user
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.db.database import get_async_db, AnySession
+from app.api.dependencies import get_current_user, get_current_active_superuser, get_read_db, rate_limited
 from app.models.user import User
 from app.schemas.search import ChatQuery, ChatResponse
-from app.services.llm_service import LLMService
-from app.services.vector_service import VectorService
-from app.repositories.vector_repository import VectorRepository
+from app.schemas.conversation import (
+    ConversationCreate,
+    ConversationMessage,
+    ConversationResponse,
+    ConversationStats,
+    ConversationTurn,
+)
+from app.services.chat_service import ChatService
+from app.services.conversation_service import ConversationService
+from app.services.llm_router import llm_router
+from app.core.exceptions import NotFoundError
+from app.core.responses import FastJSONResponse
+from app.utils.result_fields import ResultFieldSelector
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
-@router.post("/", response_model=ChatResponse)
+@router.post("/", response_model=ChatResponse, dependencies=[Depends(rate_limited("chat"))])
 async def chat_with_documents(
     chat_query: ChatQuery,
+    include_text: bool = Query(True, description="Incluir o texto dos trechos de contexto"),
+    snippet_chars: Optional[int] = Query(None, ge=0, le=20000, description="Trunca o texto do contexto em N caracteres (0 = completo)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Chat com LLM usando contexto dos documentos
@@ -26,36 +38,16 @@ async def chat_with_documents(
     - **document_ids**: (Opcional) Filtrar documentos
     - **use_context**: Se deve buscar contexto nos documentos
     - **max_context_chunks**: Quantos chunks usar como contexto
+    - **include_text** (query): `false` omite o texto dos trechos de contexto
+    - **snippet_chars** (query): (Opcional) Tamanho máximo do texto do contexto
+
+    Requisições idênticas em andamento são coalescidas e as gerações no LLM
+    têm limite de concorrência; em sobrecarga retorna 503 com `Retry-After`.
     """
+    selector = ResultFieldSelector(include_text=include_text, snippet_chars=snippet_chars)
     try:
-        context_chunks = []
-
-        # 1. Buscar contexto se necessário
-        if chat_query.use_context:
-            vector_service = VectorService()
-            vector_repo = VectorRepository(db)
-
-            context_chunks = vector_service.search(
-                query=chat_query.query,
-                vector_repo=vector_repo,
-                top_k=chat_query.max_context_chunks,
-                document_ids=chat_query.document_ids,
-                user_id=current_user.id
-            )
-
-        # 2. Gerar resposta com LLM
-        llm_service = LLMService()
-        answer = await llm_service.generate_answer(
-            query=chat_query.query,
-            context_chunks=context_chunks
-        )
-
-        return ChatResponse(
-            query=chat_query.query,
-            answer=answer,
-            context_used=context_chunks,
-            llm_provider=llm_service.provider
-        )
+        chat_service = ChatService(db)
+        response = await chat_service.chat(chat_query, current_user.id)
 
     except NotImplementedError as e:
         raise HTTPException(
@@ -66,3 +58,130 @@ async def chat_with_documents(
                 "e implemente o método correspondente em llm_service.py"
             )
         )
+
+    # A resposta pode ser compartilhada entre requisições coalescidas: monta
+    # um dict novo em vez de alterar o objeto
+    content = response.model_dump(exclude={"context_used"})
+    content["context_used"] = selector.serialize(response.context_used)
+    return FastJSONResponse(content)
+
+@router.get("/backends")
+async def llm_backends_status(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Estado dos backends de LLM do worker (somente admin)
+
+    Para cada backend: estado do circuit breaker, taxa de erro e
+    latências p50/p95 na janela deslizante.
+    """
+    return {
+        "hedge_enabled": llm_router.hedge_enabled,
+        "backends": llm_router.status()
+    }
+
+@router.post("/sessions", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
+async def create_conversation(
+    data: ConversationCreate,
+    current_user: User = Depends(get_current_user),
+    db: AnySession = Depends(get_async_db)
+):
+    """
+    Cria sessão de conversa multi-turno
+
+    O histórico, os trechos já recuperados e o estado de contexto do LLM
+    ficam no servidor; cada turno envia apenas a nova pergunta.
+
+    - **document_ids**: (Opcional) Filtrar documentos em todos os turnos
+    - **use_context**: Se deve buscar contexto nos documentos
+    - **max_context_chunks**: Quantos chunks buscar por turno
+    """
+    conversation_service = ConversationService(db)
+    return conversation_service.create_session(data, current_user.id)
+
+@router.get("/sessions/stats", response_model=ConversationStats)
+async def conversation_stats(
+    current_user: User = Depends(get_current_active_superuser),
+    db: AnySession = Depends(get_async_db)
+):
+    """
+    Métricas das sessões de conversa do worker (somente admin)
+
+    Inclui tokens de prefill por turno para acompanhar o ganho de
+    reaproveitar o contexto do LLM.
+    """
+    conversation_service = ConversationService(db)
+    return conversation_service.stats()
+
+@router.get("/sessions/{session_id}", response_model=ConversationResponse)
+async def get_conversation(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AnySession = Depends(get_async_db)
+):
+    """
+    Retorna sessão de conversa com todos os turnos
+
+    - **session_id**: ID da sessão
+    """
+    try:
+        conversation_service = ConversationService(db)
+        return conversation_service.get_session(session_id, current_user.id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+@router.post(
+    "/sessions/{session_id}/messages",
+    response_model=ConversationTurn,
+    dependencies=[Depends(rate_limited("chat"))]
+)
+async def send_conversation_message(
+    session_id: str,
+    message: ConversationMessage,
+    current_user: User = Depends(get_current_user),
+    db: AnySession = Depends(get_async_db)
+):
+    """
+    Envia nova pergunta para a sessão de conversa
+
+    - **session_id**: ID da sessão
+    - **query**: Pergunta para o LLM
+    """
+    try:
+        conversation_service = ConversationService(db)
+        return await conversation_service.send_message(
+            session_id, current_user.id, message.query
+        )
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="🔧 LLM não configurado. Consulte llm_service.py"
+        )
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_conversation(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AnySession = Depends(get_async_db)
+):
+    """
+    Encerra sessão de conversa
+
+    - **session_id**: ID da sessão
+    """
+    try:
+        conversation_service = ConversationService(db)
+        conversation_service.delete_session(session_id, current_user.id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
@@ -1,17 +1,30 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
-from app.api.dependencies import get_current_user
+from typing import List, Optional
+import json
+from app.db.database import get_db, open_any_session, SessionLocal, AsyncSessionLocal, AnySession
+from app.api.dependencies import get_current_user, get_read_db, rate_limited
+from app.db.replicas import read_your_writes
 from app.models.user import User
-from app.schemas.document import DocumentResponse, DocumentDetail
+from app.schemas.document import (
+    DocumentResponse, DocumentDetail, DocumentSummary, DocumentVersionResponse, SummarizeRequest
+)
 from app.services.document_service import DocumentService
-from app.core.exceptions import FileUploadError, NotFoundError
-from app.repositories.vector_repository import VectorRepository
+from app.services.summary_service import SummaryService
+from app.core.exceptions import ConflictError, DocumentAIException, FileUploadError, NotFoundError
+from app.core.logging import logger
+from app.repositories.vector_repository import AsyncVectorRepository
+from app.repositories.document_repository import AsyncDocumentRepository
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
-@router.post("/upload", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/upload",
+    response_model=DocumentResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limited("upload"))]
+)
 async def upload_document(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
@@ -31,6 +44,7 @@ async def upload_document(
     try:
         doc_service = DocumentService(db)
         document = await doc_service.upload_document(file, current_user.id)
+        await read_your_writes.record_write(current_user.id)
         return document
     except FileUploadError as e:
         raise HTTPException(
@@ -43,7 +57,7 @@ async def list_documents(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Lista documentos do usuário autenticado
@@ -51,49 +65,92 @@ async def list_documents(
     - **skip**: Número de documentos para pular (paginação)
     - **limit**: Número máximo de documentos a retornar
     """
-    doc_service = DocumentService(db)
-    return doc_service.list_documents(current_user.id, skip, limit)
+    doc_repo = AsyncDocumentRepository(db)
+    return await doc_repo.get_by_owner(current_user.id, skip, limit)
 
 @router.get("/{document_id}", response_model=DocumentDetail)
 async def get_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Busca documento específico com detalhes completos
 
     - **document_id**: ID do documento
     """
+    doc_repo = AsyncDocumentRepository(db)
+    document = await doc_repo.get_by_id(document_id)
+
+    if not document or document.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Documento não encontrado"
+        )
+
+    # Adicionar contagem de chunks
+    vector_repo = AsyncVectorRepository(db)
+    chunk_count = await vector_repo.count_by_document(document_id)
+
+    # Converter para DocumentDetail
+    doc_dict = {
+        "id": document.id,
+        "filename": document.filename,
+        "original_filename": document.original_filename,
+        "file_type": document.file_type,
+        "file_size": document.file_size,
+        "page_count": document.page_count,
+        "word_count": document.word_count,
+        "created_at": document.created_at,
+        "owner_id": document.owner_id,
+        "content_text": document.content_text[:500] + "...",  # Truncar
+        "chunk_count": chunk_count
+    }
+
+    return doc_dict
+
+@router.put(
+    "/{document_id}",
+    response_model=DocumentVersionResponse,
+    dependencies=[Depends(rate_limited("upload"))]
+)
+async def update_document(
+    document_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Envia nova versão de um documento (PDF ou DOCX)
+
+    O arquivo é processado como no upload, mas só os chunks que mudaram são
+    vetorizados: chunks com o mesmo conteúdo (hash) são mantidos, os que
+    saíram são removidos e a ordem é renumerada. A resposta traz as
+    estatísticas do diff.
+
+    - **document_id**: ID do documento
+    - **file**: Arquivo PDF ou DOCX (máximo 10MB)
+    """
     try:
         doc_service = DocumentService(db)
-        document = doc_service.get_document(document_id, current_user.id)
-
-        # Adicionar contagem de chunks
-        vector_repo = VectorRepository(db)
-        chunk_count = vector_repo.count_by_document(document_id)
-
-        # Converter para DocumentDetail
-        doc_dict = {
-            "id": document.id,
-            "filename": document.filename,
-            "original_filename": document.original_filename,
-            "file_type": document.file_type,
-            "file_size": document.file_size,
-            "page_count": document.page_count,
-            "word_count": document.word_count,
-            "created_at": document.created_at,
-            "owner_id": document.owner_id,
-            "content_text": document.content_text[:500] + "...",  # Truncar
-            "chunk_count": chunk_count
-        }
-
-        return doc_dict
+        document, stats = await doc_service.update_document(document_id, file, current_user.id)
+        await read_your_writes.record_write(current_user.id)
+        return {**DocumentResponse.model_validate(document).model_dump(), "updated_at": document.updated_at, "diff": stats}
     except NotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+    except ConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except FileUploadError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(
@@ -108,9 +165,79 @@ async def delete_document(
     """
     try:
         doc_service = DocumentService(db)
-        doc_service.delete_document(document_id, current_user.id)
+        await doc_service.delete_document(document_id, current_user.id)
+        await read_your_writes.record_write(current_user.id)
     except NotFoundError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+
+@router.post(
+    "/{document_id}/summarize",
+    response_model=DocumentSummary,
+    dependencies=[Depends(rate_limited("summarize"))]
+)
+async def summarize_document(
+    document_id: int,
+    options: Optional[SummarizeRequest] = None,
+    stream: bool = True,
+    current_user: User = Depends(get_current_user),
+    db: AnySession = Depends(get_read_db)
+):
+    """
+    Resume o documento inteiro (map-reduce)
+
+    Os chunks são resumidos em grupos, em paralelo, e os resumos parciais
+    são combinados recursivamente até um resumo final. Resumos
+    intermediários ficam em cache pelo hash do conteúdo.
+
+    - **document_id**: ID do documento
+    - **stream**: Se true (padrão), retorna eventos de progresso em NDJSON;
+      o último evento (`done`) traz o resumo final
+    - **group_size**: (Opcional) Chunks por resumo parcial
+    - **reduce_fanout**: (Opcional) Resumos parciais combinados por etapa
+    """
+    options = options or SummarizeRequest()
+
+    try:
+        summary_service = SummaryService(db)
+        if summary_service.llm_service.provider != "ollama":
+            raise NotImplementedError()
+        chunks = await summary_service.load_chunks(document_id, current_user.id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="🔧 Resumo disponível apenas com backends Ollama (OLLAMA_BASE_URL ou LLM_BACKENDS)"
+        )
+
+    if not stream:
+        # O cache de resumos é gravado no primário: a sessão da requisição
+        # pode ser de uma réplica
+        async with open_any_session(SessionLocal, AsyncSessionLocal) as summary_db:
+            return await SummaryService(summary_db).summarize(
+                document_id, chunks, options.group_size, options.reduce_fanout
+            )
+
+    async def event_stream():
+        # A sessão da requisição é fechada antes do streaming (e pode ser de
+        # uma réplica); o gerador usa a sua, no primário
+        try:
+            async with open_any_session(SessionLocal, AsyncSessionLocal) as stream_db:
+                events = SummaryService(stream_db).summarize_stream(
+                    document_id, chunks, options.group_size, options.reduce_fanout
+                )
+                async for event in events:
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+        except DocumentAIException as e:
+            yield json.dumps({"event": "error", "error": e.message, "type": type(e).__name__}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Erro no resumo do documento {document_id}: {e}")
+            yield json.dumps({"event": "error", "error": "Erro interno do servidor", "type": "InternalServerError"}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
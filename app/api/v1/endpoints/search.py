@@ -1,19 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.api.dependencies import get_current_user
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from app.db.database import AnySession
+from app.api.dependencies import get_current_user, get_read_db, rate_limited
+from app.core.metrics import stage_timer
+from app.core.responses import FastJSONResponse
 from app.models.user import User
 from app.schemas.search import SearchQuery, SearchResponse
 from app.services.vector_service import VectorService
-from app.repositories.vector_repository import VectorRepository
+from app.repositories.vector_repository import AsyncVectorRepository
+from app.utils.result_fields import ResultFieldSelector
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
-@router.post("/", response_model=SearchResponse)
+@router.post("/", response_model=SearchResponse, dependencies=[Depends(rate_limited("search"))])
 async def semantic_search(
     search_query: SearchQuery,
+    fields: Optional[str] = Query(None, description="Campos de cada resultado, separados por vírgula"),
+    include_text: bool = Query(True, description="Incluir o texto dos trechos"),
+    snippet_chars: Optional[int] = Query(None, ge=0, le=20000, description="Trunca o texto em N caracteres (0 = completo)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AnySession = Depends(get_read_db)
 ):
     """
     Busca semântica nos documentos
@@ -24,11 +30,15 @@ async def semantic_search(
     - **query**: Texto da pergunta/busca
     - **top_k**: Número de resultados a retornar (1-50)
     - **document_ids**: (Opcional) Filtrar por documentos específicos
+    - **fields** (query): (Opcional) Ex: `document_id,similarity_score`
+    - **include_text** (query): `false` omite `chunk_text`
+    - **snippet_chars** (query): (Opcional) Tamanho máximo de `chunk_text`
     """
+    selector = ResultFieldSelector(fields, include_text, snippet_chars)
     vector_service = VectorService()
-    vector_repo = VectorRepository(db)
+    vector_repo = AsyncVectorRepository(db)
 
-    results = vector_service.search(
+    results = await vector_service.asearch(
         query=search_query.query,
         vector_repo=vector_repo,
         top_k=search_query.top_k,
@@ -36,8 +46,9 @@ async def semantic_search(
         user_id=current_user.id
     )
 
-    return SearchResponse(
-        query=search_query.query,
-        results=results,
-        total_results=len(results)
-    )
+    with stage_timer("search", "serialization"):
+        return FastJSONResponse({
+            "query": search_query.query,
+            "results": selector.serialize(results),
+            "total_results": len(results)
+        })
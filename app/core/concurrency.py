@@ -0,0 +1,107 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.core.exceptions import ServiceOverloadedError
+from app.core.logging import logger
+
+
+class SingleFlight:
+    """
+    Coalescência de chamadas idênticas em andamento (single-flight)
+
+    Responsabilidades:
+    - Executar uma única vez a computação de chaves iguais em andamento
+    - Entregar o mesmo resultado (ou exceção) para todos os chamadores
+    - Liberar a chave assim que a computação termina
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Executa fn() ou aguarda a execução já em andamento para a mesma chave
+
+        A task compartilhada é protegida com shield: o cancelamento de um
+        chamador (ex: cliente desconectou) não cancela os demais.
+        """
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            logger.debug(f"Single-flight: requisição coalescida para {key!r}")
+
+        return await asyncio.shield(task)
+
+    @property
+    def in_flight(self) -> int:
+        """Número de computações em andamento"""
+        return len(self._in_flight)
+
+
+class AdmissionController:
+    """
+    Controle de admissão com limite de concorrência e fila limitada
+
+    Responsabilidades:
+    - Limitar operações simultâneas (ex: gerações no LLM)
+    - Limitar o tamanho da fila de espera
+    - Falhar rápido com ServiceOverloadedError quando saturado
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+        self._active = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Reserva uma vaga; lança ServiceOverloadedError se não houver"""
+        if self._active + self._waiting >= self.max_concurrent + self.max_queue:
+            logger.warning(
+                "Admissão recusada: fila cheia",
+                extra={"active": self._active, "waiting": self._waiting}
+            )
+            raise ServiceOverloadedError(retry_after=self.retry_after)
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Admissão recusada: tempo de espera na fila excedido",
+                extra={"active": self._active, "waiting": self._waiting}
+            )
+            raise ServiceOverloadedError(retry_after=self.retry_after)
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    @property
+    def active(self) -> int:
+        """Operações em execução"""
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """Operações aguardando vaga"""
+        return self._waiting
@@ -1,16 +1,76 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List
+from typing import Dict, List, Tuple
+
+def to_async_database_url(url: str) -> str:
+    """URL do Postgres com o driver asyncpg"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_ASYNC_ENABLED: bool = False  # Usar AsyncSession (asyncpg) nos repositórios do caminho de leitura
+
+    # Pool de conexões (valores por engine e por worker)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Recicla conexões antigas (-1 desativa)
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # Espera máxima por conexão livre
+    DB_POOL_PRE_PING: bool = True  # SELECT 1 a cada checkout (uma ida extra ao servidor)
+    DB_PGBOUNCER_MODE: bool = False  # PgBouncer em transaction pooling: sem prepared statements
+    DB_MAX_CONNECTIONS: int = 100  # max_connections do Postgres/PgBouncer (validação no startup)
+
+    @property
+    def async_database_url(self) -> str:
+        """DATABASE_URL com o driver asyncpg"""
+        return to_async_database_url(self.DATABASE_URL)
+
+    # Réplicas de leitura (busca, listagem e chat); escritas vão sempre ao primário
+    DB_READ_REPLICA_URLS: str = ""  # URLs separadas por vírgula
+    DB_REPLICA_HEALTH_CHECK_INTERVAL_SECONDS: float = 10.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30.0  # Réplica mais atrasada que isso sai do rodízio
+    DB_READ_YOUR_WRITES_SECONDS: float = 30.0  # Após escrever, o usuário lê do primário por este tempo
+    DB_READ_YOUR_WRITES_REDIS_URL: str | None = None  # Compartilhar entre workers (requer redis)
+
+    @property
+    def read_replica_urls_list(self) -> List[str]:
+        """DB_READ_REPLICA_URLS como lista"""
+        return [url.strip() for url in self.DB_READ_REPLICA_URLS.split(",") if url.strip()]
 
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Cache do usuário autenticado (evita consulta ao banco por requisição)
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_REDIS_URL: str | None = None  # Compartilhar entre workers (requer redis)
+
+    # Hash de senha (bcrypt)
+    BCRYPT_ROUNDS: int = 12  # Hashes com custo diferente são refeitos no próximo login
+
+    # Throttle de login/registro (token bucket)
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_PER_MINUTE: float = 5  # Por username
+    LOGIN_RATE_LIMIT_BURST: int = 5
+    LOGIN_IP_RATE_LIMIT_PER_MINUTE: float = 30  # Por IP
+    LOGIN_IP_RATE_LIMIT_BURST: int = 20
+
+    # Rate limit por usuário (token bucket) em busca, chat, upload e resumo
+    API_RATE_LIMIT_ENABLED: bool = True
+    API_RATE_LIMIT_PER_MINUTE: float = 120  # Tokens por usuário, somando todas as operações com peso
+    API_RATE_LIMIT_BURST: int = 60
+    API_RATE_LIMIT_COSTS: str = "search=1,chat=5,upload=10,summarize=10"  # Peso de cada operação
+    API_RATE_LIMIT_ENDPOINTS: str = "search=60/30,chat=12/6,upload=6/3,summarize=6/3"  # operação=por_minuto/burst
+    API_RATE_LIMIT_EXEMPT_SUPERUSERS: bool = True
+    API_RATE_LIMIT_MAX_KEYS: int = 100000  # Baldes em memória por worker (LRU)
+    API_RATE_LIMIT_REDIS_URL: str | None = None  # Compartilhar entre workers, inclusive o throttle de login (requer redis)
+
     # Application
     APP_NAME: str = "Document AI API"
     APP_VERSION: str = "1.0.0"
@@ -32,6 +92,11 @@ class Settings(BaseSettings):
     # Vector
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     VECTOR_DIMENSION: int = 384
+    CHUNKING_STRATEGY: str = "tokens"  # "tokens" (tokenizer do modelo) ou "words" (500 palavras, legado)
+    CHUNK_MAX_TOKENS: int = 0  # 0 = max_seq_length do modelo menos os tokens especiais
+    CHUNK_OVERLAP_TOKENS: int = 32
+    VECTOR_IVFFLAT_PROBES: int = 0  # Listas visitadas por busca no índice ivfflat (0 = padrão do servidor, 1)
+    VECTOR_HNSW_EF_SEARCH: int = 0  # Candidatos por busca no índice HNSW (0 = padrão do servidor, 40)
 
     # LLM Settings
     OPENAI_API_KEY: str | None = None
@@ -44,12 +109,145 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama2"
 
+    # Roteador de LLM (backends compatíveis com a API do Ollama)
+    LLM_BACKENDS: str = ""  # "nome=url,nome=url" em ordem de preferência; vazio usa OLLAMA_BASE_URL
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 120.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_HEDGE_ENABLED: bool = False  # Requisição extra no próximo backend quando o primeiro passa do p95
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 10.0  # Atraso do hedge enquanto não há amostras suficientes
+    LLM_STATS_WINDOW: int = 50  # Janela de amostras para latência e taxa de erro
+    LLM_BREAKER_MIN_REQUESTS: int = 5
+    LLM_BREAKER_ERROR_RATE: float = 0.5
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30.0
+
+    @property
+    def llm_backends_list(self) -> List[Tuple[str, str]]:
+        """
+        Retorna LLM_BACKENDS como lista de (nome, url).
+        Sem backends configurados, usa OLLAMA_BASE_URL com o nome "ollama".
+        """
+        backends = []
+        for entry in self.LLM_BACKENDS.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            name, _, url = entry.partition('=')
+            if not url:
+                name, url = f"ollama-{len(backends) + 1}", name
+            backends.append((name.strip(), url.strip().rstrip('/')))
+
+        if not backends and self.OLLAMA_BASE_URL:
+            backends.append(("ollama", self.OLLAMA_BASE_URL.rstrip('/')))
+        return backends
+
+    @property
+    def api_rate_limit_costs(self) -> Dict[str, float]:
+        """API_RATE_LIMIT_COSTS como {operação: peso}"""
+        costs = {}
+        for entry in self.API_RATE_LIMIT_COSTS.split(','):
+            name, _, cost = entry.partition('=')
+            if name.strip():
+                costs[name.strip()] = float(cost or 1)
+        return costs
+
+    @property
+    def api_rate_limit_endpoints(self) -> Dict[str, Tuple[float, float]]:
+        """API_RATE_LIMIT_ENDPOINTS como {operação: (por_minuto, burst)}"""
+        endpoints = {}
+        for entry in self.API_RATE_LIMIT_ENDPOINTS.split(','):
+            name, _, limit = entry.partition('=')
+            if not name.strip() or not limit:
+                continue
+            per_minute, _, burst = limit.partition('/')
+            endpoints[name.strip()] = (float(per_minute), float(burst or per_minute))
+        return endpoints
+
+    # Controle de concorrência do chat
+    CHAT_SINGLE_FLIGHT_ENABLED: bool = True  # Coalescer requisições idênticas em andamento
+    LLM_MAX_CONCURRENCY: int = 4  # Gerações simultâneas no LLM
+    LLM_MAX_QUEUE: int = 16  # Requisições aguardando vaga no LLM
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 10.0  # Espera máxima na fila antes de 503
+    LLM_RETRY_AFTER_SECONDS: int = 5  # Valor do header Retry-After em sobrecarga
+
+    # Resumo map-reduce de documentos
+    SUMMARY_GROUP_SIZE: int = 4  # Trechos por chamada na fase map
+    SUMMARY_REDUCE_FANOUT: int = 4  # Resumos parciais combinados por chamada na fase reduce
+    SUMMARY_MAX_CONCURRENCY: int = 2  # Chamadas simultâneas ao LLM por resumo
+
+    # Sessões de conversa (memória do worker, política LRU + TTL)
+    CHAT_SESSION_TTL_MINUTES: int = 30
+    CHAT_SESSION_MAX_SESSIONS: int = 1000
+    CHAT_SESSION_MAX_TURNS: int = 50
+
     # N8n Integration
     N8N_WEBHOOK_URL: str | None = None
 
+    # Executores dedicados para trabalho bloqueante/CPU (fora do event loop)
+    EMBEDDING_EXECUTOR_WORKERS: int = 1  # O modelo já paraleliza internamente
+    EMBEDDING_BULK_BATCH_SIZE: int = 32  # Trechos por tarefa de ingestão (consultas entram entre lotes)
+    EMBEDDING_BULK_BATCHING_ENABLED: bool = True  # Lotes da ingestão juntam trechos de vários uploads, por tamanho
+    EMBEDDING_BULK_BATCH_WAIT_MS: float = 20.0  # Espera por outros uploads antes de fechar uma rodada
+    EMBEDDING_BULK_MAX_ROUND_CHUNKS: int = 256  # Trechos por rodada, divididos entre os uploads pendentes
+    EMBEDDING_BULK_CPU_SHARE: float = 0.3  # Fração do executor "embedding" para ingestão quando há consultas
+    EMBEDDING_INTERACTIVE_LATENCY_TARGET_MS: float = 250.0  # p95 das consultas acima disso recusa uploads (0 desativa)
+    EXTRACTION_EXECUTOR_WORKERS: int = 2  # Extração de PDF/DOCX e chunking
+    HASHING_EXECUTOR_WORKERS: int = 2  # bcrypt
+    HASHING_EXECUTOR_MODE: str = "thread"  # "thread" ou "process"
+    HASHING_EXECUTOR_MAX_QUEUE: int = 32  # bcrypt pendentes antes de 503
+    DB_EXECUTOR_WORKERS: int = 8  # Queries síncronas quando DB_ASYNC_ENABLED=false
+    EXECUTOR_MAX_QUEUE: int = 64  # Tarefas aguardando por executor antes de 503
+    EXECUTOR_RETRY_AFTER_SECONDS: int = 2  # Retry-After do 503 de executor cheio ou recusando ingestão
+
+    # Servidor de produção (gunicorn com workers uvicorn, ver gunicorn.conf.py)
+    WEB_CONCURRENCY: int = 1  # Número de workers
+    WORKER_TORCH_THREADS: int = 0  # Threads torch/BLAS por worker (0 = núcleos / workers)
+    WORKER_TIMEOUT_SECONDS: int = 120
+    WORKER_GRACEFUL_TIMEOUT_SECONDS: int = 30  # Prazo para terminar requisições no reload/shutdown
+    WORKER_MAX_REQUESTS: int = 0  # Recicla o worker após N requisições (0 desativa)
+    WORKER_MAX_REQUESTS_JITTER: int = 0
+    PRELOAD_EMBEDDING_MODEL: bool = True  # Carrega o modelo no master antes do fork
+    EMBEDDING_WARMUP_ENABLED: bool = True  # Carrega o modelo em segundo plano no startup do worker
+
+    # Monitor de atraso do event loop
+    LOOP_LAG_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_SECONDS: float = 0.25
+    LOOP_LAG_WARN_MS: float = 100.0
+
+    # Métricas Prometheus em /metrics
+    METRICS_ENABLED: bool = True
+
+    # Serialização e compressão das respostas
+    SEARCH_SNIPPET_CHARS: int = 0  # Trunca o texto dos resultados (0 = texto completo)
+    RESPONSE_COMPRESSION_ENABLED: bool = True
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # Corpos menores não compensam comprimir
+    RESPONSE_COMPRESSION_GZIP_LEVEL: int = 6
+    RESPONSE_COMPRESSION_BROTLI_QUALITY: int = 4  # Requer o pacote brotli (opcional)
+
+    # Profiling sob demanda (ativado por admin em /api/v1/admin/profiling)
+    PROFILING_ENABLED: bool = True
+    PROFILING_DIR: str = "./profiles"
+    PROFILING_MAX_REPORTS: int = 50
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_SAMPLE_EVERY: int = 0
+    PROFILING_KEY_TTL_MINUTES: int = 15
+
+    # Tracing distribuído (spans de HTTP, banco, embeddings, extração e LLM)
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "jsonl"  # "jsonl" ou "otlp"
+    TRACING_JSONL_PATH: str = "./traces/spans.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "document-ai-api"
+    TRACING_SAMPLE_RATIO: float = 1.0
+    TRACING_MAX_QUEUE: int = 10000
+    TRACING_EXPORT_BATCH_SIZE: int = 256
+    TRACING_EXPORT_INTERVAL_SECONDS: float = 2.0
+
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"
+    LOG_QUEUE_ENABLED: bool = True  # Serializa e escreve os logs numa thread separada
+    LOG_SAMPLE_RATE: float = 1.0  # Fração das requisições com logs INFO/DEBUG mantidos
+    LOG_SINGLE_ACCESS_LINE: bool = True  # Uma linha por requisição (em vez de início + fim)
 
     class Config:
         env_file = ".env"
@@ -2,9 +2,10 @@ from fastapi import HTTPException, status
 
 class DocumentAIException(Exception):
     """Base exception para a aplicação"""
-    def __init__(self, message: str, status_code: int = 500):
+    def __init__(self, message: str, status_code: int = 500, headers: dict | None = None):
         self.message = message
         self.status_code = status_code
+        self.headers = headers
         super().__init__(self.message)
 
 class AuthenticationError(DocumentAIException):
@@ -27,7 +28,42 @@ class ValidationError(DocumentAIException):
     def __init__(self, message: str):
         super().__init__(message, status.HTTP_422_UNPROCESSABLE_ENTITY)
 
+class ConflictError(DocumentAIException):
+    """Recurso alterado por outra requisição"""
+    def __init__(self, message: str = "Recurso alterado por outra requisição"):
+        super().__init__(message, status.HTTP_409_CONFLICT)
+
 class FileUploadError(DocumentAIException):
     """Erro no upload de arquivo"""
     def __init__(self, message: str):
         super().__init__(message, status.HTTP_400_BAD_REQUEST)
+
+class ServiceOverloadedError(DocumentAIException):
+    """Serviço sobrecarregado - cliente deve tentar novamente mais tarde"""
+    def __init__(self, message: str = "Serviço sobrecarregado, tente novamente em instantes", retry_after: int = 5):
+        self.retry_after = retry_after
+        super().__init__(
+            message,
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+class LLMUnavailableError(DocumentAIException):
+    """Nenhum backend de LLM disponível (todos com falha ou circuito aberto)"""
+    def __init__(self, message: str = "Nenhum backend de LLM disponível no momento", retry_after: int = 30):
+        self.retry_after = retry_after
+        super().__init__(
+            message,
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+class RateLimitError(DocumentAIException):
+    """Limite de requisições excedido"""
+    def __init__(self, message: str = "Muitas requisições", retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__(
+            message,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(retry_after)}
+        )
@@ -0,0 +1,373 @@
+import asyncio
+import contextvars
+import functools
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.exceptions import ServiceOverloadedError
+from app.core.logging import logger, request_id_var
+from app.core.metrics import EXECUTOR_QUEUE_WAIT_SECONDS, EXECUTOR_SHED_TOTAL, registry
+from app.core.tracing import run_in_child_span, run_in_span, tracer
+
+
+class BoundedExecutor:
+    """
+    Executor dedicado com fila limitada
+
+    Responsabilidades:
+    - Executar trabalho bloqueante/CPU fora do event loop
+    - Limitar threads/processos e tarefas pendentes por tipo de trabalho
+    - Falhar rápido com ServiceOverloadedError quando a fila enche
+
+    No modo "process" a função e os argumentos precisam ser picklable
+    (funções de módulo, não lambdas).
+
+    O contexto (request_id, span atual) é propagado: threads rodam numa
+    cópia do contexto; processos recebem o traceparent e devolvem os spans.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, mode: str = "thread"):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.mode = mode
+        self._executor: Executor
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._pending = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa fn(*args, **kwargs) no executor e aguarda o resultado"""
+        if self._pending >= self.max_workers + self.max_queue:
+            logger.warning(f"Executor {self.name} saturado: {self._pending} tarefas pendentes")
+            raise ServiceOverloadedError(retry_after=settings.EXECUTOR_RETRY_AFTER_SECONDS)
+
+        self._pending += 1
+        try:
+            return await self._execute(fn, args, kwargs)
+        finally:
+            self._pending -= 1
+
+    async def _execute(
+        self,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        priority: str = "default",
+        queued_at: Optional[float] = None
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        span_name = f"executor.{self.name}"
+        if self.mode != "process":
+            context = contextvars.copy_context()
+            call = functools.partial(
+                context.run, self._timed_call, queued_at or time.perf_counter(), priority, span_name, fn, args, kwargs
+            )
+            return await loop.run_in_executor(self._executor, call)
+
+        result, spans = await loop.run_in_executor(
+            self._executor,
+            functools.partial(
+                run_in_child_span,
+                tracer.current_traceparent(),
+                request_id_var.get(),
+                span_name,
+                fn,
+                args,
+                kwargs
+            )
+        )
+        if spans:
+            tracer.export_remote(spans)
+        return result
+
+    def _timed_call(self, queued_at: float, priority: str, span_name: str, fn, args, kwargs):
+        # Na thread do executor: o tempo desde a submissão é a espera na fila
+        EXECUTOR_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at, executor=self.name, priority=priority)
+        return run_in_span(span_name, fn, *args, **kwargs)
+
+    def status(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_queue": self.max_queue
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class PriorityExecutor(BoundedExecutor):
+    """
+    Executor com classes de prioridade (consultas interativas x ingestão)
+
+    Responsabilidades:
+    - Atender primeiro o trabalho "interactive" (embedding de consultas)
+    - Limitar a ingestão ("bulk") a `bulk_share` do tempo do executor
+      quando as duas classes disputam vagas (sem disputa, a ingestão usa
+      tudo)
+    - Medir espera na fila por classe e a latência das consultas
+      (espera + execução)
+    - Recusar nova ingestão (503) enquanto o p95 das consultas passa de
+      `latency_target_ms`
+
+    A preempção acontece entre tarefas: a ingestão deve ser enviada em lotes
+    pequenos (EMBEDDING_BULK_BATCH_SIZE) para uma consulta não esperar um
+    documento inteiro.
+    """
+
+    PRIORITIES = ("interactive", "bulk")
+    USAGE_HALF_LIFE_SECONDS = 5.0  # Memória da divisão de tempo entre as classes
+    LATENCY_WINDOW_SECONDS = 30.0
+    LATENCY_MIN_SAMPLES = 10
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        bulk_share: float = 0.3,
+        latency_target_ms: float = 0.0
+    ):
+        super().__init__(name, max_workers, max_queue, mode="thread")
+        self.bulk_share = bulk_share
+        self.latency_target_ms = latency_target_ms
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in self.PRIORITIES}
+        self._pending_by: Dict[str, int] = {p: 0 for p in self.PRIORITIES}
+        self._running = 0
+        self._usage: Dict[str, float] = {p: 0.0 for p in self.PRIORITIES}
+        self._usage_at = time.monotonic()
+        self._latencies: Deque[Tuple[float, float]] = deque()  # (quando, segundos) das consultas
+        self.shed = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self.submit("interactive", fn, *args, **kwargs)
+
+    async def submit(self, priority: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa fn(*args, **kwargs) na classe de prioridade indicada"""
+        if priority not in self._waiters:
+            raise ValueError(f"Prioridade desconhecida: {priority}")
+        if self._pending_by[priority] >= self.max_workers + self.max_queue:
+            logger.warning(
+                f"Executor {self.name} saturado ({priority}): {self._pending_by[priority]} tarefas pendentes"
+            )
+            raise ServiceOverloadedError(retry_after=settings.EXECUTOR_RETRY_AFTER_SECONDS)
+
+        self._pending_by[priority] += 1
+        self._pending += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._acquire_slot(priority)
+            started = time.perf_counter()
+            try:
+                return await self._execute(fn, args, kwargs, priority=priority, queued_at=queued_at)
+            finally:
+                finished = time.perf_counter()
+                self._charge(priority, finished - started)
+                if priority == "interactive":
+                    self._latencies.append((time.monotonic(), finished - queued_at))
+                self._running -= 1
+                self._dispatch()
+        finally:
+            self._pending_by[priority] -= 1
+            self._pending -= 1
+
+    async def _acquire_slot(self, priority: str) -> None:
+        if self._running < self.max_workers and not any(self._waiters.values()):
+            self._running += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga já tinha sido concedida: devolve para o próximo
+                self._running -= 1
+                self._dispatch()
+            else:
+                self._waiters[priority].remove(waiter)
+            raise
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_workers:
+            priority = self._next_priority()
+            if priority is None:
+                return
+            waiter = self._waiters[priority].popleft()
+            if waiter.cancelled():
+                continue
+            self._running += 1
+            waiter.set_result(None)
+
+    def _next_priority(self) -> Optional[str]:
+        interactive, bulk = self._waiters["interactive"], self._waiters["bulk"]
+        if not bulk:
+            return "interactive" if interactive else None
+        if not interactive:
+            return "bulk"
+        self._decay_usage()
+        total = self._usage["interactive"] + self._usage["bulk"]
+        bulk_fraction = self._usage["bulk"] / total if total else 0.0
+        return "bulk" if bulk_fraction < self.bulk_share else "interactive"
+
+    def _decay_usage(self) -> None:
+        now = time.monotonic()
+        factor = 0.5 ** ((now - self._usage_at) / self.USAGE_HALF_LIFE_SECONDS)
+        self._usage_at = now
+        for priority in self._usage:
+            self._usage[priority] *= factor
+
+    def _charge(self, priority: str, seconds: float) -> None:
+        self._decay_usage()
+        self._usage[priority] += seconds
+
+    def interactive_latency_p95(self) -> Optional[float]:
+        """p95 (s) da espera + execução das consultas na janela recente"""
+        cutoff = time.monotonic() - self.LATENCY_WINDOW_SECONDS
+        while self._latencies and self._latencies[0][0] < cutoff:
+            self._latencies.popleft()
+        if len(self._latencies) < self.LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(latency for _, latency in self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    @property
+    def shedding(self) -> bool:
+        if self.latency_target_ms <= 0:
+            return False
+        p95 = self.interactive_latency_p95()
+        return p95 is not None and p95 * 1000 > self.latency_target_ms
+
+    def check_bulk_admission(self) -> None:
+        """Recusa nova ingestão (503) enquanto as consultas estão acima da meta"""
+        if self.shedding:
+            self.shed += 1
+            EXECUTOR_SHED_TOTAL.inc(executor=self.name)
+            logger.warning(
+                f"Executor {self.name}: p95 das consultas acima de {self.latency_target_ms:.0f} ms, "
+                f"recusando ingestão"
+            )
+            raise ServiceOverloadedError(retry_after=settings.EXECUTOR_RETRY_AFTER_SECONDS)
+
+    def status(self) -> dict:
+        p95 = self.interactive_latency_p95()
+        return {
+            **super().status(),
+            "running": self._running,
+            "queued": {p: len(w) for p, w in self._waiters.items()},
+            "bulk_share": self.bulk_share,
+            "interactive_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "latency_target_ms": self.latency_target_ms or None,
+            "shedding": self.shedding,
+            "shed": self.shed
+        }
+
+
+# nome -> (workers, fila máxima, modo)
+_POOL_CONFIG = {
+    "embedding": lambda: (settings.EMBEDDING_EXECUTOR_WORKERS, settings.EXECUTOR_MAX_QUEUE, "thread"),
+    "extraction": lambda: (settings.EXTRACTION_EXECUTOR_WORKERS, settings.EXECUTOR_MAX_QUEUE, "thread"),
+    "hashing": lambda: (
+        settings.HASHING_EXECUTOR_WORKERS,
+        settings.HASHING_EXECUTOR_MAX_QUEUE,
+        settings.HASHING_EXECUTOR_MODE
+    ),
+    "db": lambda: (settings.DB_EXECUTOR_WORKERS, settings.EXECUTOR_MAX_QUEUE, "thread"),
+}
+
+# Executores com classes de prioridade: nome -> (bulk_share, meta de latência ms)
+_PRIORITY_CONFIG = {
+    "embedding": lambda: (settings.EMBEDDING_BULK_CPU_SHARE, settings.EMBEDDING_INTERACTIVE_LATENCY_TARGET_MS),
+}
+
+_executors: Dict[str, BoundedExecutor] = {}
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Retorna (criando sob demanda) o executor dedicado pelo nome"""
+    executor = _executors.get(name)
+    if executor is None:
+        max_workers, max_queue, mode = _POOL_CONFIG[name]()
+        if name in _PRIORITY_CONFIG:
+            bulk_share, latency_target_ms = _PRIORITY_CONFIG[name]()
+            executor = PriorityExecutor(name, max_workers, max_queue, bulk_share, latency_target_ms)
+        else:
+            executor = BoundedExecutor(name, max_workers, max_queue, mode)
+        _executors[name] = executor
+    return executor
+
+
+async def run_in_executor(name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Executa função bloqueante no executor dedicado
+
+    Executores: "embedding", "extraction", "hashing", "db"
+    """
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+async def run_with_priority(name: str, priority: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Executa função no executor com prioridades ("interactive" ou "bulk")
+
+    Executores sem classes de prioridade executam normalmente.
+    """
+    executor = get_executor(name)
+    if isinstance(executor, PriorityExecutor):
+        return await executor.submit(priority, fn, *args, **kwargs)
+    return await executor.run(fn, *args, **kwargs)
+
+
+def check_bulk_admission(name: str) -> None:
+    """Levanta ServiceOverloadedError se o executor está recusando ingestão"""
+    executor = get_executor(name)
+    if isinstance(executor, PriorityExecutor):
+        executor.check_bulk_admission()
+
+
+def executors_status() -> Dict[str, dict]:
+    """Estado dos executores já criados"""
+    return {name: executor.status() for name, executor in _executors.items()}
+
+
+def shutdown_executors() -> None:
+    """Encerra os executores (shutdown da aplicação)"""
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
+
+
+def _collect_metrics():
+    priority_executors = [
+        (name, executor) for name, executor in _executors.items() if isinstance(executor, PriorityExecutor)
+    ]
+    return [(
+        "executor_pending_tasks",
+        "Tarefas em execução ou na fila por executor",
+        "gauge",
+        [({"executor": name}, executor._pending) for name, executor in _executors.items()]
+    ), (
+        "executor_queued_tasks",
+        "Tarefas aguardando vaga por executor e prioridade",
+        "gauge",
+        [
+            ({"executor": name, "priority": priority}, len(waiters))
+            for name, executor in priority_executors
+            for priority, waiters in executor._waiters.items()
+        ]
+    ), (
+        "executor_shedding",
+        "1 enquanto o executor recusa ingestão por latência das consultas",
+        "gauge",
+        [({"executor": name}, int(executor.shedding)) for name, executor in priority_executors]
+    )]
+
+
+registry.register_collector(_collect_metrics)
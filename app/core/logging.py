@@ -1,15 +1,54 @@
+import atexit
 import logging
 import json
+import os
+import queue
 import sys
+from contextvars import ContextVar
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 from app.core.config import settings
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+# request_id da requisição atual; definido no logging_middleware e propagado
+# para serviços, tasks e threads dos executores
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Decisão de amostragem da requisição atual (None = fora de requisição)
+log_sampled_var: ContextVar[Optional[bool]] = ContextVar("log_sampled", default=None)
+
+# Atributos padrão do LogRecord; todo o resto veio de `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _dumps_fallback(data: dict) -> str:
+    return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def _dumps_orjson(data: dict) -> str:
+    return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 class JSONFormatter(logging.Formatter):
-    """Formatter para logs estruturados em JSON"""
+    """
+    Formatter para logs estruturados em JSON
+
+    Inclui todos os campos passados em `extra=` (method, path, status_code,
+    process_time, traceback...). Serializa com orjson quando instalado.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.dumps = _dumps_orjson if orjson is not None else _dumps_fallback
 
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -20,17 +59,97 @@ class JSONFormatter(logging.Formatter):
 
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
+
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and value is not None:
+                log_data[key] = value
+
+        if "request_id" not in log_data:
+            request_id = request_id_var.get()
+            if request_id is not None:
+                log_data["request_id"] = request_id
+
+        return self.dumps(log_data)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler que preserva os campos estruturados
 
-        if hasattr(record, "user_id"):
-            log_data["user_id"] = record.user_id
+    Roda na thread de quem loga: resolve a mensagem, formata a exceção em
+    texto e copia o request_id do contexto (a thread do listener não tem o
+    contexto da requisição). Formatação e escrita ficam no listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return record
+
+
+class RequestSamplingFilter(logging.Filter):
+    """
+    Amostragem dos logs por requisição
+
+    A decisão é tomada uma vez por requisição (no logging_middleware), então
+    os logs de uma requisição são mantidos ou descartados juntos. Warnings,
+    erros e respostas 5xx são sempre mantidos; logs fora de requisições
+    (startup, tarefas de fundo) não são amostrados.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or log_sampled_var.get() is not False:
+            return True
+        return getattr(record, "status_code", 0) >= 500
+
+
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_output_handler: Optional[logging.Handler] = None
+_listener: Optional[QueueListener] = None
 
-        if hasattr(record, "request_id"):
-            log_data["request_id"] = record.request_id
 
-        return json.dumps(log_data)
+def _start_listener() -> None:
+    """Thread que formata e escreve os logs da fila"""
+    global _listener
+    _listener = QueueListener(_queue, _output_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    """Esvazia a fila no encerramento do processo"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_after_fork() -> None:
+    # Threads não sobrevivem ao fork (workers do gunicorn com preload,
+    # executores em modo process): cada processo filho precisa do seu listener
+    global _queue
+    _queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue = _queue
+    _start_listener()
+
 
 def setup_logging():
-    """Configura o sistema de logging"""
+    """
+    Configura o sistema de logging
+
+    Com LOG_QUEUE_ENABLED, o handler da raiz só enfileira o registro; a
+    serialização e a escrita no stdout acontecem na thread do listener,
+    fora do caminho da requisição.
+    """
+    global _output_handler
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, settings.LOG_LEVEL))
 
@@ -44,6 +163,16 @@ def setup_logging():
         )
         handler.setFormatter(formatter)
 
+    if settings.LOG_QUEUE_ENABLED:
+        _output_handler = handler
+        handler = ContextQueueHandler(_queue)
+        _start_listener()
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+    if settings.LOG_SAMPLE_RATE < 1.0:
+        handler.addFilter(RequestSamplingFilter())
+
     logger.addHandler(handler)
 
     return logger
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import registry
+
+
+class LoopLagMonitor:
+    """
+    Monitor de atraso (lag) do event loop
+
+    Uma task dorme por um intervalo fixo e mede quanto acordou atrasada.
+    Atraso alto indica código bloqueando o loop (CPU ou I/O síncrono).
+
+    Responsabilidades:
+    - Medir o atraso do loop continuamente
+    - Manter estatísticas em janela deslizante
+    - Logar aviso quando o atraso passa do limite
+    """
+
+    def __init__(self, interval: float, warn_ms: float, window: int = 240):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - start - self.interval) * 1000)
+            self.samples.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms >= self.warn_ms:
+                logger.warning(
+                    f"Event loop bloqueado por {lag_ms:.0f} ms",
+                    extra={"loop_lag_ms": round(lag_ms, 1)}
+                )
+
+    def stats(self) -> dict:
+        if not self.samples:
+            return {"samples": 0}
+        ordered = sorted(self.samples)
+        p99_index = min(len(ordered) - 1, int(len(ordered) * 0.99))
+        return {
+            "samples": len(ordered),
+            "last_ms": round(self.samples[-1], 1),
+            "avg_ms": round(sum(ordered) / len(ordered), 1),
+            "p99_ms": round(ordered[p99_index], 1),
+            "max_window_ms": round(ordered[-1], 1),
+            "max_ms": round(self.max_lag_ms, 1),
+        }
+
+
+loop_lag_monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL_SECONDS,
+    warn_ms=settings.LOOP_LAG_WARN_MS
+)
+
+
+def _collect_metrics():
+    stats = loop_lag_monitor.stats()
+    if not stats.get("samples"):
+        return []
+    return [
+        ("event_loop_lag_p99_seconds", "Atraso p99 do event loop na janela recente", "gauge",
+         [({}, stats["p99_ms"] / 1000)]),
+        ("event_loop_lag_max_seconds", "Maior atraso do event loop desde o startup", "gauge",
+         [({}, stats["max_ms"] / 1000)]),
+    ]
+
+
+registry.register_collector(_collect_metrics)
@@ -0,0 +1,261 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+from app.core.tracing import tracer
+
+# (nome, help, tipo, [(labels, valor)])
+CollectedMetric = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Contador monotônico com labels"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            labels = dict(zip(self.labelnames, key))
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Histograma com buckets fixos e labels
+
+    observe() custa um bisect e três somas sob lock; os buckets acumulados
+    do formato Prometheus só são calculados no render.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # chave -> [contagens por bucket (+Inf no fim), soma, total]
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        for key, counts, total_sum, count in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                yield f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total_sum)}"
+            yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas no formato de texto do Prometheus
+
+    Responsabilidades:
+    - Manter contadores e histogramas da aplicação
+    - Coletar gauges sob demanda (pools, executores, caches) no scrape
+    - Renderizar o formato de exposição 0.0.4 em /metrics
+
+    As métricas são por processo: com vários workers, cada um expõe os
+    próprios valores.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], List[CollectedMetric]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica já registrada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[CollectedMetric]]) -> None:
+        """Registra função chamada a cada scrape que retorna gauges atuais"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            try:
+                collected = collector()
+            except Exception:
+                continue
+            for name, help, metric_type, samples in collected:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP",
+    ("method", "route", "status")
+)
+RESPONSE_SERIALIZATION_SECONDS = registry.histogram(
+    "http_response_serialization_seconds",
+    "Tempo de serialização do corpo JSON por rota",
+    ("route",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+RESPONSE_BODY_BYTES = registry.histogram(
+    "http_response_body_bytes",
+    "Tamanho do corpo JSON por rota, antes da compressão",
+    ("route",),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+RESPONSE_COMPRESSION_BYTES_TOTAL = registry.counter(
+    "http_response_compression_bytes_total",
+    "Bytes de respostas comprimidas, antes (original) e depois (compressed)",
+    ("encoding", "stage")
+)
+PIPELINE_STAGE_SECONDS = registry.histogram(
+    "pipeline_stage_duration_seconds",
+    "Duração de cada etapa dos pipelines de upload, busca e LLM",
+    ("pipeline", "stage")
+)
+EXECUTOR_QUEUE_WAIT_SECONDS = registry.histogram(
+    "executor_queue_wait_seconds",
+    "Espera entre a submissão e o início da tarefa, por executor e prioridade",
+    ("executor", "priority"),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+EXECUTOR_SHED_TOTAL = registry.counter(
+    "executor_shed_total",
+    "Ingestões recusadas porque as consultas estavam acima da meta de latência",
+    ("executor",)
+)
+RATE_LIMIT_DECISIONS_TOTAL = registry.counter(
+    "rate_limit_decisions_total",
+    "Decisões do rate limit por usuário, por operação e resultado",
+    ("operation", "outcome")
+)
+PIPELINE_ERRORS_TOTAL = registry.counter(
+    "pipeline_errors_total",
+    "Erros por etapa dos pipelines",
+    ("pipeline", "stage")
+)
+DOCUMENT_CHUNKS_TOTAL = registry.counter(
+    "document_chunks_total",
+    "Chunks gerados a partir de documentos enviados"
+)
+EMBEDDINGS_TOTAL = registry.counter(
+    "embeddings_generated_total",
+    "Textos vetorizados pelo modelo de embedding"
+)
+CACHE_REQUESTS_TOTAL = registry.counter(
+    "cache_requests_total",
+    "Consultas a caches da aplicação",
+    ("cache", "result")
+)
+LLM_REQUESTS_TOTAL = registry.counter(
+    "llm_requests_total",
+    "Gerações no LLM por provider e resultado",
+    ("provider", "outcome")
+)
+
+
+@contextmanager
+def stage_timer(pipeline: str, stage: str):
+    """
+    Mede uma etapa de pipeline; exceções contam em pipeline_errors_total
+
+    Com tracing ativo, a etapa também vira um span `<pipeline>.<stage>`.
+    """
+    start = time.perf_counter()
+    try:
+        with tracer.span(f"{pipeline}.{stage}"):
+            yield
+    except Exception:
+        PIPELINE_ERRORS_TOTAL.inc(pipeline=pipeline, stage=stage)
+        raise
+    finally:
+        PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - start, pipeline=pipeline, stage=stage)
@@ -0,0 +1,178 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import registry
+from app.models.user import User
+
+# Colunas copiadas para o snapshot do usuário em cache
+_PRINCIPAL_FIELDS = (
+    "id", "email", "username", "is_active", "is_superuser", "token_version", "created_at"
+)
+
+def snapshot_user(user: User) -> dict:
+    """Copia as colunas do usuário para um dict serializável"""
+    data = {field: getattr(user, field) for field in _PRINCIPAL_FIELDS}
+    if isinstance(data["created_at"], datetime):
+        data["created_at"] = data["created_at"].isoformat()
+    data["token_version"] = data["token_version"] or 0
+    return data
+
+def user_from_snapshot(data: dict) -> User:
+    """
+    Reconstrói um User transiente (sem sessão) a partir do snapshot
+
+    Apenas colunas estão disponíveis; relacionamentos (ex: documents)
+    não devem ser acessados a partir do usuário em cache.
+    """
+    values = dict(data)
+    if isinstance(values.get("created_at"), str):
+        values["created_at"] = datetime.fromisoformat(values["created_at"])
+    return User(**values)
+
+class MemoryPrincipalStore:
+    """Armazenamento em memória do worker (LRU + TTL)"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, dict]]" = OrderedDict()
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(user_id, None)
+            return None
+        self._entries.move_to_end(user_id)
+        return data
+
+    async def set(self, user_id: int, data: dict) -> None:
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, data)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class RedisPrincipalStore:
+    """Armazenamento compartilhado entre workers via Redis"""
+
+    def __init__(self, url: str, ttl_seconds: int):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "PRINCIPAL_CACHE_REDIS_URL configurado, mas o pacote 'redis' não está instalado"
+            ) from e
+        self._client = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"principal:{user_id}"
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        raw = await self._client.get(self._key(user_id))
+        return json.loads(raw) if raw else None
+
+    async def set(self, user_id: int, data: dict) -> None:
+        await self._client.set(self._key(user_id), json.dumps(data), ex=self.ttl_seconds)
+
+    async def delete(self, user_id: int) -> None:
+        await self._client.delete(self._key(user_id))
+
+    def size(self) -> Optional[int]:
+        return None
+
+class PrincipalCache:
+    """
+    Cache do usuário autenticado por (user_id, token_version)
+
+    Responsabilidades:
+    - Evitar a consulta ao banco em get_current_user a cada requisição
+    - Invalidar ao desativar usuário ou trocar senha (token_version muda)
+    - Medir hit rate e consultas economizadas
+
+    Um token só é aceito do cache se a versão gravada no token for a
+    mesma do usuário em cache; ao revogar, a versão é incrementada e a
+    entrada removida.
+    """
+
+    def __init__(self, store, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int, token_version: int) -> Optional[User]:
+        if not self.enabled:
+            return None
+        try:
+            data = await self.store.get(user_id)
+        except Exception as e:
+            logger.warning(f"Falha ao ler cache de usuário: {e}")
+            data = None
+
+        if data is None or data.get("token_version", 0) != token_version:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return user_from_snapshot(data)
+
+    async def set(self, user: User) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self.store.set(user.id, snapshot_user(user))
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de usuário: {e}")
+
+    async def invalidate(self, user_id: int) -> None:
+        try:
+            await self.store.delete(user_id)
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar cache de usuário: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if isinstance(self.store, RedisPrincipalStore) else "memory",
+            "entries": self.store.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "db_queries_saved": self.hits
+        }
+
+def _build_store():
+    if settings.PRINCIPAL_CACHE_REDIS_URL:
+        return RedisPrincipalStore(
+            settings.PRINCIPAL_CACHE_REDIS_URL, settings.PRINCIPAL_CACHE_TTL_SECONDS
+        )
+    return MemoryPrincipalStore(
+        settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS
+    )
+
+principal_cache = PrincipalCache(_build_store(), enabled=settings.PRINCIPAL_CACHE_ENABLED)
+
+def _collect_metrics():
+    return [(
+        "principal_cache_requests_total",
+        "Consultas ao cache de usuário autenticado",
+        "counter",
+        [({"result": "hit"}, principal_cache.hits), ({"result": "miss"}, principal_cache.misses)]
+    )]
+
+registry.register_collector(_collect_metrics)
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import math
+import os
+import re
+import secrets
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.core.config import settings
+from app.core.logging import logger
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_WORK_ITEM_FILE = os.path.join("concurrent", "futures", "thread.py")
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"] + os.sep
+_REPORT_NAME = re.compile(r"^[\w.-]+$")
+# Estado da ativação compartilhado pelos workers (sem .json: não é relatório)
+_STATE_FILE = ".profiling-state"
+
+
+@lru_cache(maxsize=8192)
+def _frame_label(code) -> str:
+    """`função (arquivo:linha)` com caminho relativo ao projeto, site-packages ou stdlib"""
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    elif filename.startswith(_STDLIB_DIR):
+        filename = filename[len(_STDLIB_DIR):]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+class RequestSampler:
+    """
+    Profiler por amostragem de uma requisição
+
+    Uma thread acorda a cada `interval` segundos e registra onde a task da
+    requisição está:
+    - executando no event loop: pilha real da thread do loop
+    - aguardando (await): cadeia de coroutines até o ponto de espera; se
+      estiver aguardando um Future, inclui as pilhas das threads de
+      executor ocupadas (run_in_executor)
+
+    O resultado são pilhas colapsadas (formato de flame graph). Threads de
+    executor são compartilhadas: com requisições concorrentes, o trabalho
+    de outras requisições pode aparecer na amostra.
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float, root: str):
+        self.task = task
+        self.loop = task.get_loop()
+        self.interval = interval
+        self.root = root.replace(";", ",")
+        self.loop_thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # Amostragem é best-effort: a task pode mudar durante a leitura
+                continue
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        self.samples += 1
+
+        if asyncio.current_task(self.loop) is self.task:
+            stack = self._running_stack(frames.get(self.loop_thread_id))
+            if stack is not None:
+                self.stacks[";".join([self.root, *stack])] += 1
+                return
+
+        stack, awaited = self._awaiting_stack(self.task)
+        # Future (ou o iterador do seu __await__): pode ser um run_in_executor
+        if type(awaited).__name__ in ("Future", "FutureIter", "_asyncio.FutureIter"):
+            executor_stacks = self._executor_stacks(frames)
+            if executor_stacks:
+                for thread_stack in executor_stacks:
+                    self.stacks[";".join([self.root, *stack, *thread_stack])] += 1
+                return
+
+        leaf = f"<await {type(awaited).__name__}>" if awaited is not None else "<await>"
+        self.stacks[";".join([self.root, *stack, leaf])] += 1
+
+    def _running_stack(self, frame) -> Optional[List[str]]:
+        """Pilha da thread do loop a partir da coroutine raiz da task"""
+        root_frame = getattr(self.task.get_coro(), "cr_frame", None)
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame.f_code))
+            if frame is root_frame:
+                stack.reverse()
+                return stack
+            frame = frame.f_back
+        return None
+
+    @staticmethod
+    def _awaiting_stack(task: asyncio.Task, depth: int = 0):
+        """Cadeia de coroutines suspensas e o objeto aguardado no fim dela"""
+        stack = []
+        obj = task.get_coro()
+        while obj is not None:
+            frame = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None)
+            if frame is None:
+                break
+            stack.append(_frame_label(frame.f_code))
+            obj = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None)
+
+        if isinstance(obj, asyncio.Task) and depth < 3:
+            child_stack, obj = RequestSampler._awaiting_stack(obj, depth + 1)
+            stack.extend(child_stack)
+        return stack, obj
+
+    @staticmethod
+    def _executor_stacks(frames) -> List[List[str]]:
+        """Pilhas das threads de ThreadPoolExecutor que estão executando uma tarefa"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in frames.items():
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            # Threads ociosas ficam em queue.get, sem o _WorkItem.run na pilha
+            for index, code in enumerate(stack):
+                if code.co_name == "run" and code.co_filename.endswith(_WORK_ITEM_FILE):
+                    name = names.get(ident, "").rsplit("_", 1)[0]
+                    stacks.append([f"[executor {name}]", *map(_frame_label, stack[index + 1:])])
+                    break
+        return stacks
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+class ProfileStore:
+    """
+    Relatórios salvos em disco com limite de retenção
+
+    A retenção usa o mtime dos arquivos, sem abrir os relatórios.
+    """
+
+    def __init__(self, directory: str, max_reports: int):
+        self.directory = directory
+        self.max_reports = max_reports
+
+    def save(self, name: str, collapsed: str, metadata: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{name}.folded"), "w") as f:
+            f.write(collapsed)
+        with open(os.path.join(self.directory, f"{name}.json"), "w") as f:
+            json.dump(metadata, f)
+        self._enforce_retention()
+
+    def _enforce_retention(self) -> None:
+        reports = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    reports.append((entry.stat().st_mtime, entry.name[:-len(".json")]))
+                except OSError:
+                    continue
+        reports.sort(reverse=True)
+        for _, name in reports[self.max_reports:]:
+            self.delete(name)
+
+    def list(self) -> List[dict]:
+        """Relatórios do mais recente para o mais antigo"""
+        if not os.path.isdir(self.directory):
+            return []
+        reports = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    reports.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(reports, key=lambda r: r.get("created_at", ""), reverse=True)
+
+    def read(self, name: str) -> Optional[str]:
+        if not _REPORT_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, f"{name}.folded")
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            return f.read()
+
+    def delete(self, name: str) -> None:
+        for extension in (".folded", ".json"):
+            try:
+                os.remove(os.path.join(self.directory, name + extension))
+            except OSError:
+                pass
+
+
+class ProfilingControl:
+    """
+    Estado do profiling sob demanda (ativado por admin)
+
+    Responsabilidades:
+    - Habilitar/desabilitar o profiling com prazo de expiração
+    - Compartilhar a ativação entre os workers por um arquivo de estado em
+      `PROFILING_DIR` (o mesmo diretório dos relatórios)
+    - Decidir quais requisições amostrar: header `X-Profile` com a chave
+      gerada na ativação, e/ou 1 a cada N requisições (contagem por worker)
+    - Salvar os relatórios no ProfileStore, fora do event loop
+
+    Cada worker relê o arquivo de estado quando o mtime muda, checando no
+    máximo a cada `refresh_seconds`: desativado, o custo por requisição é
+    a leitura de `active` mais um stat por segundo.
+    """
+
+    def __init__(self, store: ProfileStore, interval: float, refresh_seconds: float = 1.0):
+        self.store = store
+        self.interval = interval
+        self.refresh_seconds = refresh_seconds
+        self.key: Optional[str] = None
+        self.sample_every = 0
+        self.expires_at: Optional[datetime] = None
+        self._count = 0
+        self._sequence = 0
+        self._state_mtime: Optional[int] = None
+        self._checked_at = -math.inf
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.store.directory, _STATE_FILE)
+
+    @property
+    def active(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at >= self.refresh_seconds:
+            self._checked_at = now
+            self._refresh()
+        return self.key is not None
+
+    def _refresh(self) -> None:
+        """Relê o estado compartilhado se o arquivo mudou"""
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._state_mtime:
+            return
+        self._state_mtime = mtime
+
+        state = None
+        if mtime is not None:
+            try:
+                with open(self.state_path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+        if state is None:
+            self._apply(None, 0, None)
+        else:
+            self._apply(state["key"], state["sample_every"], datetime.fromisoformat(state["expires_at"]))
+
+    def _apply(self, key: Optional[str], sample_every: int, expires_at: Optional[datetime]) -> None:
+        if key != self.key:
+            self._count = 0
+        self.key = key
+        self.sample_every = sample_every
+        self.expires_at = expires_at
+
+    def enable(self, sample_every: int, ttl_minutes: int) -> dict:
+        key = secrets.token_urlsafe(16)
+        expires_at = datetime.utcnow() + timedelta(minutes=ttl_minutes)
+        os.makedirs(self.store.directory, exist_ok=True)
+        # Escrita atômica: outro worker nunca lê um estado pela metade
+        temporary = f"{self.state_path}.{os.getpid()}"
+        with open(temporary, "w") as f:
+            json.dump({"key": key, "sample_every": sample_every, "expires_at": expires_at.isoformat()}, f)
+        os.replace(temporary, self.state_path)
+        self._checked_at = -math.inf
+        logger.info(f"Profiling sob demanda ativado (1 a cada {sample_every or '-'}, {ttl_minutes} min)")
+        return self.status()
+
+    def disable(self) -> dict:
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+        self._checked_at = -math.inf
+        return self.status()
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        key = self.key
+        if key is None:
+            return False
+        if datetime.utcnow() >= self.expires_at:
+            # Expirado vale para todos os workers; o arquivo fica até a próxima ativação
+            self._apply(None, 0, None)
+            return False
+        if header_value is not None and secrets.compare_digest(header_value, key):
+            return True
+        if self.sample_every:
+            self._count += 1
+            return self._count % self.sample_every == 0
+        return False
+
+    def new_report_name(self, method: str) -> str:
+        self._sequence += 1
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        return f"{timestamp}-{os.getpid()}-{self._sequence}-{method.lower()}"
+
+    def save(self, name: str, sampler: RequestSampler, metadata: dict) -> None:
+        """Agenda a gravação do relatório no executor padrão (não bloqueia o loop)"""
+        metadata = {
+            "name": name,
+            "created_at": datetime.utcnow().isoformat(),
+            "samples": sampler.samples,
+            "interval_ms": round(self.interval * 1000, 2),
+            **metadata,
+        }
+        asyncio.get_running_loop().run_in_executor(None, self._write, name, sampler, metadata)
+
+    def _write(self, name: str, sampler: RequestSampler, metadata: dict) -> None:
+        try:
+            self.store.save(name, sampler.collapsed(), metadata)
+        except OSError as e:
+            logger.error(f"Falha ao salvar relatório de profiling: {e}")
+
+    def status(self) -> dict:
+        return {
+            "active": self.active,
+            "header_key": self.key,
+            "sample_every": self.sample_every,
+            "expires_at": self.expires_at,
+            "interval_ms": round(self.interval * 1000, 2),
+            "directory": self.store.directory,
+            "max_reports": self.store.max_reports,
+            "worker_pid": os.getpid(),
+        }
+
+
+profiling = ProfilingControl(
+    ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_REPORTS),
+    interval=settings.PROFILING_INTERVAL_MS / 1000
+)
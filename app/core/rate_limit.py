@@ -0,0 +1,280 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core.exceptions import RateLimitError
+from app.core.logging import logger
+from app.core.metrics import RATE_LIMIT_DECISIONS_TOTAL
+
+# (chave, capacidade, tokens por segundo, custo)
+BucketRequest = Tuple[str, float, float, float]
+
+
+class MemoryBucketStore:
+    """
+    Baldes em memória do worker (LRU)
+
+    Consome de vários baldes de uma vez: ou todos têm tokens e todos são
+    debitados, ou nenhum é (uma requisição negada não gasta o balde geral).
+    Roda no event loop, sem await no meio, então é atômico por worker.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire_now(self, buckets: Sequence[BucketRequest]) -> Tuple[bool, float]:
+        now = time.monotonic()
+        levels = []
+        retry_after = 0.0
+        for key, capacity, refill_rate, cost in buckets:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+            levels.append(tokens)
+            if tokens < cost:
+                wait = (cost - tokens) / refill_rate if refill_rate else math.inf
+                retry_after = max(retry_after, wait)
+
+        allowed = retry_after == 0.0
+        for (key, _, _, cost), tokens in zip(buckets, levels):
+            self._buckets[key] = (tokens - cost if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    async def acquire(self, buckets: Sequence[BucketRequest]) -> Tuple[bool, float]:
+        return self.acquire_now(buckets)
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+# Mesma regra do MemoryBucketStore, atômica no Redis; o relógio é o do
+# servidor Redis (TIME), comum a todos os workers
+_ACQUIRE_SCRIPT = """
+redis.replicate_commands()
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local base = (i - 1) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local rate = tonumber(ARGV[base + 2])
+    local cost = tonumber(ARGV[base + 3])
+    local state = redis.call('HMGET', key, 't', 'u')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        local needed = rate > 0 and (cost - tokens) / rate or 86400
+        if needed > wait then wait = needed end
+    end
+end
+local allowed = wait == 0
+for i, key in ipairs(KEYS) do
+    local base = (i - 1) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local rate = tonumber(ARGV[base + 2])
+    local tokens = levels[i]
+    if allowed then tokens = tokens - tonumber(ARGV[base + 3]) end
+    redis.call('HSET', key, 't', tostring(tokens), 'u', tostring(now))
+    local ttl = 86400
+    if rate > 0 then ttl = math.ceil((capacity - tokens) / rate) + 1 end
+    redis.call('EXPIRE', key, ttl)
+end
+return {allowed and 1 or 0, tostring(wait)}
+"""
+
+
+class RedisBucketStore:
+    """Baldes compartilhados entre workers via Redis (script Lua atômico)"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "API_RATE_LIMIT_REDIS_URL configurado, mas o pacote 'redis' não está instalado"
+            ) from e
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_ACQUIRE_SCRIPT)
+
+    async def acquire(self, buckets: Sequence[BucketRequest]) -> Tuple[bool, float]:
+        keys = [key for key, _, _, _ in buckets]
+        args = [value for _, capacity, rate, cost in buckets for value in (capacity, rate, cost)]
+        allowed, retry_after = await self._script(keys=keys, args=args)
+        return bool(allowed), float(retry_after)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class BucketLimiter:
+    """
+    Motor de token buckets (rate limit da API e throttle de login)
+
+    Responsabilidades:
+    - Consumir de vários baldes de uma vez no backend configurado (memória
+      do worker ou Redis)
+    - Cair para os baldes em memória do worker quando o Redis falha (o
+      limite continua valendo, só que por worker)
+    """
+
+    def __init__(self, store, fallback: Optional[MemoryBucketStore] = None):
+        self.store = store
+        if fallback is None:
+            fallback = store if isinstance(store, MemoryBucketStore) else MemoryBucketStore(settings.API_RATE_LIMIT_MAX_KEYS)
+        self.fallback = fallback
+
+    async def acquire(self, buckets: Sequence[BucketRequest]) -> Tuple[bool, float]:
+        """Retorna: (permitido, segundos_até_haver_tokens_suficientes)"""
+        if self.store is self.fallback:
+            return self.fallback.acquire_now(buckets)
+        try:
+            return await self.store.acquire(buckets)
+        except Exception as e:
+            logger.warning(f"Falha no rate limit via Redis, usando memória do worker: {e}")
+            return self.fallback.acquire_now(buckets)
+
+    def status(self) -> dict:
+        return {
+            "backend": "redis" if isinstance(self.store, RedisBucketStore) else "memory",
+            "buckets_in_memory": self.fallback.size(),
+        }
+
+
+class UserRateLimiter:
+    """
+    Rate limit por usuário e por operação
+
+    Responsabilidades:
+    - Balde geral por usuário, em que cada operação consome seu peso
+      (busca é barata; chat, upload e resumo ocupam LLM/embeddings)
+    - Balde por (usuário, operação) com limite próprio
+    - 429 com Retry-After quando algum dos baldes está vazio
+    - Contar decisões por operação em rate_limit_decisions_total
+    """
+
+    def __init__(
+        self,
+        limiter: BucketLimiter,
+        enabled: bool = True,
+        per_minute: float = 120,
+        burst: float = 60,
+        costs: Optional[Dict[str, float]] = None,
+        endpoints: Optional[Dict[str, Tuple[float, float]]] = None,
+        exempt_superusers: bool = True
+    ):
+        self.limiter = limiter
+        self.enabled = enabled
+        self.exempt_superusers = exempt_superusers
+        self.user_bucket = (float(burst), per_minute / 60)
+        self.costs = costs or {}
+        self.endpoint_buckets = {
+            operation: (float(endpoint_burst), endpoint_per_minute / 60)
+            for operation, (endpoint_per_minute, endpoint_burst) in (endpoints or {}).items()
+        }
+
+    def buckets_for(self, user_id: int, operation: str) -> List[BucketRequest]:
+        capacity, refill_rate = self.user_bucket
+        buckets = [(f"rl:{user_id}", capacity, refill_rate, min(self.costs.get(operation, 1.0), capacity))]
+        endpoint = self.endpoint_buckets.get(operation)
+        if endpoint is not None:
+            buckets.append((f"rl:{user_id}:{operation}", endpoint[0], endpoint[1], 1.0))
+        return buckets
+
+    async def check(self, user, operation: str) -> None:
+        """Consome os tokens da operação ou lança RateLimitError (429)"""
+        if not self.enabled or (self.exempt_superusers and user.is_superuser):
+            return
+
+        allowed, retry_after = await self.limiter.acquire(self.buckets_for(user.id, operation))
+
+        RATE_LIMIT_DECISIONS_TOTAL.inc(operation=operation, outcome="allowed" if allowed else "rejected")
+        if not allowed:
+            raise RateLimitError(
+                "Limite de requisições excedido. Tente novamente em instantes",
+                retry_after=max(1, math.ceil(retry_after))
+            )
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, **self.limiter.status()}
+
+
+class LoginThrottle:
+    """
+    Throttle de login/registro, aplicado antes do bcrypt
+
+    Responsabilidades:
+    - Balde por IP (enumeração/tempestade de logins)
+    - Balde por username (força bruta numa conta)
+    - 429 com Retry-After indicando qual dos limites foi atingido
+    """
+
+    def __init__(
+        self,
+        limiter: BucketLimiter,
+        enabled: bool = True,
+        user_limit: Tuple[float, float] = (5, 5),
+        ip_limit: Tuple[float, float] = (30, 20)
+    ):
+        self.limiter = limiter
+        self.enabled = enabled
+        self.user_bucket = (float(user_limit[1]), user_limit[0] / 60)
+        self.ip_bucket = (float(ip_limit[1]), ip_limit[0] / 60)
+
+    async def check(self, username: Optional[str], client_ip: Optional[str]) -> None:
+        """Consome um token de cada balde ou lança RateLimitError (429)"""
+        if not self.enabled:
+            return
+        if client_ip:
+            await self._check(
+                f"login:ip:{client_ip}", self.ip_bucket, "Muitas tentativas deste endereço. Tente mais tarde"
+            )
+        if username:
+            await self._check(
+                f"login:user:{username.lower()}", self.user_bucket, "Muitas tentativas para este usuário. Tente mais tarde"
+            )
+
+    async def _check(self, key: str, bucket: Tuple[float, float], message: str) -> None:
+        capacity, refill_rate = bucket
+        allowed, retry_after = await self.limiter.acquire([(key, capacity, refill_rate, min(1.0, capacity))])
+        if not allowed:
+            raise RateLimitError(message, retry_after=max(1, math.ceil(retry_after)))
+
+
+def _build_bucket_store():
+    if settings.API_RATE_LIMIT_REDIS_URL:
+        return RedisBucketStore(settings.API_RATE_LIMIT_REDIS_URL)
+    return MemoryBucketStore(settings.API_RATE_LIMIT_MAX_KEYS)
+
+
+# Um único motor (e backend) para o rate limit da API e o throttle de login
+bucket_limiter = BucketLimiter(_build_bucket_store())
+
+login_throttle = LoginThrottle(
+    bucket_limiter,
+    enabled=settings.LOGIN_RATE_LIMIT_ENABLED,
+    user_limit=(settings.LOGIN_RATE_LIMIT_PER_MINUTE, settings.LOGIN_RATE_LIMIT_BURST),
+    ip_limit=(settings.LOGIN_IP_RATE_LIMIT_PER_MINUTE, settings.LOGIN_IP_RATE_LIMIT_BURST)
+)
+
+
+async def check_login_rate(username: Optional[str], client_ip: Optional[str]) -> None:
+    """Aplica o throttle de login/registro antes do bcrypt"""
+    await login_throttle.check(username, client_ip)
+
+
+api_rate_limiter = UserRateLimiter(
+    bucket_limiter,
+    enabled=settings.API_RATE_LIMIT_ENABLED,
+    per_minute=settings.API_RATE_LIMIT_PER_MINUTE,
+    burst=settings.API_RATE_LIMIT_BURST,
+    costs=settings.api_rate_limit_costs,
+    endpoints=settings.api_rate_limit_endpoints,
+    exempt_superusers=settings.API_RATE_LIMIT_EXEMPT_SUPERUSERS
+)
@@ -0,0 +1,35 @@
+import time
+from typing import Any
+from fastapi.responses import JSONResponse
+from app.core.metrics import RESPONSE_BODY_BYTES, RESPONSE_SERIALIZATION_SECONDS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Resposta JSON padrão da aplicação
+
+    Serializa com orjson (bem mais rápido que json da stdlib em payloads com
+    muitos trechos de texto) e registra, por rota, o tempo de serialização e
+    o tamanho do corpo antes da compressão.
+    """
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        if orjson is not None:
+            body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            body = super().render(content)
+        self.render_seconds = time.perf_counter() - start
+        return body
+
+    async def __call__(self, scope, receive, send) -> None:
+        route = scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        RESPONSE_SERIALIZATION_SECONDS.observe(self.render_seconds, route=route_path)
+        RESPONSE_BODY_BYTES.observe(len(self.body), route=route_path)
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,482 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import logger, request_id_var
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP: SpanKind e StatusCode
+_OTLP_KIND = {"internal": 1, "server": 2, "client": 3}
+_OTLP_STATUS = {"unset": 0, "ok": 1, "error": 2}
+
+
+class SpanContext:
+    """Identificação de um span (local ou recebido via traceparent)"""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+class Span(SpanContext):
+    """Span gravado: nome, duração, atributos e status"""
+
+    __slots__ = ("name", "kind", "parent_id", "attributes", "status", "error", "start_ns", "_start_perf", "end_ns")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        super().__init__(trace_id, _new_id(64), True)
+        self.name = name
+        self.kind = kind
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "unset"
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self._start_perf = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self._start_perf)
+            if self.status == "unset":
+                self.status = "ok"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": datetime.utcfromtimestamp(self.start_ns / 1e9).isoformat(),
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "service": settings.TRACING_SERVICE_NAME,
+            "pid": os.getpid(),
+        }
+
+
+class _NonRecordingSpan(SpanContext):
+    """Span não amostrado: propaga o contexto sem gravar nada"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def set_status(self, status: str) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NonRecordingSpan("0" * 32, "0" * 16, False)
+
+_current_span: ContextVar[Optional[SpanContext]] = ContextVar("current_span", default=None)
+# Quando definido, spans finalizados vão para esta lista em vez do exportador
+# (usado em processos filhos, que devolvem os spans junto com o resultado)
+_span_sink: ContextVar[Optional[list]] = ContextVar("span_sink", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """Lê o header W3C `traceparent`; None se ausente ou inválido"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, sampled=bool(int(flags, 16) & 1))
+
+
+class JsonlSpanExporter:
+    """Grava spans, um JSON por linha, em arquivo local"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[dict]) -> None:
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(span, default=str) + "\n" for span in spans))
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OtlpHttpSpanExporter:
+    """Envia spans para um coletor OTLP/HTTP (JSON) em /v1/traces"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5.0):
+        import httpx
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=timeout)
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _otlp_span(self, span: dict) -> dict:
+        otlp = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": _OTLP_KIND.get(span["kind"], 1),
+            "startTimeUnixNano": str(span["start_ns"]),
+            "endTimeUnixNano": str(span["end_ns"]),
+            "attributes": [self._attribute(k, v) for k, v in span["attributes"].items() if v is not None],
+            "status": {"code": _OTLP_STATUS[span["status"]], "message": span["error"] or ""},
+        }
+        if span["parent_id"]:
+            otlp["parentSpanId"] = span["parent_id"]
+        return otlp
+
+    def export(self, spans: List[dict]) -> None:
+        body = {"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "app"}, "spans": [self._otlp_span(s) for s in spans]}],
+        }]}
+        self._client.post(self.endpoint, json=body).raise_for_status()
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+class BatchSpanProcessor:
+    """
+    Exporta spans em lotes numa thread dedicada
+
+    A fila é limitada: acima de `max_queue`, spans novos são descartados
+    (contados em `dropped`) para não consumir memória sem limite quando o
+    exportador está lento ou fora do ar.
+    """
+
+    def __init__(self, exporter, max_queue: int, batch_size: int, interval: float):
+        self.exporter = exporter
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self.exported = 0
+        self.failures = 0
+        self._queue: Deque[dict] = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: dict) -> None:
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self) -> None:
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            try:
+                self.exporter.export(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.failures += 1
+                self.dropped += len(batch)
+                logger.warning(f"Falha ao exportar {len(batch)} spans: {e}")
+                return
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=10)
+        self.exporter.shutdown()
+
+    def status(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "export_failures": self.failures,
+        }
+
+
+class Tracer:
+    """
+    Tracing distribuído da aplicação
+
+    Responsabilidades:
+    - Criar spans aninhados via contextvars (seguem tasks asyncio e, com
+      `run_in_executor`, threads e processos dos executores)
+    - Amostrar traces novos por `TRACING_SAMPLE_RATIO` e respeitar a decisão
+      de um `traceparent` recebido
+    - Entregar spans finalizados ao BatchSpanProcessor (JSONL ou OTLP)
+
+    Desabilitado, `span()` devolve um span vazio sem alocar nada.
+    """
+
+    def __init__(self, enabled: bool, sample_ratio: float):
+        self.enabled = enabled
+        self.sample_ratio = sample_ratio
+        self._processor: Optional[BatchSpanProcessor] = None
+
+    def start(self) -> None:
+        """Cria o exportador (no worker, depois do fork)"""
+        if not self.enabled or self._processor is not None:
+            return
+        if settings.TRACING_EXPORTER == "otlp":
+            exporter = OtlpHttpSpanExporter(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+        else:
+            exporter = JsonlSpanExporter(settings.TRACING_JSONL_PATH)
+        self._processor = BatchSpanProcessor(
+            exporter,
+            max_queue=settings.TRACING_MAX_QUEUE,
+            batch_size=settings.TRACING_EXPORT_BATCH_SIZE,
+            interval=settings.TRACING_EXPORT_INTERVAL_SECONDS
+        )
+        logger.info(f"Tracing ativo (exportador {settings.TRACING_EXPORTER}, amostragem {self.sample_ratio})")
+
+    def shutdown(self) -> None:
+        if self._processor is not None:
+            self._processor.shutdown()
+            self._processor = None
+
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[SpanContext] = None,
+        require_parent: bool = False,
+        **attributes
+    ):
+        """
+        Cria um span sem torná-lo o span atual (use span() para aninhar)
+
+        `require_parent` evita traces novos para trabalho de fundo (ex:
+        queries do health check de réplicas fora de uma requisição).
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        if parent is None:
+            if require_parent:
+                return _NOOP_SPAN
+            if random.random() >= self.sample_ratio:
+                return _NonRecordingSpan(_new_id(128), _new_id(64), False)
+            return Span(name, kind, _new_id(128), None, attributes)
+        if not parent.sampled:
+            return parent if isinstance(parent, _NonRecordingSpan) else _NonRecordingSpan(
+                parent.trace_id, parent.span_id, False
+            )
+        return Span(name, kind, parent.trace_id, parent.span_id, attributes)
+
+    def end_span(self, span: SpanContext, error: Optional[BaseException] = None) -> None:
+        if not isinstance(span, Span):
+            return
+        if error is not None:
+            span.record_error(error)
+        span.end()
+        sink = _span_sink.get()
+        if sink is not None:
+            sink.append(span.to_dict())
+        elif self._processor is not None:
+            self._processor.on_end(span.to_dict())
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[SpanContext] = None,
+        **attributes
+    ) -> Iterator[SpanContext]:
+        """Span atual durante o bloco; exceções marcam o span com erro"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = self.start_span(name, kind, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def current_span(self) -> Optional[SpanContext]:
+        return _current_span.get()
+
+    def current_traceparent(self) -> Optional[str]:
+        """traceparent do span atual gravado (para propagar a outro processo/serviço)"""
+        span = _current_span.get()
+        return span.traceparent if isinstance(span, Span) else None
+
+    def export_remote(self, spans: List[dict]) -> None:
+        """Exporta spans gravados em outro processo (executor em modo process)"""
+        sink = _span_sink.get()
+        for span in spans:
+            if sink is not None:
+                sink.append(span)
+            elif self._processor is not None:
+                self._processor.on_end(span)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "exporter": settings.TRACING_EXPORTER if self.enabled else None,
+            "sample_ratio": self.sample_ratio,
+            **(self._processor.status() if self._processor is not None else {}),
+        }
+
+
+tracer = Tracer(enabled=settings.TRACING_ENABLED, sample_ratio=settings.TRACING_SAMPLE_RATIO)
+
+
+def run_in_span(name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Executa fn dentro de um span (usado nas threads dos executores)"""
+    with tracer.span(name):
+        return fn(*args, **kwargs)
+
+
+def run_in_child_span(
+    traceparent: Optional[str],
+    request_id: Optional[str],
+    name: str,
+    fn: Callable[..., Any],
+    args: tuple,
+    kwargs: dict
+) -> Tuple[Any, List[dict]]:
+    """
+    Executa fn em processo filho com o contexto da requisição
+
+    Contextvars não atravessam processos: o request_id e o traceparent vêm
+    como argumentos. Retorna (resultado, spans gravados no filho); o
+    processo pai exporta os spans com `tracer.export_remote`.
+    """
+    # O processo filho pode ter herdado do fork o contexto de outra requisição
+    request_id_var.set(request_id)
+    _current_span.set(None)
+    if traceparent is None:
+        return fn(*args, **kwargs), []
+
+    sink: List[dict] = []
+    token = _span_sink.set(sink)
+    try:
+        with tracer.span(name, parent=parse_traceparent(traceparent), pid=os.getpid()):
+            result = fn(*args, **kwargs)
+    finally:
+        _span_sink.reset(token)
+    return result, sink
+
+
+def instrument_query_tracing(engine) -> None:
+    """Span por query executada no engine (só dentro de um trace existente)"""
+    if not tracer.enabled:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span(
+            "db.query",
+            kind="client",
+            require_parent=True,
+            **{"db.statement": statement[:500], "db.engine": engine.url.host or engine.url.drivername}
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            span.set_attribute("db.rows", cursor.rowcount)
+            tracer.end_span(span)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        connection = exception_context.connection
+        spans = connection.info.get("trace_spans") if connection is not None else None
+        if spans:
+            tracer.end_span(spans.pop(), exception_context.original_exception)
+
+
+class _TraceContextFilter(logging.Filter):
+    """Inclui trace_id/span_id do span atual nos registros de log"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = _current_span.get()
+        if isinstance(span, Span):
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        return True
+
+
+if tracer.enabled:
+    for _handler in logging.getLogger().handlers:
+        _handler.addFilter(_TraceContextFilter())
@@ -0,0 +1,138 @@
+import importlib
+import os
+import resource
+import sys
+import time
+from typing import Optional
+from app.core.config import settings
+from app.core.logging import logger
+
+# Variáveis lidas por OpenMP/MKL/OpenBLAS/numexpr na inicialização das libs
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+_process_started_at = time.monotonic()
+_worker_forked_at: Optional[float] = None
+_worker_ready_ms: Optional[float] = None
+
+
+def threads_per_worker(workers: int) -> int:
+    """Threads de torch/BLAS por worker sem sobrecarregar os núcleos"""
+    if settings.WORKER_TORCH_THREADS > 0:
+        return settings.WORKER_TORCH_THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def set_thread_env(threads: int) -> None:
+    """
+    Limita threads das bibliotecas numéricas
+
+    Precisa rodar antes de importar numpy/torch: as variáveis são lidas
+    apenas na inicialização das bibliotecas.
+    """
+    for var in _THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(threads))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def configure_torch_threads(threads: int) -> None:
+    """Aplica o limite de threads no torch já importado (após o fork)"""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    torch.set_num_threads(threads)
+
+
+# Importadas sob demanda pela aplicação; o master as importa antes do fork
+_HEAVY_MODULES = ("sentence_transformers", "PyPDF2", "docx")
+
+
+def preload_heavy_modules() -> float:
+    """
+    Importa dependências pesadas e carrega o modelo de embedding
+
+    Chamado no master antes do fork: as páginas ficam compartilhadas
+    (copy-on-write) entre os workers. Retorna o tempo gasto em ms.
+    """
+    start = time.perf_counter()
+    from app.services.vector_service import get_embedding_model
+
+    for module in _HEAVY_MODULES:
+        importlib.import_module(module)
+
+    if settings.PRELOAD_EMBEDDING_MODEL:
+        get_embedding_model(settings.EMBEDDING_MODEL)
+    return (time.perf_counter() - start) * 1000
+
+
+def mark_worker_forked() -> None:
+    global _worker_forked_at
+    _worker_forked_at = time.monotonic()
+
+
+def mark_worker_ready() -> None:
+    """Registra o fim do startup do worker e loga memória/tempo"""
+    global _worker_ready_ms
+    started_at = _worker_forked_at or _process_started_at
+    _worker_ready_ms = (time.monotonic() - started_at) * 1000
+    memory = memory_usage()
+    logger.info(
+        f"Worker {os.getpid()} pronto em {_worker_ready_ms:.0f} ms "
+        f"(RSS {memory.get('rss_mb')} MB, privado {memory.get('private_mb')} MB)",
+        extra={"worker_pid": os.getpid(), "startup_ms": round(_worker_ready_ms, 1), **memory}
+    )
+
+
+def memory_usage() -> dict:
+    """
+    Memória do processo atual
+
+    No Linux separa páginas compartilhadas (herdadas do master) das
+    privadas; PSS divide as compartilhadas entre os processos que as usam.
+    """
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(":")] = int(parts[1])  # kB
+    except OSError:
+        pass
+
+    if not fields:
+        # Sem /proc: só o pico de RSS (kB no Linux, bytes no macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak //= 1024
+        return {"rss_peak_mb": round(peak / 1024, 1)}
+
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "shared_mb": round(shared / 1024, 1),
+        "private_mb": round(private / 1024, 1),
+    }
+
+
+def worker_status() -> dict:
+    """Identificação, tempo de startup e memória do worker (health check)"""
+    return {
+        "pid": os.getpid(),
+        "startup_ms": round(_worker_ready_ms, 1) if _worker_ready_ms is not None else None,
+        "uptime_s": round(time.monotonic() - (_worker_forked_at or _process_started_at), 1),
+        "torch_threads": _torch_threads(),
+        **memory_usage(),
+    }
+
+
+def _torch_threads() -> Optional[int]:
+    torch = sys.modules.get("torch")
+    return torch.get_num_threads() if torch is not None else None
@@ -2,5 +2,6 @@ from app.db.database import Base
 from app.models.user import User
 from app.models.document import Document
 from app.models.vector_store import VectorStore
+from app.models.summary_cache import SummaryCache
 
 # Importar todos os modelos aqui para o Alembic detectar
@@ -1,19 +1,72 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import settings
-from typing import Generator
+from app.core.metrics import registry
+from app.core.tracing import instrument_query_tracing
+from app.db.pool import instrument_pool, pool_engine_kwargs, pool_status
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Generator, Optional, Union
 
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=False
+    echo=False,
+    **pool_engine_kwargs()
 )
+instrument_pool(engine)
+instrument_query_tracing(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Engine assíncrono (asyncpg), criado apenas se DB_ASYNC_ENABLED
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC_ENABLED:
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        echo=False,
+        **pool_engine_kwargs(async_engine=True)
+    )
+    instrument_pool(async_engine.sync_engine)
+    instrument_query_tracing(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False  # Objetos continuam legíveis após commit (sem lazy load)
+    )
+
+# Sessão aceita pelos repositórios assíncronos
+AnySession = Union[AsyncSession, Session]
+
+def database_pools_status() -> dict:
+    """Métricas dos pools de conexão (health check)"""
+    status = {"sync": pool_status(engine)}
+    if async_engine is not None:
+        status["async"] = pool_status(async_engine.sync_engine)
+    return status
+
+def _collect_pool_metrics():
+    gauges = {
+        "db_pool_checked_out": ("Conexões em uso no pool", "checked_out"),
+        "db_pool_overflow_events_total": ("Conexões criadas acima de pool_size", "overflow_events"),
+        "db_pool_timeouts_total": ("Timeouts aguardando conexão livre", "timeouts"),
+        "db_pool_wait_p95_seconds": ("Espera p95 por conexão (janela recente)", "wait_ms_p95"),
+    }
+    pools = database_pools_status()
+    metrics = []
+    for name, (help, field) in gauges.items():
+        metric_type = "counter" if name.endswith("_total") else "gauge"
+        scale = 1000 if field.endswith("_ms_p95") else 1
+        samples = [({"engine": engine_name}, status.get(field, 0) / scale) for engine_name, status in pools.items()]
+        metrics.append((name, help, metric_type, samples))
+    return metrics
+
+registry.register_collector(_collect_pool_metrics)
+
 def get_db() -> Generator[Session, None, None]:
     """Dependency para obter sessão do banco"""
     db = SessionLocal()
@@ -21,3 +74,31 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+@asynccontextmanager
+async def open_any_session(
+    session_factory: sessionmaker,
+    async_session_factory: Optional[async_sessionmaker] = None
+) -> AsyncIterator[AnySession]:
+    """Abre AsyncSession se houver engine assíncrono, senão Session síncrona"""
+    if async_session_factory is not None:
+        async with async_session_factory() as db:
+            yield db
+        return
+
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AnySession, None]:
+    """
+    Dependency para o caminho de leitura assíncrono
+
+    Com DB_ASYNC_ENABLED retorna AsyncSession (asyncpg); caso contrário
+    retorna Session síncrona, que os repositórios assíncronos executam no
+    executor "db" para não bloquear o event loop.
+    """
+    async with open_any_session(SessionLocal, AsyncSessionLocal) as db:
+        yield db
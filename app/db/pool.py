@@ -0,0 +1,212 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List
+from uuid import uuid4
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class PoolStats:
+    """Métricas acumuladas de um pool de conexões"""
+
+    def __init__(self, window: int = 1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.overflow_events = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.wait_times: Deque[float] = deque(maxlen=window)
+        self.max_wait = 0.0
+        self.checkout_ages: Deque[float] = deque(maxlen=window)
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_times.append(seconds)
+        self.max_wait = max(self.max_wait, seconds)
+
+
+class PoolTelemetryMixin:
+    """
+    Mede o tempo de espera por conexão no pool
+
+    Sobrescreve _do_get (ponto onde o QueuePool bloqueia aguardando uma
+    conexão livre) para registrar espera e timeouts de checkout.
+    """
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            logger.warning("Pool de conexões esgotado: timeout aguardando conexão")
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(PoolTelemetryMixin, QueuePool):
+    """QueuePool com telemetria (engine síncrono)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedAsyncQueuePool(PoolTelemetryMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool com telemetria (engine asyncpg)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def instrument_pool(engine) -> None:
+    """Registra os eventos de conexão que alimentam PoolStats"""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        pool = engine.pool
+        connection_record.info["created_at"] = time.monotonic()
+        pool.stats.connections_created += 1
+        # O QueuePool incrementa overflow antes de criar a conexão extra
+        if pool.overflow() > 0:
+            pool.stats.overflow_events += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool = engine.pool
+        pool.stats.checkouts += 1
+        created_at = connection_record.info.get("created_at")
+        if created_at is not None:
+            pool.stats.checkout_ages.append(time.monotonic() - created_at)
+
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        engine.pool.stats.connections_closed += 1
+
+
+def pool_status(engine) -> dict:
+    """Estado atual e métricas do pool de um engine"""
+    pool = engine.pool
+    stats: PoolStats = getattr(pool, "stats", None)
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    if stats is None:
+        return status
+
+    waits = sorted(stats.wait_times)
+    ages = list(stats.checkout_ages)
+    status.update({
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "overflow_events": stats.overflow_events,
+        "connections_created": stats.connections_created,
+        "connections_closed": stats.connections_closed,
+        "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+        "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+        "wait_ms_max": round(stats.max_wait * 1000, 2),
+        "connection_age_s_avg": round(sum(ages) / len(ages), 1) if ages else 0.0,
+        "connection_age_s_max": round(max(ages), 1) if ages else 0.0,
+    })
+    return status
+
+
+def pool_engine_kwargs(async_engine: bool = False) -> dict:
+    """Parâmetros de pool do engine a partir das configurações"""
+    kwargs = {
+        "poolclass": InstrumentedAsyncQueuePool if async_engine else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    connect_args = {}
+    if settings.DB_PGBOUNCER_MODE and async_engine:
+        # PgBouncer em transaction pooling não preserva prepared statements
+        # entre transações: desativa os caches do asyncpg e do SQLAlchemy.
+        # O dialeto ainda prepara statements nomeados por um contador da
+        # conexão, que se repetem entre conexões do servidor ("prepared
+        # statement already exists"): nomes únicos evitam a colisão.
+        # (psycopg2 não usa prepared statements no servidor.)
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+
+    # Parâmetros da busca ANN definidos na abertura da conexão (sem ida extra
+    # ao servidor por consulta). O PgBouncer recusa parâmetros de startup que
+    # não conhece e a conexão falharia: nesse modo ficam de fora (o aviso sai
+    # em validate_pool_sizing, no startup).
+    server_settings = {} if settings.DB_PGBOUNCER_MODE else vector_search_server_settings()
+    if server_settings:
+        if async_engine:
+            connect_args["server_settings"] = server_settings
+        else:
+            connect_args["options"] = " ".join(f"-c {name}={value}" for name, value in server_settings.items())
+
+    if connect_args:
+        kwargs["connect_args"] = connect_args
+    return kwargs
+
+
+def vector_search_server_settings() -> Dict[str, str]:
+    """ivfflat.probes / hnsw.ef_search configurados (0 = padrão do servidor)"""
+    server_settings = {}
+    if settings.VECTOR_IVFFLAT_PROBES > 0:
+        server_settings["ivfflat.probes"] = str(settings.VECTOR_IVFFLAT_PROBES)
+    if settings.VECTOR_HNSW_EF_SEARCH > 0:
+        server_settings["hnsw.ef_search"] = str(settings.VECTOR_HNSW_EF_SEARCH)
+    return server_settings
+
+
+def validate_pool_sizing(workers: int) -> List[str]:
+    """
+    Verifica se os pools de todos os workers cabem no limite do servidor
+
+    Retorna a lista de problemas encontrados (vazia se estiver ok).
+    """
+    problems = []
+    engines = 2 if settings.DB_ASYNC_ENABLED else 1
+    per_worker = (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW) * engines
+    total = per_worker * workers
+
+    if total > settings.DB_MAX_CONNECTIONS:
+        problems.append(
+            f"{workers} worker(s) x {per_worker} conexões (pool_size + max_overflow, "
+            f"{engines} engine(s)) = {total}, acima de DB_MAX_CONNECTIONS={settings.DB_MAX_CONNECTIONS}"
+        )
+
+    if not settings.DB_ASYNC_ENABLED and settings.DB_EXECUTOR_WORKERS > settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW:
+        problems.append(
+            f"DB_EXECUTOR_WORKERS={settings.DB_EXECUTOR_WORKERS} maior que o pool "
+            f"({settings.DB_POOL_SIZE} + {settings.DB_MAX_OVERFLOW}): threads vão aguardar conexão"
+        )
+
+    ignored = vector_search_server_settings() if settings.DB_PGBOUNCER_MODE else {}
+    if ignored:
+        names = ", ".join(f"{name}={value}" for name, value in ignored.items())
+        problems.append(
+            f"DB_PGBOUNCER_MODE ativo: {names} ignorados (o PgBouncer recusa parâmetros de startup); "
+            f"use ALTER DATABASE ... SET no servidor"
+        )
+
+    return problems
@@ -0,0 +1,251 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.config import settings, to_async_database_url
+from app.core.executors import run_in_executor
+from app.core.logging import logger
+from app.db.database import AnySession, AsyncSessionLocal, SessionLocal, open_any_session
+from app.core.tracing import instrument_query_tracing
+from app.db.pool import instrument_pool, pool_engine_kwargs, pool_status
+
+# Atraso de replicação em segundos (0 no primário ou réplica em dia)
+_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """Réplica de leitura com engines próprios e estado de saúde"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_engine(url, echo=False, **pool_engine_kwargs())
+        instrument_pool(self.engine)
+        instrument_query_tracing(self.engine)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        self.async_engine = None
+        self.async_session_factory = None
+        if settings.DB_ASYNC_ENABLED:
+            self.async_engine = create_async_engine(
+                to_async_database_url(url),
+                echo=False,
+                **pool_engine_kwargs(async_engine=True)
+            )
+            instrument_pool(self.async_engine.sync_engine)
+            instrument_query_tracing(self.async_engine.sync_engine)
+            self.async_session_factory = async_sessionmaker(
+                self.async_engine, autoflush=False, expire_on_commit=False
+            )
+
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+        self.reads = 0
+
+    def check(self) -> float:
+        """Consulta o atraso de replicação (bloqueante, roda no executor "db")"""
+        with self.engine.connect() as conn:
+            return float(conn.execute(_LAG_QUERY).scalar() or 0)
+
+    def status(self) -> dict:
+        status = {
+            "healthy": self.healthy,
+            "lag_seconds": round(self.lag_seconds, 2) if self.lag_seconds is not None else None,
+            "last_error": self.last_error,
+            "reads": self.reads,
+            "pool": pool_status(self.engine),
+        }
+        if self.async_engine is not None:
+            status["async_pool"] = pool_status(self.async_engine.sync_engine)
+        return status
+
+
+class ReplicaRouter:
+    """
+    Roteador de leituras entre réplicas
+
+    Responsabilidades:
+    - Distribuir leituras entre réplicas saudáveis (round-robin)
+    - Verificar periodicamente conectividade e atraso de replicação
+    - Retirar do rodízio réplicas com erro ou atraso acima do limite
+
+    Sem réplicas configuradas (ou nenhuma saudável), as leituras vão ao
+    primário.
+    """
+
+    def __init__(self, urls: List[str], check_interval: float, max_lag: float):
+        self.replicas = [Replica(f"replica-{i + 1}", url) for i, url in enumerate(urls)]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.primary_reads = 0
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        """Próxima réplica saudável, ou None para ler do primário"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        replica = healthy[self._next % len(healthy)]
+        self._next += 1
+        return replica
+
+    def mark_unhealthy(self, replica: Replica, error: str) -> None:
+        if replica.healthy:
+            logger.warning(f"Réplica {replica.name} fora do rodízio: {error}")
+        replica.healthy = False
+        replica.last_error = error
+
+    async def check_all(self) -> None:
+        for replica in self.replicas:
+            try:
+                lag = await run_in_executor("db", replica.check)
+            except Exception as e:
+                replica.lag_seconds = None
+                self.mark_unhealthy(replica, str(e).splitlines()[0])
+                continue
+            finally:
+                replica.last_check = time.time()
+
+            replica.lag_seconds = lag
+            if lag > self.max_lag:
+                self.mark_unhealthy(replica, f"atraso de replicação de {lag:.1f}s")
+            else:
+                if not replica.healthy:
+                    logger.info(f"Réplica {replica.name} de volta ao rodízio")
+                replica.healthy = True
+                replica.last_error = None
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def status(self) -> dict:
+        return {
+            "primary_reads": self.primary_reads,
+            "replicas": {replica.name: replica.status() for replica in self.replicas},
+        }
+
+
+class ReadYourWritesGuard:
+    """
+    Garante que o usuário veja as próprias escritas
+
+    Após um upload/remoção, as leituras do usuário vão ao primário por
+    `window_seconds`, tempo suficiente para a réplica alcançar. Em memória
+    do worker por padrão; com Redis o registro vale para todos os workers.
+    """
+
+    def __init__(self, window_seconds: float, redis_url: Optional[str] = None, max_users: int = 100_000):
+        self.window_seconds = window_seconds
+        self.max_users = max_users
+        self._writes: "OrderedDict[int, float]" = OrderedDict()
+        self._redis = None
+        if redis_url:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "DB_READ_YOUR_WRITES_REDIS_URL configurado, mas o pacote 'redis' não está instalado"
+                ) from e
+            self._redis = redis.from_url(redis_url)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"ryw:{user_id}"
+
+    async def record_write(self, user_id: int) -> None:
+        if self._redis is not None:
+            try:
+                await self._redis.set(self._key(user_id), 1, px=int(self.window_seconds * 1000))
+                return
+            except Exception as e:
+                logger.warning(f"Falha ao registrar escrita no Redis: {e}")
+
+        self._writes[user_id] = time.monotonic() + self.window_seconds
+        self._writes.move_to_end(user_id)
+        while len(self._writes) > self.max_users:
+            self._writes.popitem(last=False)
+
+    async def must_read_primary(self, user_id: int) -> bool:
+        if self._redis is not None:
+            try:
+                return bool(await self._redis.exists(self._key(user_id)))
+            except Exception as e:
+                logger.warning(f"Falha ao consultar escrita no Redis: {e}")
+                return True
+
+        deadline = self._writes.get(user_id)
+        if deadline is None:
+            return False
+        if time.monotonic() >= deadline:
+            self._writes.pop(user_id, None)
+            return False
+        return True
+
+
+replica_router = ReplicaRouter(
+    settings.read_replica_urls_list,
+    check_interval=settings.DB_REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS
+)
+read_your_writes = ReadYourWritesGuard(
+    settings.DB_READ_YOUR_WRITES_SECONDS,
+    redis_url=settings.DB_READ_YOUR_WRITES_REDIS_URL
+)
+
+
+@asynccontextmanager
+async def open_read_session(user_id: int) -> AsyncIterator[AnySession]:
+    """
+    Sessão para consultas somente leitura do usuário
+
+    Usa uma réplica saudável, exceto logo após uma escrita do próprio
+    usuário. Erro de conexão na réplica a retira do rodízio até o próximo
+    health check.
+    """
+    replica = None
+    if replica_router.enabled and not await read_your_writes.must_read_primary(user_id):
+        replica = replica_router.pick()
+
+    if replica is None:
+        replica_router.primary_reads += 1
+        async with open_any_session(SessionLocal, AsyncSessionLocal) as db:
+            yield db
+        return
+
+    replica.reads += 1
+    try:
+        async with open_any_session(replica.session_factory, replica.async_session_factory) as db:
+            yield db
+    except (OperationalError, OSError) as e:
+        replica_router.mark_unhealthy(replica, str(e).splitlines()[0])
+        raise
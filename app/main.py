@@ -1,11 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.middleware.error_handler import error_handler_middleware
-from app.middleware.logging_middleware import logging_middleware
-from app.api.v1 import auth, documents, search, chat
+from app.core.executors import executors_status, shutdown_executors
+from app.core.loop_monitor import loop_lag_monitor
+from app.core.metrics import registry
+from app.core.rate_limit import api_rate_limiter
+from app.core.responses import FastJSONResponse
+from app.core.tracing import tracer
+from app.core.worker import mark_worker_ready, worker_status
+from app.db.database import database_pools_status
+from app.db.pool import validate_pool_sizing
+from app.db.replicas import replica_router
+from app.middleware.compression_middleware import CompressionMiddleware
+from app.middleware.error_handler import ErrorHandlerMiddleware
+from app.middleware.logging_middleware import LoggingMiddleware
+from app.middleware.profiling_middleware import ProfilingMiddleware
+from app.api.v1 import auth, documents, search, chat, admin
+from app.services.vector_service import embedding_model_loaded, ingestion_batcher_status, warm_up_embedding_model
 from app.core.logging import logger
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown da aplicação"""
+    for problem in validate_pool_sizing(settings.WEB_CONCURRENCY):
+        logger.warning(f"Dimensionamento do pool de conexões: {problem}")
+    if settings.LOOP_LAG_MONITOR_ENABLED:
+        loop_lag_monitor.start()
+    replica_router.start()
+    tracer.start()
+    warmup_task = None
+    if settings.EMBEDDING_WARMUP_ENABLED and not embedding_model_loaded():
+        # Não bloqueia o startup: requisições que não usam embeddings já são atendidas
+        warmup_task = asyncio.create_task(warm_up_embedding_model())
+    mark_worker_ready()
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await replica_router.stop()
+    await loop_lag_monitor.stop()
+    shutdown_executors()
+    tracer.shutdown()
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
@@ -29,7 +67,9 @@ app = FastAPI(
     5. Busque com `/api/v1/search/` ou `/api/v1/chat/`
     """,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS
@@ -41,15 +81,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middlewares customizados
-app.middleware("http")(logging_middleware)
-app.middleware("http")(error_handler_middleware)
+# Middlewares customizados (ASGI puro, todos na task da requisição).
+# O último adicionado é o mais externo: logging -> compressão -> erros ->
+# profiling -> CORS, assim respostas de erro também recebem X-Request-ID e
+# linha de acesso
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(ErrorHandlerMiddleware)
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+app.add_middleware(LoggingMiddleware)
 
 # Routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(documents.router, prefix="/api/v1")
 app.include_router(search.router, prefix="/api/v1")
 app.include_router(chat.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 @app.get("/")
 async def root():
@@ -72,9 +119,24 @@ async def health_check():
             "documents": "ok",
             "search": "ok",
             "chat": "configured" if settings.OPENAI_API_KEY or settings.OLLAMA_BASE_URL else "not_configured"
-        }
+        },
+        "event_loop_lag": loop_lag_monitor.stats(),
+        "executors": executors_status(),
+        "database_pool": database_pools_status(),
+        "read_replicas": replica_router.status() if replica_router.enabled else None,
+        "worker": worker_status(),
+        "tracing": tracer.status(),
+        "rate_limit": api_rate_limiter.status(),
+        "embedding_batcher": ingestion_batcher_status(),
+        "embedding_model": "loaded" if embedding_model_loaded() else "not_loaded"
     }
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Métricas no formato de texto do Prometheus (por worker)"""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
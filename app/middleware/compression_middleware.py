@@ -0,0 +1,101 @@
+import gzip
+from app.core.config import settings
+from app.core.metrics import RESPONSE_COMPRESSION_BYTES_TOTAL
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+_COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript")
+
+
+def _accepted_encoding(scope) -> str:
+    """br se o cliente aceita e o pacote brotli está instalado, senão gzip"""
+    for name, value in scope["headers"]:
+        if name == b"accept-encoding":
+            accepted = {part.split(b";")[0].strip() for part in value.lower().split(b",")}
+            if brotli is not None and b"br" in accepted:
+                return "br"
+            if b"gzip" in accepted:
+                return "gzip"
+            return ""
+    return ""
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compressão (brotli ou gzip)
+
+    Responsabilidades:
+    - Comprimir respostas JSON/texto acima de RESPONSE_COMPRESSION_MIN_BYTES
+    - Escolher br quando aceito pelo cliente e disponível, senão gzip
+    - Registrar bytes antes/depois em http_response_compression_bytes_total
+
+    Só comprime respostas de corpo único (JSONResponse e afins); respostas
+    em streaming passam sem alteração para não acumular o corpo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.min_bytes = settings.RESPONSE_COMPRESSION_MIN_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _accepted_encoding(scope)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Segura os headers até ver o corpo
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = start.get("headers", [])
+            if message.get("more_body") or not self._should_compress(headers, body):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            RESPONSE_COMPRESSION_BYTES_TOTAL.inc(len(body), encoding=encoding, stage="original")
+            RESPONSE_COMPRESSION_BYTES_TOTAL.inc(len(compressed), encoding=encoding, stage="compressed")
+            headers = [(k, v) for k, v in headers if k != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, headers, body: bytes) -> bool:
+        if len(body) < self.min_bytes:
+            return False
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(_COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _compress(body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=settings.RESPONSE_COMPRESSION_GZIP_LEVEL)
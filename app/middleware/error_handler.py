@@ -1,49 +1,77 @@
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
 from app.core.exceptions import DocumentAIException
 from app.core.logging import logger
 import traceback
 
-async def error_handler_middleware(request: Request, call_next):
+class ErrorHandlerMiddleware:
     """
-    Middleware para tratamento global de erros
+    Middleware ASGI para tratamento global de erros
 
     Responsabilidades:
     - Capturar exceções não tratadas
     - Log estruturado de erros
     - Resposta padronizada
+
+    Se a exceção acontece depois do início da resposta (streaming), não há
+    como trocar o status: o erro é logado e a exceção segue para o servidor,
+    que encerra a conexão.
     """
-    try:
-        return await call_next(request)
-
-    except DocumentAIException as e:
-        logger.error(
-            f"DocumentAIException: {e.message}",
-            extra={
-                "status_code": e.status_code,
-                "path": request.url.path
-            }
-        )
-        return JSONResponse(
-            status_code=e.status_code,
-            content={
-                "error": e.message,
-                "type": type(e).__name__
-            }
-        )
-
-    except Exception as e:
-        logger.error(
-            f"Unhandled exception: {str(e)}",
-            extra={
-                "path": request.url.path,
-                "traceback": traceback.format_exc()
-            }
-        )
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "error": "Erro interno do servidor",
-                "type": "InternalServerError"
-            }
-        )
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        except DocumentAIException as e:
+            logger.error(
+                f"DocumentAIException: {e.message}",
+                extra={
+                    "status_code": e.status_code,
+                    "path": scope["path"]
+                }
+            )
+            if response_started:
+                raise
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={
+                    "error": e.message,
+                    "type": type(e).__name__
+                },
+                headers=e.headers
+            )
+            await response(scope, receive, send)
+
+        except Exception as e:
+            logger.error(
+                f"Unhandled exception: {str(e)}",
+                extra={
+                    "path": scope["path"],
+                    "traceback": traceback.format_exc()
+                }
+            )
+            if response_started:
+                raise
+            response = JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={
+                    "error": "Erro interno do servidor",
+                    "type": "InternalServerError"
+                }
+            )
+            await response(scope, receive, send)
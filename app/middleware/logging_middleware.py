@@ -1,48 +1,130 @@
-from fastapi import Request
+import random
 import time
-from app.core.logging import logger
+from app.core.config import settings
+from app.core.logging import log_sampled_var, logger, request_id_var
+from app.core.metrics import HTTP_REQUEST_SECONDS
+from app.core.tracing import parse_traceparent, tracer
 import uuid
 
-async def logging_middleware(request: Request, call_next):
+class LoggingMiddleware:
     """
-    Middleware para logging de requisições
+    Middleware ASGI para logging de requisições
 
     Responsabilidades:
-    - Log de cada requisição
+    - Log de cada requisição (uma linha de acesso ou início + fim)
+    - Decidir a amostragem dos logs da requisição (LOG_SAMPLE_RATE)
     - Medir tempo de resposta
-    - Adicionar request_id
+    - Adicionar request_id (propagado aos serviços via contextvar)
+    - Abrir o span raiz do trace, continuando um `traceparent` recebido
+
+    `X-Process-Time` mede até o início da resposta (headers); o log de
+    acesso e a métrica medem até o fim do corpo, o que inclui streaming.
     """
-    request_id = str(uuid.uuid4())
-    request.state.request_id = request_id
-
-    start_time = time.time()
-
-    logger.info(
-        f"Request started",
-        extra={
-            "request_id": request_id,
-            "method": request.method,
-            "path": request.url.path,
-            "client": request.client.host if request.client else None
-        }
-    )
-
-    response = await call_next(request)
-
-    process_time = time.time() - start_time
-
-    logger.info(
-        f"Request completed",
-        extra={
-            "request_id": request_id,
-            "method": request.method,
-            "path": request.url.path,
-            "status_code": response.status_code,
-            "process_time": round(process_time, 3)
-        }
-    )
-
-    response.headers["X-Request-ID"] = request_id
-    response.headers["X-Process-Time"] = str(round(process_time, 3))
-
-    return response
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        request_id_token = request_id_var.set(request_id)
+        sampled_token = None
+        if settings.LOG_SAMPLE_RATE < 1.0:
+            sampled_token = log_sampled_var.set(random.random() < settings.LOG_SAMPLE_RATE)
+
+        start_time = time.time()
+        client = scope["client"][0] if scope.get("client") else None
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        if not settings.LOG_SINGLE_ACCESS_LINE:
+            logger.info(
+                f"Request started",
+                extra={
+                    "request_id": request_id,
+                    "method": method,
+                    "path": path,
+                    "client": client
+                }
+            )
+
+        status_code = 500
+        # Exceção que passou do ErrorHandlerMiddleware: resposta já iniciada
+        # (streaming) e interrompida no meio
+        aborted = False
+
+        try:
+            with tracer.span(
+                f"HTTP {method}",
+                kind="server",
+                parent=parse_traceparent(traceparent),
+                request_id=request_id,
+                **{"http.method": method, "http.target": path}
+            ) as span:
+
+                async def send_wrapper(message):
+                    nonlocal status_code
+                    if message["type"] == "http.response.start":
+                        status_code = message["status"]
+                        headers = list(message.get("headers", []))
+                        headers.append((b"x-request-id", request_id.encode()))
+                        headers.append((b"x-process-time", str(round(time.time() - start_time, 3)).encode()))
+                        if span.sampled:
+                            headers.append((b"x-trace-id", span.trace_id.encode()))
+                        message = {**message, "headers": headers}
+                    await send(message)
+
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                except Exception:
+                    aborted = True
+                    raise
+
+                # Template da rota (ex: /api/v1/documents/{document_id}) para limitar cardinalidade
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"HTTP {method} {route.path}")
+                span.set_attribute("http.route", route.path if route is not None else None)
+                span.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    span.set_status("error")
+        finally:
+            process_time = time.time() - start_time
+            route = scope.get("route")
+
+            HTTP_REQUEST_SECONDS.observe(
+                process_time,
+                method=method,
+                route=route.path if route is not None else "unmatched",
+                status=status_code
+            )
+
+            # Requisição fora da amostra: nem cria o registro (5xx sempre é logado)
+            if log_sampled_var.get() is not False or status_code >= 500 or aborted:
+                logger.info(
+                    f"{method} {path} {status_code}"
+                    if settings.LOG_SINGLE_ACCESS_LINE else "Request completed",
+                    extra={
+                        "request_id": request_id,
+                        "method": method,
+                        "path": path,
+                        "route": route.path if route is not None else None,
+                        "status_code": status_code,
+                        "process_time": round(process_time, 3),
+                        "client": client if settings.LOG_SINGLE_ACCESS_LINE else None,
+                        "aborted": aborted or None
+                    }
+                )
+
+            if sampled_token is not None:
+                log_sampled_var.reset(sampled_token)
+            request_id_var.reset(request_id_token)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from app.core.profiler import RequestSampler, profiling
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI de profiling sob demanda
+
+    Responsabilidades:
+    - Amostrar a requisição quando o admin ativou o profiling e ela traz o
+      header `X-Profile` com a chave correta (ou cai na amostragem 1 a cada N)
+    - Salvar o relatório (pilhas colapsadas) ao final da requisição
+    - Informar o nome do relatório no header `X-Profile-Report`
+
+    É ASGI puro e roda na mesma task do endpoint. Com o profiling
+    desativado, só verifica uma flag (e o arquivo de estado, no máximo uma
+    vez por segundo). O relatório é gravado fora do event loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling.active:
+            await self.app(scope, receive, send)
+            return
+
+        header_value = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                header_value = value.decode("latin-1")
+                break
+        if not profiling.should_profile(header_value):
+            await self.app(scope, receive, send)
+            return
+
+        report_name = profiling.new_report_name(scope["method"])
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-report", report_name.encode("latin-1")),
+                ]
+            await send(message)
+
+        sampler = RequestSampler(
+            asyncio.current_task(),
+            interval=profiling.interval,
+            root=f"{scope['method']} {scope['path']}"
+        )
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            route = scope.get("route")
+            profiling.save(report_name, sampler, {
+                "request_id": scope.get("state", {}).get("request_id"),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route.path if route is not None else None,
+                "status_code": status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
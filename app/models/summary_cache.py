@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class SummaryCache(Base):
+    """
+    Cache de resumos intermediários
+
+    Responsabilidades:
+    - Guardar o resumo de um grupo de trechos pelo hash do conteúdo
+    - Permitir reaproveitar resumos entre execuções e re-uploads
+    """
+    __tablename__ = "summary_cache"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 do modelo + conteúdo
+    model = Column(String, nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<SummaryCache(content_hash={self.content_hash[:12]})>"
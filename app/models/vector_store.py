@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Text, ForeignKey
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 from app.db.database import Base
@@ -21,6 +21,7 @@ class VectorStore(Base):
     # Conteúdo
     chunk_text = Column(Text, nullable=False)  # texto do chunk
     chunk_index = Column(Integer)  # ordem do chunk no documento
+    content_hash = Column(String(64))  # SHA-256 do texto: diff entre versões do documento
 
     # Vector embedding (pgvector)
     embedding = Column(Vector(settings.VECTOR_DIMENSION))
@@ -31,5 +32,9 @@ class VectorStore(Base):
     # Relacionamento
     document = relationship("Document", back_populates="vectors")
 
+    __table_args__ = (
+        Index("ix_vector_store_document_id_content_hash", "document_id", "content_hash"),
+    )
+
     def __repr__(self):
         return f"<VectorStore(id={self.id}, document_id={self.document_id})>"
@@ -0,0 +1,25 @@
+from typing import Callable, TypeVar
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import AnySession
+from app.core.executors import run_in_executor
+
+T = TypeVar("T")
+
+class AsyncRepository:
+    """
+    Base para repositórios assíncronos
+
+    Reaproveita as queries dos repositórios síncronos:
+    - Com AsyncSession (asyncpg), executa via run_sync: o I/O é assíncrono
+    - Com Session síncrona, executa no executor "db", fora do event loop
+    """
+
+    def __init__(self, db: AnySession):
+        self.db = db
+
+    async def _run(self, fn: Callable[[Session], T]) -> T:
+        """Executa fn(sessão_síncrona) sem bloquear o event loop"""
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(fn)
+        return await run_in_executor("db", fn, self.db)
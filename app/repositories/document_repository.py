@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models.document import Document
 from app.schemas.document import DocumentCreate
+from app.repositories.async_repository import AsyncRepository
 
 class DocumentRepository:
     """
@@ -19,6 +20,10 @@ class DocumentRepository:
         """Busca documento por ID"""
         return self.db.query(Document).filter(Document.id == document_id).first()
 
+    def get_for_update(self, document_id: int) -> Optional[Document]:
+        """Busca documento travando a linha (SELECT ... FOR UPDATE) até o fim da transação"""
+        return self.db.query(Document).filter(Document.id == document_id).with_for_update().first()
+
     def get_by_owner(self, owner_id: int, skip: int = 0, limit: int = 100) -> List[Document]:
         """Busca documentos por proprietário"""
         return (
@@ -51,3 +56,12 @@ class DocumentRepository:
     def get_all(self, skip: int = 0, limit: int = 100) -> List[Document]:
         """Lista todos os documentos"""
         return self.db.query(Document).offset(skip).limit(limit).all()
+
+class AsyncDocumentRepository(AsyncRepository):
+    """Versão assíncrona das consultas de Document (ver AsyncRepository)"""
+
+    async def get_by_id(self, document_id: int) -> Optional[Document]:
+        return await self._run(lambda db: DocumentRepository(db).get_by_id(document_id))
+
+    async def get_by_owner(self, owner_id: int, skip: int = 0, limit: int = 100) -> List[Document]:
+        return await self._run(lambda db: DocumentRepository(db).get_by_owner(owner_id, skip, limit))
@@ -0,0 +1,71 @@
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from app.models.summary_cache import SummaryCache
+from app.repositories.async_repository import AsyncRepository
+
+class SummaryCacheRepository:
+    """
+    Repository para o cache de resumos
+
+    Responsabilidades:
+    - Buscar resumo pelo hash do conteúdo
+    - Buscar os resumos de vários hashes numa única consulta
+    - Gravar resumos (idempotente), um a um ou em lote
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """Busca resumo em cache"""
+        entry = self.db.get(SummaryCache, content_hash)
+        return entry.summary if entry else None
+
+    def get_many(self, content_hashes: List[str]) -> Dict[str, str]:
+        """Resumos em cache dos hashes informados (ausentes ficam de fora)"""
+        if not content_hashes:
+            return {}
+        rows = (
+            self.db.query(SummaryCache.content_hash, SummaryCache.summary)
+            .filter(SummaryCache.content_hash.in_(set(content_hashes)))
+            .all()
+        )
+        return {content_hash: summary for content_hash, summary in rows}
+
+    def save(self, content_hash: str, model: str, summary: str) -> None:
+        """Grava resumo no cache (sobrescreve se já existir)"""
+        self.db.merge(SummaryCache(content_hash=content_hash, model=model, summary=summary))
+        self.db.commit()
+
+    def save_many(self, summaries: Dict[str, str], model: str) -> None:
+        """Grava vários resumos num único commit (sobrescreve os existentes)"""
+        if not summaries:
+            return
+        existing = {
+            entry.content_hash: entry
+            for entry in self.db.query(SummaryCache).filter(SummaryCache.content_hash.in_(list(summaries)))
+        }
+        for content_hash, summary in summaries.items():
+            entry = existing.get(content_hash)
+            if entry is None:
+                self.db.add(SummaryCache(content_hash=content_hash, model=model, summary=summary))
+            else:
+                entry.model = model
+                entry.summary = summary
+        self.db.commit()
+
+class AsyncSummaryCacheRepository(AsyncRepository):
+    """Versão assíncrona do cache de resumos (ver AsyncRepository)"""
+
+    async def get_many(self, content_hashes: List[str]) -> Dict[str, str]:
+        return await self._run(lambda db: SummaryCacheRepository(db).get_many(content_hashes))
+
+    async def save_many(self, summaries: Dict[str, str], model: str) -> None:
+        def save(db: Session) -> None:
+            try:
+                SummaryCacheRepository(db).save_many(summaries, model)
+            except Exception:
+                db.rollback()
+                raise
+
+        return await self._run(save)
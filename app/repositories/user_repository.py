@@ -3,6 +3,7 @@ from typing import Optional
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.core.security import get_password_hash
+from app.repositories.async_repository import AsyncRepository
 
 class UserRepository:
     """
@@ -28,12 +29,16 @@ class UserRepository:
         """Busca usuário por username"""
         return self.db.query(User).filter(User.username == username).first()
 
-    def create(self, user_data: UserCreate) -> User:
-        """Cria novo usuário"""
+    def create(self, user_data: UserCreate, hashed_password: Optional[str] = None) -> User:
+        """
+        Cria novo usuário
+
+        hashed_password permite receber o hash já calculado fora do event loop
+        """
         db_user = User(
             email=user_data.email,
             username=user_data.username,
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=hashed_password or get_password_hash(user_data.password),
             is_active=True,
             is_superuser=False
         )
@@ -52,3 +57,21 @@ class UserRepository:
         """Deleta usuário"""
         self.db.delete(user)
         self.db.commit()
+
+class AsyncUserRepository(AsyncRepository):
+    """Versão assíncrona das consultas de User (ver AsyncRepository)"""
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        return await self._run(lambda db: UserRepository(db).get_by_id(user_id))
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self._run(lambda db: UserRepository(db).get_by_email(email))
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        return await self._run(lambda db: UserRepository(db).get_by_username(username))
+
+    async def create(self, user_data: UserCreate, hashed_password: Optional[str] = None) -> User:
+        return await self._run(lambda db: UserRepository(db).create(user_data, hashed_password=hashed_password))
+
+    async def update(self, user: User) -> User:
+        return await self._run(lambda db: UserRepository(db).update(user))
@@ -1,10 +1,16 @@
+import hashlib
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from typing import List, Optional
+from sqlalchemy import delete, select, func, update
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 from app.models.vector_store import VectorStore
 from app.models.document import Document
+from app.repositories.async_repository import AsyncRepository
 import numpy as np
 
+def chunk_content_hash(text: str) -> str:
+    """SHA-256 hex do texto do chunk (igual ao backfill da migration 004)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 class VectorRepository:
     """
     Repository para operações vetoriais
@@ -30,6 +36,7 @@ class VectorRepository:
                 document_id=document_id,
                 chunk_text=chunk,
                 chunk_index=idx,
+                content_hash=chunk_content_hash(chunk),
                 embedding=embedding
             )
             vectors.append(vector)
@@ -90,6 +97,85 @@ class VectorRepository:
             .all()
         )
 
+    def get_chunk_texts(self, document_id: int) -> List[str]:
+        """Busca apenas o texto dos chunks de um documento, em ordem"""
+        rows = self.db.execute(
+            select(VectorStore.chunk_text)
+            .where(VectorStore.document_id == document_id)
+            .order_by(VectorStore.chunk_index)
+        ).scalars().all()
+        return list(rows)
+
+    def get_chunk_hashes(self, document_id: int) -> List[Tuple[int, int, str]]:
+        """(id, chunk_index, content_hash) dos chunks de um documento, em ordem"""
+        rows = self.db.execute(
+            select(VectorStore.id, VectorStore.chunk_index, VectorStore.content_hash)
+            .where(VectorStore.document_id == document_id)
+            .order_by(VectorStore.chunk_index)
+        ).all()
+        missing = [row.id for row in rows if row.content_hash is None]
+        texts: Dict[int, str] = {}
+        if missing:
+            # Linhas sem hash (gravadas antes da coluna existir): calcula a partir do texto
+            texts = dict(self.db.execute(
+                select(VectorStore.id, VectorStore.chunk_text).where(VectorStore.id.in_(missing))
+            ).all())
+        return [
+            (row.id, row.chunk_index, row.content_hash or chunk_content_hash(texts[row.id]))
+            for row in rows
+        ]
+
+    def apply_chunk_diff(
+        self,
+        document_id: int,
+        expected_ids: Set[int],
+        removed_ids: Sequence[int],
+        renumbered: Sequence[Tuple[int, int]],
+        added: Sequence[Tuple[int, str, List[float]]]
+    ) -> bool:
+        """
+        Aplica o diff de chunks de uma nova versão do documento, sem commit
+
+        Trava os chunks do documento (SELECT ... FOR UPDATE) e confere que
+        ainda são `expected_ids`; se outra requisição mudou o documento
+        desde o diff, não altera nada e retorna False.
+
+        Args:
+            removed_ids: chunks que saem
+            renumbered: (id, novo chunk_index) dos chunks mantidos que mudaram de posição
+            added: (chunk_index, texto, embedding) dos chunks novos
+        """
+        current = set(self.db.execute(
+            select(VectorStore.id).where(VectorStore.document_id == document_id).with_for_update()
+        ).scalars().all())
+        if current != expected_ids:
+            return False
+
+        if removed_ids:
+            self.db.execute(
+                delete(VectorStore).where(VectorStore.id.in_(removed_ids)),
+                execution_options={"synchronize_session": False}
+            )
+        if renumbered:
+            # UPDATE em lote por chave primária (executemany)
+            self.db.execute(
+                update(VectorStore),
+                [{"id": vector_id, "chunk_index": index} for vector_id, index in renumbered]
+            )
+        if added:
+            self.db.add_all([
+                VectorStore(
+                    document_id=document_id,
+                    chunk_text=text,
+                    chunk_index=index,
+                    content_hash=chunk_content_hash(text),
+                    embedding=embedding
+                )
+                for index, text, embedding in added
+            ])
+        self.db.flush()
+        return True
+
     def delete_by_document(self, document_id: int) -> None:
         """Deleta todos os vetores de um documento"""
         self.db.query(VectorStore).filter(
@@ -104,3 +190,25 @@ class VectorRepository:
             .filter(VectorStore.document_id == document_id)
             .scalar()
         )
+
+class AsyncVectorRepository(AsyncRepository):
+    """Versão assíncrona das consultas vetoriais (ver AsyncRepository)"""
+
+    async def similarity_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        document_ids: Optional[List[int]] = None,
+        user_id: Optional[int] = None
+    ) -> List[tuple]:
+        return await self._run(
+            lambda db: VectorRepository(db).similarity_search(
+                query_embedding, top_k=top_k, document_ids=document_ids, user_id=user_id
+            )
+        )
+
+    async def get_chunk_texts(self, document_id: int) -> List[str]:
+        return await self._run(lambda db: VectorRepository(db).get_chunk_texts(document_id))
+
+    async def count_by_document(self, document_id: int) -> int:
+        return await self._run(lambda db: VectorRepository(db).count_by_document(document_id))
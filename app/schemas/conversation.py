@@ -0,0 +1,45 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+from app.schemas.search import SearchResult
+
+class ConversationCreate(BaseModel):
+    """Schema para criação de sessão de conversa"""
+    document_ids: Optional[List[int]] = None  # Filtrar documentos em todos os turnos
+    use_context: bool = True
+    max_context_chunks: int = Field(default=3, ge=1, le=10)
+
+class ConversationMessage(BaseModel):
+    """Schema para novo turno da conversa"""
+    query: str = Field(..., min_length=1, max_length=1000)
+
+class ConversationTurn(BaseModel):
+    """Schema de um turno da conversa"""
+    turn_index: int
+    query: str
+    answer: str
+    context_used: List[SearchResult]
+    prefill_tokens: Optional[int] = None  # Tokens de prompt processados neste turno
+    llm_provider: Optional[str] = None  # Backend que respondeu este turno
+    created_at: datetime
+
+class ConversationResponse(BaseModel):
+    """Schema para resposta de sessão de conversa"""
+    session_id: str
+    document_ids: Optional[List[int]] = None
+    use_context: bool
+    max_context_chunks: int
+    llm_provider: str
+    turns: List[ConversationTurn]
+    retrieved_chunk_ids: List[int]
+    total_prefill_tokens: int
+    created_at: datetime
+    last_active_at: datetime
+
+class ConversationStats(BaseModel):
+    """Schema para métricas das sessões de conversa do worker"""
+    active_sessions: int
+    evicted_sessions: int
+    total_turns: int
+    total_prefill_tokens: int
+    avg_prefill_tokens_per_turn: float
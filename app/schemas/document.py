@@ -41,3 +41,31 @@ class DocumentDetail(DocumentResponse):
     """Schema detalhado de documento"""
     content_text: Optional[str] = None
     chunk_count: Optional[int] = None
+
+class DocumentDiffStats(BaseModel):
+    """Estatísticas da reindexação incremental de uma nova versão"""
+    chunks_total: int  # Chunks da nova versão
+    chunks_unchanged: int  # Reaproveitados (mesmo hash), sem novo embedding
+    chunks_added: int
+    chunks_removed: int
+    chunks_renumbered: int  # Mantidos que mudaram de posição
+    embeddings_generated: int
+
+class DocumentVersionResponse(DocumentResponse):
+    """Schema para resposta de nova versão de documento"""
+    updated_at: Optional[datetime] = None
+    diff: DocumentDiffStats
+
+class SummarizeRequest(BaseModel):
+    """Schema para resumo map-reduce de documento"""
+    group_size: Optional[int] = Field(default=None, ge=1, le=20)  # Trechos por resumo parcial
+    reduce_fanout: Optional[int] = Field(default=None, ge=2, le=20)  # Resumos combinados por etapa
+
+class DocumentSummary(BaseModel):
+    """Schema para resposta de resumo de documento"""
+    document_id: int
+    summary: str
+    chunk_count: int
+    levels: int
+    llm_calls: int
+    cache_hits: int
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+from app.core.config import settings
+
+class ProfilingEnable(BaseModel):
+    """Schema para ativar o profiling sob demanda"""
+    sample_every: int = Field(default=settings.PROFILING_SAMPLE_EVERY, ge=0)  # 0 = só via header X-Profile
+    ttl_minutes: int = Field(default=settings.PROFILING_KEY_TTL_MINUTES, ge=1, le=24 * 60)
+
+class ProfilingStatus(BaseModel):
+    """Schema do estado do profiling (compartilhado entre os workers)"""
+    active: bool
+    header_key: Optional[str] = None  # Valor a enviar no header X-Profile
+    sample_every: int
+    expires_at: Optional[datetime] = None
+    interval_ms: float
+    directory: str
+    max_reports: int
+    worker_pid: int  # Worker que atendeu (a contagem de sample_every é por worker)
+
+class ProfileReport(BaseModel):
+    """Schema de um relatório de profiling salvo"""
+    name: str
+    created_at: datetime
+    request_id: Optional[str] = None
+    method: str
+    path: str
+    route: Optional[str] = None
+    status_code: int
+    duration_ms: float
+    samples: int
+    interval_ms: float
+
+class ProfileReportList(BaseModel):
+    """Schema para listagem de relatórios"""
+    reports: List[ProfileReport]
+    total: int
@@ -14,6 +14,7 @@ class SearchResult(BaseModel):
     chunk_text: str
     similarity_score: float
     chunk_index: int
+    chunk_id: Optional[int] = None  # ID do chunk em vector_store
 
 class SearchResponse(BaseModel):
     """Schema para resposta de busca"""
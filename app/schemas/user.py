@@ -35,3 +35,12 @@ class UserResponse(UserBase):
 
     class Config:
         from_attributes = True
+
+class PasswordChange(BaseModel):
+    """Schema para troca de senha"""
+    current_password: str
+    new_password: str = Field(..., min_length=8)
+
+class UserActiveUpdate(BaseModel):
+    """Schema para ativar/desativar usuário"""
+    is_active: bool
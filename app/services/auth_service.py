@@ -1,12 +1,20 @@
-from sqlalchemy.orm import Session
 from typing import Optional
+from app.db.database import AnySession
 from app.models.user import User
-from app.repositories.user_repository import UserRepository
-from app.core.security import verify_password, create_access_token
-from app.core.exceptions import AuthenticationError
+from app.repositories.user_repository import AsyncUserRepository
+from app.core.security import (
+    verify_password,
+    verify_and_update_password,
+    get_password_hash,
+    create_access_token,
+)
+from app.core.executors import run_in_executor
+from app.core.principal_cache import principal_cache
+from app.core.exceptions import AuthenticationError, NotFoundError
 from app.schemas.user import UserCreate
 from datetime import timedelta
 from app.core.config import settings
+from app.core.logging import logger
 
 class AuthService:
     """
@@ -16,21 +24,34 @@ class AuthService:
     - Autenticar usuário
     - Gerar tokens JWT
     - Registrar novos usuários
+
+    Consultas e escritas usam o repositório assíncrono (asyncpg ou executor
+    "db"); bcrypt roda no executor "hashing". Nada bloqueia o event loop.
     """
 
-    def __init__(self, db: Session):
-        self.user_repo = UserRepository(db)
+    def __init__(self, db: AnySession):
+        self.user_repo = AsyncUserRepository(db)
 
-    def authenticate_user(self, username: str, password: str) -> User:
+    async def authenticate_user(self, username: str, password: str) -> User:
         """Autentica usuário e retorna o User object"""
-        user = self.user_repo.get_by_username(username)
+        user = await self.user_repo.get_by_username(username)
 
         if not user:
             raise AuthenticationError("Usuário ou senha incorretos")
 
-        if not verify_password(password, user.hashed_password):
+        # bcrypt é CPU-bound: executor "hashing", fora do event loop
+        valid, new_hash = await run_in_executor(
+            "hashing", verify_and_update_password, password, user.hashed_password
+        )
+        if not valid:
             raise AuthenticationError("Usuário ou senha incorretos")
 
+        # Custo do bcrypt mudou (BCRYPT_ROUNDS): grava o hash refeito
+        if new_hash:
+            user.hashed_password = new_hash
+            user = await self.user_repo.update(user)
+            logger.info(f"Hash de senha atualizado para o custo atual: usuário {user.id}")
+
         if not user.is_active:
             raise AuthenticationError("Usuário inativo")
 
@@ -45,18 +66,48 @@ class AuthService:
         token_data = {
             "sub": user.username,
             "user_id": user.id,
-            "email": user.email
+            "email": user.email,
+            "ver": user.token_version or 0
         }
 
         return create_access_token(token_data, access_token_expires)
 
-    def register_user(self, user_data: UserCreate) -> User:
+    async def register_user(self, user_data: UserCreate) -> User:
         """Registra novo usuário"""
         # Verificar se já existe
-        if self.user_repo.get_by_email(user_data.email):
+        if await self.user_repo.get_by_email(user_data.email):
             raise AuthenticationError("Email já cadastrado")
 
-        if self.user_repo.get_by_username(user_data.username):
+        if await self.user_repo.get_by_username(user_data.username):
             raise AuthenticationError("Username já cadastrado")
 
-        return self.user_repo.create(user_data)
+        hashed_password = await run_in_executor("hashing", get_password_hash, user_data.password)
+        return await self.user_repo.create(user_data, hashed_password=hashed_password)
+
+    async def change_password(self, user_id: int, current_password: str, new_password: str) -> User:
+        """Troca a senha e revoga os tokens emitidos anteriormente"""
+        user = await self.user_repo.get_by_id(user_id)
+        if not user:
+            raise AuthenticationError("Usuário não encontrado")
+
+        if not await run_in_executor("hashing", verify_password, current_password, user.hashed_password):
+            raise AuthenticationError("Senha atual incorreta")
+
+        user.hashed_password = await run_in_executor("hashing", get_password_hash, new_password)
+        return await self._revoke_tokens(user)
+
+    async def set_active(self, user_id: int, is_active: bool) -> User:
+        """Ativa/desativa usuário; desativar revoga os tokens emitidos"""
+        user = await self.user_repo.get_by_id(user_id)
+        if not user:
+            raise NotFoundError("Usuário não encontrado")
+
+        user.is_active = is_active
+        return await self._revoke_tokens(user)
+
+    async def _revoke_tokens(self, user: User) -> User:
+        """Incrementa token_version e invalida o cache do usuário"""
+        user.token_version = (user.token_version or 0) + 1
+        user = await self.user_repo.update(user)
+        await principal_cache.invalidate(user.id)
+        return user
@@ -0,0 +1,93 @@
+from typing import Hashable, Optional
+from app.schemas.search import ChatQuery, ChatResponse
+from app.services.llm_service import LLMService
+from app.services.vector_service import VectorService
+from app.repositories.vector_repository import AsyncVectorRepository
+from app.db.database import AnySession
+from app.db.replicas import open_read_session
+from app.core.concurrency import SingleFlight
+from app.core.config import settings
+
+# Requisições idênticas em andamento compartilham a mesma computação
+_chat_flight = SingleFlight()
+
+class ChatService:
+    """
+    Service para o pipeline de chat (busca + LLM)
+
+    Responsabilidades:
+    - Buscar contexto nos documentos do usuário
+    - Gerar resposta com o LLM
+    - Coalescer requisições idênticas em andamento (single-flight)
+    """
+
+    def __init__(self, db: AnySession):
+        self.db = db
+
+    async def chat(self, chat_query: ChatQuery, user_id: int) -> ChatResponse:
+        """Executa o pipeline de chat, compartilhando requisições idênticas"""
+        if not settings.CHAT_SINGLE_FLIGHT_ENABLED:
+            return await self._run(chat_query, user_id, self.db)
+
+        key = self._flight_key(chat_query, user_id)
+        return await _chat_flight.do(key, lambda: self._run_shared(chat_query, user_id))
+
+    async def _run_shared(self, chat_query: ChatQuery, user_id: int) -> ChatResponse:
+        """
+        Computação compartilhada: abre a própria sessão
+
+        A task continua depois que a requisição que a iniciou termina ou é
+        cancelada (ela é protegida com shield), e a sessão da requisição já
+        estaria fechada.
+        """
+        if not chat_query.use_context:
+            return await self._run(chat_query, user_id, None)
+
+        async with open_read_session(user_id) as db:
+            return await self._run(chat_query, user_id, db)
+
+    @staticmethod
+    def _flight_key(chat_query: ChatQuery, user_id: int) -> Hashable:
+        """Chave de coalescência: escopo do usuário, query e filtros"""
+        document_ids = (
+            tuple(sorted(set(chat_query.document_ids)))
+            if chat_query.document_ids else None
+        )
+        return (
+            user_id,
+            chat_query.query.strip(),
+            document_ids,
+            chat_query.use_context,
+            chat_query.max_context_chunks
+        )
+
+    async def _run(self, chat_query: ChatQuery, user_id: int, db: Optional[AnySession]) -> ChatResponse:
+        """Pipeline completo: contexto + geração"""
+        context_chunks = []
+
+        # 1. Buscar contexto se necessário
+        if chat_query.use_context:
+            vector_service = VectorService()
+            vector_repo = AsyncVectorRepository(db)
+
+            context_chunks = await vector_service.asearch(
+                query=chat_query.query,
+                vector_repo=vector_repo,
+                top_k=chat_query.max_context_chunks,
+                document_ids=chat_query.document_ids,
+                user_id=user_id
+            )
+
+        # 2. Gerar resposta com LLM
+        llm_service = LLMService()
+        answer = await llm_service.generate_answer(
+            query=chat_query.query,
+            context_chunks=context_chunks
+        )
+
+        return ChatResponse(
+            query=chat_query.query,
+            answer=answer,
+            context_used=context_chunks,
+            llm_provider=llm_service.provider_used or llm_service.provider
+        )
@@ -0,0 +1,245 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional, Set
+from app.schemas.conversation import (
+    ConversationCreate,
+    ConversationResponse,
+    ConversationStats,
+    ConversationTurn,
+)
+from app.services.llm_service import LLMService
+from app.services.vector_service import VectorService
+from app.repositories.vector_repository import AsyncVectorRepository
+from app.db.database import AnySession
+from app.core.config import settings
+from app.core.exceptions import NotFoundError, ValidationError
+from app.core.logging import logger
+
+@dataclass
+class ConversationSession:
+    """Estado de uma conversa mantido no servidor"""
+    session_id: str
+    user_id: int
+    document_ids: Optional[List[int]]
+    use_context: bool
+    max_context_chunks: int
+    turns: List[ConversationTurn] = field(default_factory=list)
+    retrieved_chunk_ids: List[int] = field(default_factory=list)
+    llm_context: Optional[List[int]] = None  # Estado de tokens do Ollama
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    last_active_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    last_access: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def seen_chunk_ids(self) -> Set[int]:
+        return set(self.retrieved_chunk_ids)
+
+    @property
+    def total_prefill_tokens(self) -> int:
+        return sum(turn.prefill_tokens or 0 for turn in self.turns)
+
+class ConversationStore:
+    """
+    Armazenamento de sessões em memória com política LRU + TTL
+
+    Responsabilidades:
+    - Guardar sessões ativas do worker
+    - Expirar sessões inativas (TTL) e descartar as menos usadas (LRU)
+    - Acumular métricas de prefill por turno
+
+    Sessões vivem na memória do processo: com múltiplos workers o
+    balanceador precisa de afinidade (sticky sessions).
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self.evicted = 0
+        self.total_turns = 0
+        self.total_prefill_tokens = 0
+
+    def _purge_expired(self) -> None:
+        """Remove sessões expiradas (as mais antigas ficam no início)"""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+            logger.info(f"Sessão de conversa expirada: {session_id}")
+
+    def add(self, session: ConversationSession) -> None:
+        self._purge_expired()
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self.evicted += 1
+            logger.info(f"Sessão de conversa descartada (LRU): {evicted_id}")
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        self._purge_expired()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_access = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def remove(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def record_turn(self, prefill_tokens: Optional[int]) -> None:
+        self.total_turns += 1
+        self.total_prefill_tokens += prefill_tokens or 0
+
+    def stats(self) -> ConversationStats:
+        self._purge_expired()
+        return ConversationStats(
+            active_sessions=len(self._sessions),
+            evicted_sessions=self.evicted,
+            total_turns=self.total_turns,
+            total_prefill_tokens=self.total_prefill_tokens,
+            avg_prefill_tokens_per_turn=(
+                self.total_prefill_tokens / self.total_turns
+                if self.total_turns else 0.0
+            )
+        )
+
+conversation_store = ConversationStore(
+    max_sessions=settings.CHAT_SESSION_MAX_SESSIONS,
+    ttl_seconds=settings.CHAT_SESSION_TTL_MINUTES * 60
+)
+
+class ConversationService:
+    """
+    Service para conversas multi-turno
+
+    Responsabilidades:
+    - Criar e encerrar sessões de conversa
+    - Executar turnos reaproveitando o contexto do LLM entre chamadas
+    - Enviar ao LLM apenas os trechos ainda não vistos na sessão
+    """
+
+    def __init__(self, db: AnySession, store: ConversationStore = conversation_store):
+        self.db = db
+        self.store = store
+        self.llm_service = LLMService()
+
+    def create_session(self, data: ConversationCreate, user_id: int) -> ConversationResponse:
+        """Cria nova sessão de conversa"""
+        session = ConversationSession(
+            session_id=uuid.uuid4().hex,
+            user_id=user_id,
+            document_ids=data.document_ids,
+            use_context=data.use_context,
+            max_context_chunks=data.max_context_chunks
+        )
+        self.store.add(session)
+        logger.info(f"Sessão de conversa criada: {session.session_id}")
+        return self._to_response(session)
+
+    def get_session(self, session_id: str, user_id: int) -> ConversationResponse:
+        """Retorna sessão com verificação de permissão"""
+        return self._to_response(self._get_owned(session_id, user_id))
+
+    def delete_session(self, session_id: str, user_id: int) -> None:
+        """Encerra sessão"""
+        self._get_owned(session_id, user_id)
+        self.store.remove(session_id)
+
+    async def send_message(self, session_id: str, user_id: int, query: str) -> ConversationTurn:
+        """Executa um turno da conversa"""
+        session = self._get_owned(session_id, user_id)
+
+        # Turnos da mesma sessão são sequenciais (o contexto do LLM é encadeado)
+        async with session.lock:
+            if len(session.turns) >= settings.CHAT_SESSION_MAX_TURNS:
+                raise ValidationError(
+                    f"Limite de {settings.CHAT_SESSION_MAX_TURNS} turnos atingido. "
+                    "Inicie uma nova sessão."
+                )
+
+            context_chunks = []
+            if session.use_context:
+                vector_service = VectorService()
+                vector_repo = AsyncVectorRepository(self.db)
+                context_chunks = await vector_service.asearch(
+                    query=query,
+                    vector_repo=vector_repo,
+                    top_k=session.max_context_chunks,
+                    document_ids=session.document_ids,
+                    user_id=user_id
+                )
+
+            # Com estado de contexto, só os trechos novos vão para o LLM
+            prompt_chunks = context_chunks
+            if self.llm_service.supports_session_context and session.llm_context:
+                seen = session.seen_chunk_ids
+                prompt_chunks = [c for c in context_chunks if c.chunk_id not in seen]
+
+            result = await self.llm_service.generate_turn(
+                query=query,
+                context_chunks=prompt_chunks,
+                llm_context=session.llm_context
+            )
+
+            session.llm_context = result.context
+            seen = session.seen_chunk_ids
+            for chunk in context_chunks:
+                if chunk.chunk_id is not None and chunk.chunk_id not in seen:
+                    session.retrieved_chunk_ids.append(chunk.chunk_id)
+                    seen.add(chunk.chunk_id)
+
+            turn = ConversationTurn(
+                turn_index=len(session.turns),
+                query=query,
+                answer=result.answer,
+                context_used=context_chunks,
+                prefill_tokens=result.prompt_tokens,
+                llm_provider=result.provider or self.llm_service.provider,
+                created_at=datetime.now(timezone.utc)
+            )
+            session.turns.append(turn)
+            session.last_active_at = turn.created_at
+            self.store.record_turn(result.prompt_tokens)
+
+            logger.info(
+                f"Turno {turn.turn_index} da sessão {session_id}: "
+                f"{len(prompt_chunks)} trechos novos, prefill={result.prompt_tokens} tokens",
+                extra={
+                    "session_id": session_id,
+                    "turn_index": turn.turn_index,
+                    "prefill_tokens": result.prompt_tokens
+                }
+            )
+            return turn
+
+    def stats(self) -> ConversationStats:
+        """Métricas das sessões do worker"""
+        return self.store.stats()
+
+    def _get_owned(self, session_id: str, user_id: int) -> ConversationSession:
+        session = self.store.get(session_id)
+        if session is None or session.user_id != user_id:
+            raise NotFoundError("Sessão de conversa não encontrada ou expirada")
+        return session
+
+    def _to_response(self, session: ConversationSession) -> ConversationResponse:
+        return ConversationResponse(
+            session_id=session.session_id,
+            document_ids=session.document_ids,
+            use_context=session.use_context,
+            max_context_chunks=session.max_context_chunks,
+            llm_provider=self.llm_service.provider,
+            turns=session.turns,
+            retrieved_chunk_ids=session.retrieved_chunk_ids,
+            total_prefill_tokens=session.total_prefill_tokens,
+            created_at=session.created_at,
+            last_active_at=session.last_active_at
+        )
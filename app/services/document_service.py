@@ -1,18 +1,35 @@
 import os
 import shutil
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Set, Tuple
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 from app.models.document import Document
 from app.repositories.document_repository import DocumentRepository
-from app.repositories.vector_repository import VectorRepository
+from app.repositories.vector_repository import VectorRepository, chunk_content_hash
 from app.schemas.document import DocumentCreate
 from app.utils.file_validator import FileValidator
 from app.utils.text_extractor import TextExtractor
-from app.utils.text_chunker import TextChunker
-from app.services.vector_service import VectorService
+from app.services.vector_service import VectorService, chunk_document
 from app.core.config import settings
-from app.core.exceptions import FileUploadError, NotFoundError
+from app.core.exceptions import ConflictError, FileUploadError, NotFoundError, ServiceOverloadedError
 from app.core.logging import logger
+from app.core.executors import check_bulk_admission, run_in_executor
+from app.core.metrics import DOCUMENT_CHUNKS_TOTAL, stage_timer
+
+@dataclass
+class IngestedFile:
+    """Arquivo salvo, extraído e dividido em chunks, ainda fora do banco"""
+    filename: str
+    original_filename: str
+    file_path: str
+    file_size: int
+    file_type: str
+    text: str
+    page_count: int
+    word_count: int
+    chunks: List[str]
 
 class DocumentService:
     """
@@ -20,6 +37,7 @@ class DocumentService:
 
     Responsabilidades:
     - Upload de documentos
+    - Novas versões com reindexação incremental (diff de chunks)
     - Processamento (extração, chunking, vetorização)
     - Gestão de documentos
     """
@@ -45,57 +63,37 @@ class DocumentService:
         6. Salva no banco
         """
         try:
-            # 1. Validar arquivo
-            extension, original_filename = FileValidator.validate_file(file)
-            safe_filename = FileValidator.generate_safe_filename(
-                original_filename, user_id
-            )
-
-            # 2. Criar diretório se não existir
-            os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-            file_path = os.path.join(settings.UPLOAD_DIR, safe_filename)
-
-            # 3. Salvar arquivo
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            file_size = os.path.getsize(file_path)
-
-            logger.info(f"Arquivo salvo: {file_path}")
-
-            # 4. Extrair texto
-            text_content, page_count, word_count = TextExtractor.extract_text(
-                file_path, extension
-            )
-
-            logger.info(f"Texto extraído: {word_count} palavras, {page_count} páginas")
-
-            # 5. Dividir em chunks
-            chunks = TextChunker.chunk_text(text_content)
-            logger.info(f"Documento dividido em {len(chunks)} chunks")
+            ingested = await self._ingest_file(file, user_id)
+            file_path = ingested.file_path
 
             # 6. Criar documento no banco
             document_data = DocumentCreate(
-                filename=safe_filename,
-                original_filename=original_filename,
-                file_path=file_path,
-                file_size=file_size,
-                file_type=extension,
-                content_text=text_content,
-                page_count=page_count,
-                word_count=word_count,
+                filename=ingested.filename,
+                original_filename=ingested.original_filename,
+                file_path=ingested.file_path,
+                file_size=ingested.file_size,
+                file_type=ingested.file_type,
+                content_text=ingested.text,
+                page_count=ingested.page_count,
+                word_count=ingested.word_count,
                 owner_id=user_id
             )
 
-            document = self.doc_repo.create(document_data)
-            logger.info(f"Documento criado no banco: ID {document.id}")
+            # Escritas no executor "db", fora do event loop
+            with stage_timer("upload", "db_document"):
+                document_id = await run_in_executor("db", self._create_document, document_data)
+            logger.info(f"Documento criado no banco: ID {document_id}")
 
             # 7. Gerar embeddings
-            embeddings = self.vector_service.generate_embeddings(chunks)
+            with stage_timer("upload", "embedding"):
+                embeddings = await self.vector_service.agenerate_embeddings(ingested.chunks, priority="bulk")
             logger.info(f"Embeddings gerados para {len(embeddings)} chunks")
 
             # 8. Salvar vetores no banco
-            self.vector_repo.create_batch(document.id, chunks, embeddings)
+            with stage_timer("upload", "db_vectors"):
+                document = await run_in_executor(
+                    "db", self._save_vectors, document_id, ingested.chunks, embeddings
+                )
             logger.info(f"Vetores salvos no banco")
 
             # VOCÊ INTEGRA: Notificar N8n sobre novo documento
@@ -107,9 +105,215 @@ class DocumentService:
             # Limpar arquivo se houver erro
             if 'file_path' in locals() and os.path.exists(file_path):
                 os.remove(file_path)
+            if isinstance(e, ServiceOverloadedError):
+                raise
             logger.error(f"Erro no upload: {str(e)}")
             raise FileUploadError(f"Erro ao processar arquivo: {str(e)}")
 
+    def _create_document(self, document_data: DocumentCreate) -> int:
+        """Cria o documento e encerra a transação aberta pelo refresh (não segura conexão durante os embeddings)"""
+        document_id = self.doc_repo.create(document_data).id
+        self.db.rollback()
+        return document_id
+
+    def _save_vectors(self, document_id: int, chunks: List[str], embeddings: List[List[float]]) -> Document:
+        """Grava os vetores e retorna o documento já carregado (sem lazy load no event loop)"""
+        self.vector_repo.create_batch(document_id, chunks, embeddings)
+        return self.doc_repo.get_by_id(document_id)
+
+    async def update_document(
+        self,
+        document_id: int,
+        file: UploadFile,
+        user_id: int
+    ) -> Tuple[Document, dict]:
+        """
+        Substitui o documento por uma nova versão, reindexando só o que mudou
+
+        1. Processa o arquivo como no upload (validação, extração, chunking)
+        2. Compara os chunks novos com os gravados pelo hash do conteúdo
+        3. Vetoriza e insere só os chunks novos, remove os que saíram e
+           renumera chunk_index dos mantidos, numa única transação
+        4. Atualiza os metadados do documento e troca o arquivo em disco
+
+        Chunks repetidos no documento são pareados um a um, na ordem.
+
+        Returns:
+            (documento, estatísticas do diff)
+        """
+        # Permissão e hashes atuais numa leitura curta no executor "db"; a
+        # transação termina antes da extração e dos embeddings
+        existing = await run_in_executor("db", self._load_chunk_hashes, document_id, user_id)
+        try:
+            ingested = await self._ingest_file(file, user_id)
+            file_path = ingested.file_path
+
+            with stage_timer("reindex", "diff"):
+                available: Dict[str, Deque[Tuple[int, int]]] = defaultdict(deque)
+                for vector_id, index, content_hash in existing:
+                    available[content_hash].append((vector_id, index))
+
+                renumbered: List[Tuple[int, int]] = []
+                added_positions: List[int] = []
+                for index, chunk in enumerate(ingested.chunks):
+                    matches = available.get(chunk_content_hash(chunk))
+                    if matches:
+                        vector_id, old_index = matches.popleft()
+                        if old_index != index:
+                            renumbered.append((vector_id, index))
+                    else:
+                        added_positions.append(index)
+                removed_ids = [vector_id for matches in available.values() for vector_id, _ in matches]
+
+            new_chunks = [ingested.chunks[index] for index in added_positions]
+            with stage_timer("reindex", "embedding"):
+                embeddings = await self.vector_service.agenerate_embeddings(new_chunks, priority="bulk")
+
+            with stage_timer("reindex", "db_vectors"):
+                document, old_file_path = await run_in_executor(
+                    "db",
+                    self._write_version,
+                    document_id,
+                    user_id,
+                    ingested,
+                    {vector_id for vector_id, _, _ in existing},
+                    removed_ids,
+                    renumbered,
+                    [(index, ingested.chunks[index], embedding) for index, embedding in zip(added_positions, embeddings)]
+                )
+
+        except Exception as e:
+            if 'file_path' in locals() and os.path.exists(file_path):
+                os.remove(file_path)
+            if isinstance(e, (ServiceOverloadedError, ConflictError, NotFoundError)):
+                raise
+            logger.error(f"Erro ao atualizar documento {document_id}: {str(e)}")
+            raise FileUploadError(f"Erro ao processar arquivo: {str(e)}")
+
+        if old_file_path != document.file_path and os.path.exists(old_file_path):
+            os.remove(old_file_path)
+
+        stats = {
+            "chunks_total": len(ingested.chunks),
+            "chunks_unchanged": len(ingested.chunks) - len(added_positions),
+            "chunks_added": len(added_positions),
+            "chunks_removed": len(removed_ids),
+            "chunks_renumbered": len(renumbered),
+            "embeddings_generated": len(embeddings)
+        }
+        logger.info(
+            f"Documento {document_id} reindexado: {stats['chunks_added']} chunks novos, "
+            f"{stats['chunks_removed']} removidos, {stats['chunks_unchanged']} mantidos"
+        )
+        return document, stats
+
+    def _load_chunk_hashes(self, document_id: int, user_id: int) -> List[Tuple[int, int, str]]:
+        """Confere a permissão e lê os hashes dos chunks, encerrando a transação"""
+        try:
+            self.get_document(document_id, user_id)
+            return self.vector_repo.get_chunk_hashes(document_id)
+        finally:
+            self.db.rollback()
+
+    def _write_version(
+        self,
+        document_id: int,
+        user_id: int,
+        ingested: IngestedFile,
+        expected_ids: Set[int],
+        removed_ids: List[int],
+        renumbered: List[Tuple[int, int]],
+        added: List[Tuple[int, str, List[float]]]
+    ) -> Tuple[Document, str]:
+        """
+        Aplica o diff e os metadados da nova versão numa única transação
+
+        Returns:
+            (documento atualizado e carregado, caminho do arquivo anterior)
+        """
+        try:
+            # Trava o documento: versões simultâneas do mesmo documento são serializadas
+            document = self.doc_repo.get_for_update(document_id)
+            if not document or document.owner_id != user_id:
+                raise NotFoundError("Documento não encontrado")
+            if not self.vector_repo.apply_chunk_diff(document_id, expected_ids, removed_ids, renumbered, added):
+                raise ConflictError("Documento alterado por outra requisição. Envie a nova versão novamente")
+
+            old_file_path = document.file_path
+            document.filename = ingested.filename
+            document.original_filename = ingested.original_filename
+            document.file_path = ingested.file_path
+            document.file_size = ingested.file_size
+            document.file_type = ingested.file_type
+            document.content_text = ingested.text
+            document.page_count = ingested.page_count
+            document.word_count = ingested.word_count
+            return self.doc_repo.update(document), old_file_path
+        except Exception:
+            self.db.rollback()
+            raise
+
+    async def _ingest_file(self, file: UploadFile, user_id: int) -> "IngestedFile":
+        """
+        Valida, salva, extrai e divide o arquivo em chunks (sem tocar no banco)
+
+        Em caso de erro o arquivo salvo é removido; depois do retorno, a
+        limpeza de `file_path` fica com o chamador.
+        """
+        # Consultas acima da meta de latência: recusa ingestão (503) antes de gastar CPU
+        check_bulk_admission("embedding")
+
+        # 1. Validar arquivo
+        with stage_timer("upload", "validation"):
+            extension, original_filename = FileValidator.validate_file(file)
+            safe_filename = FileValidator.generate_safe_filename(
+                original_filename, user_id
+            )
+
+        # 2. Criar diretório se não existir
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        file_path = os.path.join(settings.UPLOAD_DIR, safe_filename)
+
+        try:
+            # 3. Salvar arquivo
+            with stage_timer("upload", "save_file"):
+                with open(file_path, "wb") as buffer:
+                    shutil.copyfileobj(file.file, buffer)
+
+            file_size = os.path.getsize(file_path)
+
+            logger.info(f"Arquivo salvo: {file_path}")
+
+            # 4. Extrair texto (CPU: executor dedicado, fora do event loop)
+            with stage_timer("upload", "extraction"):
+                text_content, page_count, word_count = await run_in_executor(
+                    "extraction", TextExtractor.extract_text, file_path, extension
+                )
+
+            logger.info(f"Texto extraído: {word_count} palavras, {page_count} páginas")
+
+            # 5. Dividir em chunks
+            with stage_timer("upload", "chunking"):
+                chunks = await run_in_executor("extraction", chunk_document, text_content)
+            DOCUMENT_CHUNKS_TOTAL.inc(len(chunks))
+            logger.info(f"Documento dividido em {len(chunks)} chunks")
+        except Exception:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+
+        return IngestedFile(
+            filename=safe_filename,
+            original_filename=original_filename,
+            file_path=file_path,
+            file_size=file_size,
+            file_type=extension,
+            text=text_content,
+            page_count=page_count,
+            word_count=word_count,
+            chunks=chunks
+        )
+
     async def _notify_n8n(self, document: Document, user_id: int):
         """
         VOCÊ INTEGRA: Envia notificação para N8n quando documento é criado
@@ -182,8 +386,12 @@ class DocumentService:
         """Lista documentos do usuário"""
         return self.doc_repo.get_by_owner(user_id, skip, limit)
 
-    def delete_document(self, document_id: int, user_id: int):
-        """Deleta documento e seus vetores"""
+    async def delete_document(self, document_id: int, user_id: int):
+        """Deleta documento e seus vetores (no executor "db", fora do event loop)"""
+        await run_in_executor("db", self._delete_document, document_id, user_id)
+
+    def _delete_document(self, document_id: int, user_id: int):
+        """Remoção síncrona: arquivo físico + linha do documento"""
         document = self.get_document(document_id, user_id)
 
         # Deletar arquivo físico
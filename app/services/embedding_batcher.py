@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import time
+from typing import Callable, List, Optional
+from app.core.executors import run_with_priority
+from app.core.logging import logger, request_id_var
+
+Encoder = Callable[[List[str]], List[List[float]]]
+
+
+class _BatchRequest:
+    """Trechos de um documento aguardando embeddings"""
+
+    __slots__ = ("texts", "vectors", "remaining", "submitted", "future", "request_id")
+
+    def __init__(self, texts: List[str], future: asyncio.Future, request_id: Optional[str]):
+        self.texts = texts
+        self.vectors: List[Optional[List[float]]] = [None] * len(texts)
+        self.remaining = len(texts)
+        self.submitted = 0  # Trechos já entregues a alguma rodada
+        self.future = future
+        self.request_id = request_id
+
+
+class EmbeddingBatcher:
+    """
+    Agrupamento de embeddings da ingestão entre documentos
+
+    Responsabilidades:
+    - Juntar os trechos de todos os uploads pendentes numa rodada de até
+      `max_round_chunks` trechos, dividida igualmente entre os documentos
+    - Ordenar a rodada por tamanho e formar lotes de `batch_size`
+    - Codificar os lotes no executor "embedding" com prioridade "bulk"
+    - Devolver a cada documento seus vetores, na ordem original
+    - Medir vazão (trechos/s) e eficiência de padding por rodada
+
+    Uma rodada começa quando chega o primeiro documento e espera até
+    `max_wait_ms` por outros (ou até juntar um lote cheio). Um documento
+    grande é dividido entre rodadas: um upload pequeno que chega depois
+    entra na rodada seguinte com sua parte, sem esperar o grande terminar.
+
+    O ganho vem de lotes cheios em vez de um lote pequeno por documento
+    (menos custo fixo por lote), não de menos padding: lotes por documento
+    de um único trecho não têm padding, então a eficiência de padding cai.
+    A ordenação só reduz o padding quando a rodada mistura trechos de
+    tamanhos diferentes em vários lotes.
+
+    As rodadas rodam numa task com contexto limpo: spans e logs do encode
+    não herdam o request_id/trace do upload que iniciou a task. O log de
+    cada rodada lista os request_ids dos documentos atendidos.
+    """
+
+    def __init__(
+        self,
+        encode: Encoder,
+        batch_size: int,
+        max_wait_ms: float,
+        max_round_chunks: int = 256,
+        length: Callable[[str], int] = len
+    ):
+        self.encode = encode
+        self.batch_size = max(1, batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.max_round_chunks = max(self.batch_size, max_round_chunks)
+        self.length = length
+        self._queue: List[_BatchRequest] = []
+        self._queued_chunks = 0
+        self._drainer: Optional[asyncio.Task] = None
+        self._full = asyncio.Event()
+        self.rounds = 0
+        self.last_round: dict = {}
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Gera os embeddings de `texts` nas próximas rodadas"""
+        if not texts:
+            return []
+
+        request = _BatchRequest(texts, asyncio.get_running_loop().create_future(), request_id_var.get())
+        self._queue.append(request)
+        self._queued_chunks += len(texts)
+        if self._queued_chunks >= self.batch_size:
+            self._full.set()
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain(), context=contextvars.Context())
+        return await request.future
+
+    async def _drain(self) -> None:
+        while self._queue:
+            if self._queued_chunks < self.batch_size and self.max_wait_ms > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+
+            items = self._take_round()
+            self._full.clear()
+            if self._queued_chunks >= self.batch_size:
+                self._full.set()
+            try:
+                await self._run_round(items)
+            except BaseException as e:
+                for request in {id(item[1]): item[1] for item in items}.values():
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+
+    def _take_round(self) -> List[tuple]:
+        """Até max_round_chunks trechos, em partes iguais por documento na fila"""
+        # Documentos cancelados (cliente desconectou) saem da fila
+        for request in self._queue:
+            if request.future.done():
+                self._queued_chunks -= len(request.texts) - request.submitted
+        self._queue = [request for request in self._queue if not request.future.done()]
+
+        items = []
+        budget = self.max_round_chunks
+        while budget > 0 and self._queue:
+            share = max(1, budget // len(self._queue))
+            for request in self._queue:
+                take = min(share, budget, len(request.texts) - request.submitted)
+                for index in range(request.submitted, request.submitted + take):
+                    items.append((self.length(request.texts[index]), request, index))
+                request.submitted += take
+                budget -= take
+            self._queue = [request for request in self._queue if request.submitted < len(request.texts)]
+        self._queued_chunks -= len(items)
+        return items
+
+    async def _run_round(self, items: List[tuple]) -> None:
+        start = time.perf_counter()
+        items.sort(key=lambda item: item[0])
+        requests = {id(item[1]): item[1] for item in items}
+
+        chunks = batches = useful = padded = 0
+        for offset in range(0, len(items), self.batch_size):
+            batch = [item for item in items[offset:offset + self.batch_size] if not item[1].future.done()]
+            if not batch:
+                continue
+
+            vectors = await run_with_priority(
+                "embedding", "bulk", self.encode, [item[1].texts[item[2]] for item in batch]
+            )
+            for (_, request, index), vector in zip(batch, vectors):
+                request.vectors[index] = vector
+                request.remaining -= 1
+                if request.remaining == 0 and not request.future.done():
+                    request.future.set_result(request.vectors)
+
+            chunks += len(batch)
+            batches += 1
+            useful += sum(item[0] for item in batch)
+            padded += batch[-1][0] * len(batch)
+
+        elapsed = time.perf_counter() - start
+        self.rounds += 1
+        self.last_round = {
+            "documents": len(requests),
+            "chunks": chunks,
+            "batches": batches,
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": round(chunks / elapsed, 1) if elapsed > 0 else None,
+            "padding_efficiency": round(useful / padded, 3) if padded else None
+        }
+        logger.info(
+            f"Embeddings da ingestão: {chunks} trechos de {len(requests)} documentos em {batches} lotes, "
+            f"{elapsed * 1000:.0f} ms ({self.last_round['chunks_per_second']} trechos/s)",
+            extra={"request_ids": [request.request_id for request in requests.values() if request.request_id]}
+        )
+
+    def status(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_round_chunks": self.max_round_chunks,
+            "queued_documents": len(self._queue),
+            "queued_chunks": self._queued_chunks,
+            "rounds": self.rounds,
+            "last_round": self.last_round
+        }
@@ -0,0 +1,267 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+import httpx
+from app.core.config import settings
+from app.core.exceptions import LLMUnavailableError
+from app.core.logging import logger
+from app.core.tracing import tracer
+
+class CircuitBreaker:
+    """
+    Circuit breaker por backend
+
+    Estados:
+    - closed: tráfego normal
+    - open: backend ignorado até o fim do cooldown
+    - half_open: uma única requisição de teste é liberada
+    """
+
+    def __init__(self, min_requests: int, error_rate: float, cooldown: float):
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def on_result(self, success: bool, outcomes: Deque[bool]) -> None:
+        if self.state == "half_open":
+            self._probe_in_flight = False
+            if success:
+                self.state = "closed"
+                outcomes.clear()
+            else:
+                self._open()
+            return
+
+        if self.state == "closed" and len(outcomes) >= self.min_requests:
+            failures = outcomes.count(False)
+            if failures / len(outcomes) >= self.error_rate:
+                self._open()
+
+    def release_probe(self) -> None:
+        """Libera o teste half-open quando a requisição foi cancelada"""
+        self._probe_in_flight = False
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.opened_at = time.monotonic()
+
+    @property
+    def retry_after(self) -> int:
+        remaining = self.cooldown - (time.monotonic() - self.opened_at)
+        return max(1, math.ceil(remaining))
+
+class LLMBackend:
+    """
+    Backend de LLM compatível com a API do Ollama
+
+    Responsabilidades:
+    - Executar /api/generate
+    - Manter latência e taxa de erro em janela deslizante
+    - Controlar o circuit breaker do backend
+    """
+
+    def __init__(self, name: str, base_url: str, model: str):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.latencies: Deque[float] = deque(maxlen=settings.LLM_STATS_WINDOW)
+        self.outcomes: Deque[bool] = deque(maxlen=settings.LLM_STATS_WINDOW)
+        self.breaker = CircuitBreaker(
+            min_requests=settings.LLM_BREAKER_MIN_REQUESTS,
+            error_rate=settings.LLM_BREAKER_ERROR_RATE,
+            cooldown=settings.LLM_BREAKER_COOLDOWN_SECONDS
+        )
+
+    async def generate(self, payload: dict) -> dict:
+        """Chama /api/generate registrando latência e resultado"""
+        timeout = httpx.Timeout(
+            settings.LLM_REQUEST_TIMEOUT_SECONDS,
+            connect=settings.LLM_CONNECT_TIMEOUT_SECONDS
+        )
+        start = time.perf_counter()
+        try:
+            with tracer.span("llm.generate", kind="client", backend=self.name, model=self.model) as span:
+                headers = {"traceparent": span.traceparent} if span.sampled else None
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    response = await client.post(
+                        f"{self.base_url}/api/generate",
+                        json={**payload, "model": self.model},
+                        headers=headers
+                    )
+                    response.raise_for_status()
+                    result = response.json()
+                span.set_attribute("llm.prompt_tokens", result.get("prompt_eval_count"))
+                span.set_attribute("llm.completion_tokens", result.get("eval_count"))
+        except asyncio.CancelledError:
+            # Perdedor de um hedge: não conta como falha
+            if self.breaker.state == "half_open":
+                self.breaker.release_probe()
+            raise
+        except Exception:
+            self._record(False)
+            raise
+
+        self.latencies.append(time.perf_counter() - start)
+        self._record(True)
+        return result
+
+    def _record(self, success: bool) -> None:
+        self.outcomes.append(success)
+        previous = self.breaker.state
+        self.breaker.on_result(success, self.outcomes)
+        if self.breaker.state != previous:
+            logger.warning(
+                f"Circuit breaker do backend {self.name}: {previous} -> {self.breaker.state}"
+            )
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil de latência na janela (None sem amostras)"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(math.ceil(p * len(ordered))) - 1)
+        return ordered[max(index, 0)]
+
+    def hedge_delay(self) -> float:
+        """Atraso antes do hedge: p95 observado ou o default configurado"""
+        if len(self.latencies) < settings.LLM_BREAKER_MIN_REQUESTS:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return self.percentile(0.95)
+
+    def status(self) -> dict:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "state": self.breaker.state,
+            "requests": len(self.outcomes),
+            "error_rate": (
+                round(self.outcomes.count(False) / len(self.outcomes), 3)
+                if self.outcomes else 0.0
+            ),
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+        }
+
+class LLMRouter:
+    """
+    Roteador entre múltiplos backends de LLM
+
+    Responsabilidades:
+    - Escolher backends disponíveis em ordem de preferência
+    - Failover para o próximo backend em caso de erro
+    - Hedge opcional quando o backend principal passa do seu p95
+    - Falhar rápido (503) quando todos os circuitos estão abertos
+    """
+
+    def __init__(self, backends: List[LLMBackend], hedge_enabled: bool = False):
+        self.backends = backends
+        self.hedge_enabled = hedge_enabled
+
+    async def generate(self, payload: dict) -> Tuple[dict, str]:
+        """
+        Executa a geração no primeiro backend saudável
+        Retorna: (resposta_json, nome_do_backend_que_respondeu)
+        """
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+
+        while True:
+            candidates = [b for b in self.backends if b.name not in tried]
+            primary = self._acquire(candidates)
+            if primary is None:
+                break
+
+            secondary = None
+            if self.hedge_enabled:
+                secondary = self._acquire([b for b in candidates if b is not primary], probe=False)
+
+            try:
+                if secondary is not None:
+                    return await self._hedged(primary, secondary, payload, tried)
+                tried.add(primary.name)
+                return await primary.generate(payload), primary.name
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Falha no backend de LLM, tentando o próximo: {e}")
+
+        if last_error is not None:
+            raise last_error
+
+        retry_after = min(
+            (b.breaker.retry_after for b in self.backends), default=settings.LLM_RETRY_AFTER_SECONDS
+        )
+        raise LLMUnavailableError(retry_after=retry_after)
+
+    def _acquire(self, candidates: List[LLMBackend], probe: bool = True) -> Optional[LLMBackend]:
+        """Primeiro backend cujo circuito permite a requisição"""
+        for backend in candidates:
+            if not probe and backend.breaker.state != "closed":
+                continue
+            if backend.breaker.allow_request():
+                return backend
+        return None
+
+    async def _hedged(
+        self,
+        primary: LLMBackend,
+        secondary: LLMBackend,
+        payload: dict,
+        tried: Set[str]
+    ) -> Tuple[dict, str]:
+        """Dispara o secundário se o primário não responder dentro do p95"""
+        tried.add(primary.name)
+        primary_task = asyncio.ensure_future(primary.generate(payload))
+        tasks = {primary_task: primary}
+        last_error: Optional[BaseException] = None
+
+        # Cancelamento do chamador (inclusive durante a espera do p95) cancela
+        # as gerações em andamento e libera os slots dos backends
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=primary.hedge_delay())
+            if done:
+                return primary_task.result(), primary.name
+
+            logger.info(f"Hedge: {primary.name} excedeu p95, disparando {secondary.name}")
+            tried.add(secondary.name)
+            tasks[asyncio.ensure_future(secondary.generate(payload))] = secondary
+            pending = set(tasks)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), tasks[task].name
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def status(self) -> List[dict]:
+        return [backend.status() for backend in self.backends]
+
+llm_router = LLMRouter(
+    backends=[
+        LLMBackend(name, url, settings.OLLAMA_MODEL)
+        for name, url in settings.llm_backends_list
+    ],
+    hedge_enabled=settings.LLM_HEDGE_ENABLED
+)
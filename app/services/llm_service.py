@@ -1,9 +1,37 @@
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from typing import List, Optional
 from app.schemas.search import SearchResult
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.concurrency import AdmissionController
+from app.core.exceptions import LLMUnavailableError, ServiceOverloadedError
+from app.core.metrics import LLM_REQUESTS_TOTAL, PIPELINE_STAGE_SECONDS, registry, stage_timer
+from app.services.llm_router import llm_router
 import httpx
 
+# Limite global de gerações simultâneas no LLM (compartilhado pelo worker)
+llm_admission = AdmissionController(
+    max_concurrent=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+    retry_after=settings.LLM_RETRY_AFTER_SECONDS
+)
+
+registry.register_collector(lambda: [
+    ("llm_generations_active", "Gerações em andamento no LLM", "gauge", [({}, llm_admission.active)]),
+    ("llm_generations_waiting", "Gerações aguardando vaga no LLM", "gauge", [({}, llm_admission.waiting)]),
+])
+
+@dataclass
+class LLMTurnResult:
+    """Resultado de um turno de conversa"""
+    answer: str
+    context: Optional[List[int]] = None  # Estado de tokens do Ollama para o próximo turno
+    prompt_tokens: Optional[int] = None  # Tokens processados no prefill deste turno
+    provider: Optional[str] = None  # Backend que respondeu
+
 class LLMService:
     """
     Service para integração com LLM
@@ -18,6 +46,7 @@ class LLMService:
 
     def __init__(self):
         self.provider = self._detect_provider()
+        self.provider_used: Optional[str] = None  # Backend que efetivamente respondeu
         logger.info(f"LLM Provider detectado: {self.provider}")
 
     def _detect_provider(self) -> str:
@@ -26,7 +55,7 @@ class LLMService:
             return "openai"
         elif settings.AZURE_OPENAI_API_KEY:
             return "azure"
-        elif settings.OLLAMA_BASE_URL:
+        elif settings.llm_backends_list:
             return "ollama"
         else:
             return "none"
@@ -43,17 +72,123 @@ class LLMService:
         if self.provider == "none":
             return self._fallback_answer(context_chunks)
 
-        # 🔧 OPÇÃO 1: OpenAI
-        if self.provider == "openai":
-            return await self._generate_with_openai(query, context_chunks)
+        # Admissão: lança ServiceOverloadedError (503) se o LLM estiver saturado
+        async with self._generation_slot():
+            # 🔧 OPÇÃO 1: OpenAI
+            if self.provider == "openai":
+                return await self._generate_with_openai(query, context_chunks)
+
+            # 🔧 OPÇÃO 2: Azure OpenAI
+            elif self.provider == "azure":
+                return await self._generate_with_azure(query, context_chunks)
+
+            # 🔧 OPÇÃO 3: Ollama (local)
+            elif self.provider == "ollama":
+                return await self._generate_with_ollama(query, context_chunks)
+
+    @asynccontextmanager
+    async def _generation_slot(self):
+        """Slot de admissão no LLM, medindo a espera na fila e a geração"""
+        start = time.perf_counter()
+        try:
+            async with llm_admission.slot():
+                PIPELINE_STAGE_SECONDS.observe(
+                    time.perf_counter() - start, pipeline="llm", stage="admission_wait"
+                )
+                with stage_timer("llm", "generation"):
+                    yield
+        except ServiceOverloadedError:
+            LLM_REQUESTS_TOTAL.inc(provider=self.provider, outcome="rejected")
+            raise
+
+    async def complete(self, prompt: str) -> str:
+        """
+        Gera texto a partir de um prompt pronto (ex: resumos)
+
+        Diferente de generate_answer, erros são propagados em vez de
+        convertidos em mensagem, para que o chamador não os trate como
+        resultado válido (ex: ao gravar em cache).
+        """
+        if self.provider != "ollama":
+            raise NotImplementedError(
+                "🔧 Geração de texto livre disponível apenas com backends Ollama"
+            )
+
+        async with self._generation_slot():
+            result = await self._ollama_request(prompt)
+        return result.get("response", "").strip()
+
+    @property
+    def supports_session_context(self) -> bool:
+        """Indica se o provider mantém estado de contexto entre turnos"""
+        return self.provider == "ollama"
+
+    async def generate_turn(
+        self,
+        query: str,
+        context_chunks: List[SearchResult],
+        llm_context: Optional[List[int]] = None
+    ) -> LLMTurnResult:
+        """
+        Gera resposta para um turno de conversa
+
+        Com Ollama, reutiliza o `context` do turno anterior e envia apenas o
+        novo turno (trechos novos + pergunta). Providers sem estado recebem o
+        prompt completo a cada turno.
+        """
+        if self.provider == "none":
+            return LLMTurnResult(answer=self._fallback_answer(context_chunks))
+
+        if not self.supports_session_context:
+            answer = await self.generate_answer(query, context_chunks)
+            return LLMTurnResult(answer=answer)
+
+        if llm_context:
+            prompt = self._build_followup_prompt(query, context_chunks)
+        else:
+            prompt = self._build_prompt(query, context_chunks)
+
+        async with self._generation_slot():
+            try:
+                result = await self._ollama_request(prompt, context=llm_context)
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                # Mantém o contexto anterior para não perder o estado da conversa
+                return LLMTurnResult(
+                    answer=self._ollama_error_message(e),
+                    context=llm_context
+                )
+
+        return LLMTurnResult(
+            answer=result.get("response", "Erro ao gerar resposta"),
+            context=result.get("context") or llm_context,
+            prompt_tokens=result.get("prompt_eval_count"),
+            provider=self.provider_used
+        )
 
-        # 🔧 OPÇÃO 2: Azure OpenAI
-        elif self.provider == "azure":
-            return await self._generate_with_azure(query, context_chunks)
+    def _build_followup_prompt(self, query: str, context_chunks: List[SearchResult]) -> str:
+        """Constrói prompt de continuação (apenas o novo turno)"""
+        if not context_chunks:
+            return f"""PERGUNTA DO USUÁRIO: {query}
 
-        # 🔧 OPÇÃO 3: Ollama (local)
-        elif self.provider == "ollama":
-            return await self._generate_with_ollama(query, context_chunks)
+Use os trechos de documentos já fornecidos nesta conversa.
+
+RESPOSTA:"""
+
+        context_text = "\n\n".join([
+            f"[Novo trecho {i+1} - Documento: {chunk.document_name}]\n{chunk.chunk_text}"
+            for i, chunk in enumerate(context_chunks)
+        ])
+
+        return f"""NOVOS TRECHOS DOS DOCUMENTOS:
+{context_text}
+
+PERGUNTA DO USUÁRIO: {query}
+
+Siga as mesmas instruções anteriores, considerando também os trechos já fornecidos nesta conversa.
+
+RESPOSTA:"""
 
     def _build_prompt(self, query: str, context_chunks: List[SearchResult]) -> str:
         """Constrói prompt com contexto"""
@@ -180,44 +315,68 @@ RESPOSTA:"""
         """Implementação com Ollama"""
         try:
             prompt = self._build_prompt(query, context_chunks)
+            result = await self._ollama_request(prompt)
+            answer = result.get("response", "Erro ao gerar resposta")
 
-            ollama_url = f"{settings.OLLAMA_BASE_URL}/api/generate"
-            logger.info(f"Tentando conectar ao Ollama em: {ollama_url}")
-            logger.info(f"Modelo: {settings.OLLAMA_MODEL}")
-            logger.debug(f"Prompt completo: {prompt[:500]}...")  # Log dos primeiros 500 chars
-
-            async with httpx.AsyncClient(timeout=120.0) as client:  # Aumentado timeout
-                response = await client.post(
-                    ollama_url,
-                    json={
-                        "model": settings.OLLAMA_MODEL,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,
-                            "top_p": 0.9,
-                            "top_k": 40
-                        }
-                    }
-                )
-                response.raise_for_status()
-                result = response.json()
-                answer = result.get("response", "Erro ao gerar resposta")
+            logger.info(f"Resposta recebida do Ollama: {answer[:200]}...")
+            return answer
+
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            return self._ollama_error_message(e)
 
-                logger.info(f"Resposta recebida do Ollama: {answer[:200]}...")
-                return answer
+    async def _ollama_request(
+        self,
+        prompt: str,
+        context: Optional[List[int]] = None
+    ) -> dict:
+        """
+        Chama /api/generate do Ollama e retorna o JSON da resposta
 
-        except httpx.ConnectError as e:
+        `context` é o estado de tokens devolvido pelo turno anterior; quando
+        informado, o Ollama continua a conversa sem reprocessar o histórico.
+        """
+        logger.debug(f"Prompt completo: {prompt[:500]}...")  # Log dos primeiros 500 chars
+
+        payload = {
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "top_k": 40
+            }
+        }
+        if context:
+            payload["context"] = context
+
+        # O roteador escolhe o backend (failover, circuit breaker e hedge)
+        try:
+            result, backend_name = await llm_router.generate(payload)
+        except LLMUnavailableError:
+            LLM_REQUESTS_TOTAL.inc(provider=self.provider, outcome="unavailable")
+            raise
+        except Exception:
+            LLM_REQUESTS_TOTAL.inc(provider=self.provider, outcome="error")
+            raise
+        LLM_REQUESTS_TOTAL.inc(provider=backend_name, outcome="ok")
+        self.provider_used = backend_name
+        logger.info(f"Resposta gerada pelo backend {backend_name} (modelo {settings.OLLAMA_MODEL})")
+        return result
+
+    def _ollama_error_message(self, e: Exception) -> str:
+        """Loga o erro do Ollama e retorna mensagem amigável"""
+        if isinstance(e, httpx.ConnectError):
             logger.error(f"Erro de conexao com Ollama: {e}")
-            logger.error(f"URL tentada: {settings.OLLAMA_BASE_URL}")
-            return f"❌ Erro de conexao com Ollama em {settings.OLLAMA_BASE_URL}: {str(e)}"
-        except httpx.HTTPError as e:
+            logger.error(f"Backends configurados: {[url for _, url in settings.llm_backends_list]}")
+            return f"❌ Erro de conexao com Ollama: {str(e)}"
+        if isinstance(e, httpx.HTTPError):
             logger.error(f"Erro HTTP ao chamar Ollama: {e}")
             return f"❌ Erro HTTP ao conectar com Ollama: {str(e)}"
-        except Exception as e:
-            logger.error(f"Erro inesperado no Ollama: {e}")
-            logger.exception("Stack trace completo:")
-            return f"❌ Erro inesperado: {str(e)}"
+        logger.error(f"Erro inesperado no Ollama: {e}")
+        logger.exception("Stack trace completo:")
+        return f"❌ Erro inesperado: {str(e)}"
 
     def _fallback_answer(self, context_chunks: List[SearchResult]) -> str:
         """Resposta fallback quando LLM não está configurado"""
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+from typing import AsyncIterator, List, Optional
+from app.db.database import AnySession
+from app.repositories.document_repository import AsyncDocumentRepository
+from app.repositories.vector_repository import AsyncVectorRepository
+from app.repositories.summary_cache_repository import AsyncSummaryCacheRepository
+from app.schemas.document import DocumentSummary
+from app.services.llm_service import LLMService
+from app.core.config import settings
+from app.core.exceptions import NotFoundError, ValidationError
+from app.core.logging import logger
+from app.core.metrics import CACHE_REQUESTS_TOTAL
+
+class SummaryService:
+    """
+    Service para resumo map-reduce de documentos
+
+    Responsabilidades:
+    - Ler os chunks do documento em ordem
+    - Resumir grupos de chunks em paralelo (map) com concorrência limitada
+    - Combinar resumos parciais recursivamente (reduce)
+    - Reaproveitar resumos intermediários pelo hash do conteúdo (uma
+      consulta ao cache antes de cada nível, uma gravação em lote depois)
+    """
+
+    def __init__(self, db: AnySession):
+        self.db = db
+        self.doc_repo = AsyncDocumentRepository(db)
+        self.vector_repo = AsyncVectorRepository(db)
+        self.cache_repo = AsyncSummaryCacheRepository(db)
+        self.llm_service = LLMService()
+
+    async def load_chunks(self, document_id: int, user_id: int) -> List[str]:
+        """Busca os chunks do documento com verificação de permissão"""
+        document = await self.doc_repo.get_by_id(document_id)
+
+        if not document or document.owner_id != user_id:
+            raise NotFoundError("Documento não encontrado")
+
+        chunks = await self.vector_repo.get_chunk_texts(document_id)
+        if not chunks:
+            raise ValidationError("Documento não possui trechos para resumir")
+
+        return chunks
+
+    async def summarize(
+        self,
+        document_id: int,
+        chunks: List[str],
+        group_size: Optional[int] = None,
+        reduce_fanout: Optional[int] = None
+    ) -> DocumentSummary:
+        """Executa o resumo completo e retorna apenas o resultado final"""
+        result = None
+        async for event in self.summarize_stream(document_id, chunks, group_size, reduce_fanout):
+            if event["event"] == "done":
+                result = DocumentSummary(**{k: v for k, v in event.items() if k != "event"})
+        return result
+
+    async def summarize_stream(
+        self,
+        document_id: int,
+        chunks: List[str],
+        group_size: Optional[int] = None,
+        reduce_fanout: Optional[int] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Executa o map-reduce emitindo eventos de progresso
+
+        Eventos:
+        - {"event": "stage", "stage": "map"|"reduce", "level", "total"}
+        - {"event": "progress", "level", "completed", "total", "cache_hits"}
+        - {"event": "done", ...DocumentSummary}
+        """
+        group_size = group_size or settings.SUMMARY_GROUP_SIZE
+        reduce_fanout = reduce_fanout or settings.SUMMARY_REDUCE_FANOUT
+        semaphore = asyncio.Semaphore(settings.SUMMARY_MAX_CONCURRENCY)
+        stats = {"llm_calls": 0, "cache_hits": 0}
+
+        texts = chunks
+        level = 0
+        while level == 0 or len(texts) > 1:
+            stage = "map" if level == 0 else "reduce"
+            size = group_size if level == 0 else reduce_fanout
+            groups = [texts[i:i + size] for i in range(0, len(texts), size)]
+
+            yield {"event": "stage", "stage": stage, "level": level, "total": len(groups)}
+
+            # Cache do nível inteiro numa consulta, antes das chamadas ao LLM
+            hashes = [self._content_hash(stage, group) for group in groups]
+            cached = await self.cache_repo.get_many(hashes)
+            results: List[Optional[str]] = [cached.get(content_hash) for content_hash in hashes]
+            hits = len(groups) - results.count(None)
+            stats["cache_hits"] += hits
+            CACHE_REQUESTS_TOTAL.inc(hits, cache="summary", result="hit")
+            CACHE_REQUESTS_TOTAL.inc(len(groups) - hits, cache="summary", result="miss")
+
+            tasks = {
+                asyncio.ensure_future(self._summarize_group(group, stage, semaphore, stats)): index
+                for index, group in enumerate(groups)
+                if results[index] is None
+            }
+            pending = set(tasks)
+            completed = hits
+            if hits:
+                yield {
+                    "event": "progress",
+                    "level": level,
+                    "completed": completed,
+                    "total": len(groups),
+                    "cache_hits": stats["cache_hits"]
+                }
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        results[tasks[task]] = task.result()
+                        completed += 1
+                    yield {
+                        "event": "progress",
+                        "level": level,
+                        "completed": completed,
+                        "total": len(groups),
+                        "cache_hits": stats["cache_hits"]
+                    }
+            finally:
+                for task in pending:
+                    task.cancel()
+
+            # Resumos novos do nível gravados num único commit
+            await self.cache_repo.save_many(
+                {hashes[index]: results[index] for index in tasks.values() if results[index]},
+                settings.OLLAMA_MODEL
+            )
+
+            texts = results
+            level += 1
+
+        logger.info(
+            f"Documento {document_id} resumido: {len(chunks)} chunks, {level} níveis, "
+            f"{stats['llm_calls']} chamadas ao LLM, {stats['cache_hits']} do cache"
+        )
+
+        yield {
+            "event": "done",
+            "document_id": document_id,
+            "summary": texts[0],
+            "chunk_count": len(chunks),
+            "levels": level,
+            "llm_calls": stats["llm_calls"],
+            "cache_hits": stats["cache_hits"]
+        }
+
+    async def _summarize_group(
+        self,
+        texts: List[str],
+        stage: str,
+        semaphore: asyncio.Semaphore,
+        stats: dict
+    ) -> str:
+        """Resume um grupo de textos com o LLM (o cache é consultado por nível)"""
+        if stage == "map":
+            prompt = self._build_map_prompt(texts)
+        else:
+            prompt = self._build_reduce_prompt(texts)
+
+        async with semaphore:
+            summary = await self.llm_service.complete(prompt)
+        stats["llm_calls"] += 1
+        return summary
+
+    @staticmethod
+    def _content_hash(stage: str, texts: List[str]) -> str:
+        """Hash do grupo: modelo + etapa + hash de cada trecho"""
+        digest = hashlib.sha256()
+        digest.update(f"{settings.OLLAMA_MODEL}\x1e{stage}\x1e".encode())
+        for text in texts:
+            digest.update(hashlib.sha256(text.encode()).digest())
+        return digest.hexdigest()
+
+    def _build_map_prompt(self, texts: List[str]) -> str:
+        """Prompt da fase map: resumo de trechos consecutivos"""
+        content = "\n\n".join(texts)
+        return f"""Você é um assistente que resume documentos jurídicos e técnicos.
+
+TRECHO DO DOCUMENTO:
+{content}
+
+INSTRUÇÕES:
+1. Resuma o trecho acima de forma objetiva
+2. Preserve nomes, datas, valores, prazos e obrigações
+3. Não invente informações que não estejam no trecho
+
+RESUMO:"""
+
+    def _build_reduce_prompt(self, summaries: List[str]) -> str:
+        """Prompt da fase reduce: combinação de resumos parciais"""
+        content = "\n\n".join(
+            f"[Resumo parcial {i+1}]\n{summary}"
+            for i, summary in enumerate(summaries)
+        )
+        return f"""Você é um assistente que resume documentos jurídicos e técnicos.
+
+RESUMOS PARCIAIS DE PARTES CONSECUTIVAS DO DOCUMENTO:
+{content}
+
+INSTRUÇÕES:
+1. Combine os resumos parciais em um único resumo coeso, na ordem do documento
+2. Elimine repetições e preserve nomes, datas, valores, prazos e obrigações
+3. Não invente informações que não estejam nos resumos
+
+RESUMO:"""
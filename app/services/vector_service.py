@@ -1,9 +1,140 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+import functools
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List
 from app.core.config import settings
-from app.repositories.vector_repository import VectorRepository
+from app.core.executors import run_in_executor, run_with_priority
+from app.core.logging import logger
+from app.core.metrics import EMBEDDINGS_TOTAL, registry, stage_timer
+from app.core.tracing import tracer
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.repositories.vector_repository import VectorRepository, AsyncVectorRepository
 from app.schemas.search import SearchResult
-import numpy as np
+from app.utils.text_chunker import TextChunker, TokenChunker
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+_models: Dict[str, "SentenceTransformer"] = {}
+_models_lock = threading.Lock()
+
+def get_embedding_model(model_name: str) -> "SentenceTransformer":
+    """
+    Carrega o modelo de embedding uma única vez por processo
+
+    sentence_transformers (e torch) só são importados aqui, no primeiro
+    uso: processos que não geram embeddings (auth, Alembic, setup_db.py)
+    não pagam esse custo.
+    """
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_name)
+            if model is None:
+                start = time.perf_counter()
+                from sentence_transformers import SentenceTransformer
+
+                model = SentenceTransformer(model_name)
+                _models[model_name] = model
+                logger.info(
+                    f"Modelo de embedding {model_name} carregado em "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms"
+                )
+    return model
+
+def embedding_model_loaded(model_name: str = None) -> bool:
+    return (model_name or settings.EMBEDDING_MODEL) in _models
+
+async def warm_up_embedding_model() -> None:
+    """Carrega o modelo em segundo plano (executor "embedding") no startup"""
+    try:
+        await run_in_executor("embedding", get_embedding_model, settings.EMBEDDING_MODEL)
+    except Exception as e:
+        logger.error(f"Falha ao pré-carregar modelo de embedding: {e}")
+
+_chunkers: Dict[str, Callable[[str], List[str]]] = {}
+
+def get_document_chunker() -> Callable[[str], List[str]]:
+    """
+    Função de chunking dos documentos (CHUNKING_STRATEGY)
+
+    "tokens" usa o tokenizer do modelo de embedding (carrega o modelo se
+    preciso) com limite de max_seq_length menos os tokens especiais
+    ([CLS]/[SEP]). Tokenizers sem offset mapping (não "fast") caem no
+    chunker por palavras, dimensionado para o mesmo limite.
+    """
+    chunker = _chunkers.get(settings.CHUNKING_STRATEGY)
+    if chunker is not None:
+        return chunker
+
+    if settings.CHUNKING_STRATEGY != "tokens":
+        chunker = TextChunker.chunk_text
+    else:
+        model = get_embedding_model(settings.EMBEDDING_MODEL)
+        hf_tokenizer = model.tokenizer
+        limit = model.max_seq_length - hf_tokenizer.num_special_tokens_to_add()
+        max_tokens = min(settings.CHUNK_MAX_TOKENS, limit) if settings.CHUNK_MAX_TOKENS > 0 else limit
+        if getattr(hf_tokenizer, "is_fast", False):
+            from tokenizers import Tokenizer
+
+            # Cópia própria: truncamento/padding do backend são estado compartilhado com o encode
+            tokenizer = Tokenizer.from_str(hf_tokenizer.backend_tokenizer.to_str())
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+            chunker = TokenChunker(tokenizer, max_tokens, settings.CHUNK_OVERLAP_TOKENS).chunk_text
+        else:
+            logger.warning(
+                f"Tokenizer de {settings.EMBEDDING_MODEL} sem offset mapping: usando chunks por palavras"
+            )
+            words = max(1, int(max_tokens * 0.75))  # ~1,3 token por palavra
+            overlap = min(words // 2, int(settings.CHUNK_OVERLAP_TOKENS * 0.75))
+            chunker = functools.partial(TextChunker.chunk_text, chunk_size=words, overlap=overlap)
+        logger.info(f"Chunking por tokens: até {max_tokens} tokens, overlap {settings.CHUNK_OVERLAP_TOKENS}")
+
+    _chunkers[settings.CHUNKING_STRATEGY] = chunker
+    return chunker
+
+def chunk_document(text: str) -> List[str]:
+    """Divide o texto de um documento em chunks (roda no executor "extraction")"""
+    return get_document_chunker()(text)
+
+_ingestion_batcher: "EmbeddingBatcher" = None
+
+def get_ingestion_batcher() -> EmbeddingBatcher:
+    """Agrupador (criado sob demanda) dos embeddings de todos os uploads do worker"""
+    global _ingestion_batcher
+    if _ingestion_batcher is None:
+        _ingestion_batcher = EmbeddingBatcher(
+            VectorService().generate_embeddings,
+            batch_size=settings.EMBEDDING_BULK_BATCH_SIZE,
+            max_wait_ms=settings.EMBEDDING_BULK_BATCH_WAIT_MS,
+            max_round_chunks=settings.EMBEDDING_BULK_MAX_ROUND_CHUNKS
+        )
+    return _ingestion_batcher
+
+def ingestion_batcher_status() -> dict:
+    if _ingestion_batcher is None:
+        return {"enabled": settings.EMBEDDING_BULK_BATCHING_ENABLED, "rounds": 0}
+    return {"enabled": settings.EMBEDDING_BULK_BATCHING_ENABLED, **_ingestion_batcher.status()}
+
+def _collect_batcher_metrics():
+    last_round = _ingestion_batcher.last_round if _ingestion_batcher is not None else {}
+    return [
+        (
+            "ingestion_embedding_chunks_per_second",
+            "Vazão de embeddings da ingestão na última rodada de lotes",
+            "gauge",
+            [({}, last_round["chunks_per_second"])] if last_round.get("chunks_per_second") is not None else []
+        ),
+        (
+            "ingestion_embedding_padding_efficiency",
+            "Fração útil (sem padding) dos lotes da última rodada",
+            "gauge",
+            [({}, last_round["padding_efficiency"])] if last_round.get("padding_efficiency") is not None else []
+        )
+    ]
+
+registry.register_collector(_collect_batcher_metrics)
 
 class VectorService:
     """
@@ -15,15 +146,40 @@ class VectorService:
     - Gerenciar modelo de embedding
     """
 
-    def __init__(self):
-        # Carregar modelo de embedding
-        self.model = SentenceTransformer(settings.EMBEDDING_MODEL)
+    @property
+    def model(self) -> "SentenceTransformer":
+        # Modelo compartilhado entre requisições, carregado no primeiro uso
+        return get_embedding_model(settings.EMBEDDING_MODEL)
 
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Gera embeddings para lista de textos"""
-        embeddings = self.model.encode(texts, show_progress_bar=False)
+        with tracer.span("embedding.encode", batch_size=len(texts)):
+            embeddings = self.model.encode(texts, show_progress_bar=False)
+        EMBEDDINGS_TOTAL.inc(len(texts))
         return embeddings.tolist()
 
+    async def agenerate_embeddings(self, texts: List[str], priority: str = "interactive") -> List[List[float]]:
+        """
+        Gera embeddings no executor "embedding", fora do event loop
+
+        priority="bulk" (ingestão) envia lotes de EMBEDDING_BULK_BATCH_SIZE
+        textos: entre um lote e outro as consultas ("interactive") passam
+        na frente. Com EMBEDDING_BULK_BATCHING_ENABLED os lotes juntam
+        trechos de todos os uploads pendentes, ordenados por tamanho.
+        """
+        if priority != "bulk":
+            return await run_with_priority("embedding", priority, self.generate_embeddings, texts)
+        if settings.EMBEDDING_BULK_BATCHING_ENABLED:
+            return await get_ingestion_batcher().embed(texts)
+
+        batch_size = max(1, settings.EMBEDDING_BULK_BATCH_SIZE)
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            embeddings.extend(await run_with_priority(
+                "embedding", "bulk", self.generate_embeddings, texts[start:start + batch_size]
+            ))
+        return embeddings
+
     def search(
         self,
         query: str,
@@ -36,17 +192,50 @@ class VectorService:
         Realiza busca semântica
         """
         # Gerar embedding da query
-        query_embedding = self.generate_embeddings([query])[0]
+        with stage_timer("search", "embedding"):
+            query_embedding = self.generate_embeddings([query])[0]
 
         # Buscar no banco
-        results = vector_repo.similarity_search(
-            query_embedding,
-            top_k=top_k,
-            document_ids=document_ids,
-            user_id=user_id
-        )
+        with stage_timer("search", "db_query"):
+            results = vector_repo.similarity_search(
+                query_embedding,
+                top_k=top_k,
+                document_ids=document_ids,
+                user_id=user_id
+            )
+
+        return self._to_search_results(results)
+
+    async def asearch(
+        self,
+        query: str,
+        vector_repo: AsyncVectorRepository,
+        top_k: int = 5,
+        document_ids: List[int] = None,
+        user_id: int = None
+    ) -> List[SearchResult]:
+        """
+        Busca semântica sem bloquear o event loop
+
+        O embedding roda no executor "embedding" e a consulta usa o
+        repositório assíncrono.
+        """
+        with stage_timer("search", "embedding"):
+            query_embedding = (await self.agenerate_embeddings([query]))[0]
+
+        with stage_timer("search", "db_query"):
+            results = await vector_repo.similarity_search(
+                query_embedding,
+                top_k=top_k,
+                document_ids=document_ids,
+                user_id=user_id
+            )
+
+        return self._to_search_results(results)
 
-        # Converter para SearchResult
+    @staticmethod
+    def _to_search_results(results: List[tuple]) -> List[SearchResult]:
+        """Converte (VectorStore, Document, similaridade) para SearchResult"""
         search_results = []
         for vector, document, similarity in results:
             search_results.append(SearchResult(
@@ -54,7 +243,8 @@ class VectorService:
                 document_name=document.original_filename,
                 chunk_text=vector.chunk_text,
                 similarity_score=float(similarity),
-                chunk_index=vector.chunk_index
+                chunk_index=vector.chunk_index,
+                chunk_id=vector.id
             ))
 
         return search_results
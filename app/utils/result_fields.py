@@ -0,0 +1,65 @@
+from typing import Iterable, List, Optional, Set
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+from app.schemas.search import SearchResult
+
+TEXT_FIELD = "chunk_text"
+
+
+class ResultFieldSelector:
+    """
+    Seleção de campos e truncamento de trechos nos resultados de busca
+
+    Responsabilidades:
+    - Validar `fields=` contra os campos de SearchResult
+    - Omitir o texto dos trechos (`include_text=false`)
+    - Truncar o texto em `snippet_chars` caracteres, no limite de palavra
+
+    Monta os dicts direto dos modelos, sem passar de novo pela validação
+    do response_model.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[str] = None,
+        include_text: bool = True,
+        snippet_chars: Optional[int] = None
+    ):
+        self.fields = self.parse_fields(fields)
+        if not include_text:
+            self.fields = (self.fields or set(SearchResult.model_fields)) - {TEXT_FIELD}
+        self.snippet_chars = settings.SEARCH_SNIPPET_CHARS if snippet_chars is None else snippet_chars
+
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+        """Converte "a,b,c" em conjunto; None ou vazio = todos os campos"""
+        if not fields:
+            return None
+        selected = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = selected - set(SearchResult.model_fields)
+        if unknown:
+            raise ValidationError(
+                f"Campos desconhecidos em fields: {', '.join(sorted(unknown))}. "
+                f"Disponíveis: {', '.join(SearchResult.model_fields)}"
+            )
+        return selected
+
+    @staticmethod
+    def truncate(text: str, max_chars: int) -> str:
+        """Corta no último espaço antes de max_chars e acrescenta reticências"""
+        if max_chars <= 0 or len(text) <= max_chars:
+            return text
+        cut = text.rfind(" ", 0, max_chars)
+        if cut < max_chars // 2:
+            cut = max_chars
+        return text[:cut].rstrip() + "…"
+
+    def serialize(self, results: Iterable[SearchResult]) -> List[dict]:
+        """Lista de dicts prontos para a resposta JSON"""
+        items = []
+        for result in results:
+            item = result.model_dump(include=self.fields)
+            if self.snippet_chars and TEXT_FIELD in item:
+                item[TEXT_FIELD] = self.truncate(item[TEXT_FIELD], self.snippet_chars)
+            items.append(item)
+        return items
@@ -1,4 +1,9 @@
-from typing import List
+import re
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Iterator, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from tokenizers import Tokenizer
 
 class TextChunker:
     """
@@ -38,3 +43,122 @@ class TextChunker:
             start = end - overlap
 
         return chunks
+
+
+_SENTENCE_END = re.compile(r"[.!?…][\"'”’)\]]*\s")
+_WHITESPACE = re.compile(r"\s")
+
+
+class TokenChunker:
+    """
+    Divide texto em chunks que cabem na janela do modelo de embedding
+
+    Responsabilidades:
+    - Limitar cada chunk a `max_tokens` tokens do tokenizer do modelo
+      (nada é truncado no encode)
+    - Preferir cortar em parágrafo, depois fim de frase, depois espaço
+    - Sobrepor `overlap_tokens` tokens entre chunks consecutivos,
+      começando no início de uma palavra
+    - Percorrer o texto uma única vez, em janelas de caracteres, sem montar
+      a lista de palavras do documento inteiro
+
+    `tokenizer` é um tokenizers.Tokenizer (backend "fast" do HF, com
+    offset mapping) sem truncamento nem padding.
+
+    Cada janela é tokenizada uma vez e rende vários chunks; só a sobra do
+    fim da janela é tokenizada de novo. Os cortes caem em espaços, onde a
+    tokenização de um trecho isolado coincide com a do texto corrido.
+    """
+
+    def __init__(
+        self,
+        tokenizer: "Tokenizer",
+        max_tokens: int,
+        overlap_tokens: int = 32,
+        window_chars: int = 16384
+    ):
+        if max_tokens < 2:
+            raise ValueError("max_tokens deve ser pelo menos 2")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        # Overlap até 1/4 do chunk: cada chunk avança ao menos min_tokens - overlap tokens
+        self.overlap_tokens = max(0, min(overlap_tokens, max_tokens // 4))
+        self.min_tokens = max_tokens // 2  # Não procura fronteira antes da metade do chunk
+        self.window_chars = max(window_chars, max_tokens * 32)
+
+    def chunk_text(self, text: str) -> List[str]:
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        length = len(text)
+        pos = 0
+        window_chars = self.window_chars
+        while pos < length:
+            end = min(length, pos + window_chars)
+            if end < length:
+                # A janela termina num espaço para não partir uma palavra
+                space = max(text.rfind(" ", pos, end), text.rfind("\n", pos, end))
+                if space > pos:
+                    end = space
+            window = text[pos:end]
+            offsets: Sequence[Tuple[int, int]] = self.tokenizer.encode(window, add_special_tokens=False).offsets
+            if not offsets:
+                pos = end
+                continue
+
+            at_end = end >= length
+            starts = [start for start, _ in offsets]
+            i = 0
+            while len(offsets) - i > self.max_tokens:
+                cut = self._cut(window, starts[i + self.min_tokens], starts[i + self.max_tokens])
+                chunk = window[starts[i]:cut].strip()
+                if chunk:
+                    yield chunk
+
+                following = bisect_left(starts, cut, lo=i + 1)
+                i = self._overlap_start(window, starts, i, following)
+
+            if at_end:
+                chunk = window[starts[i]:].strip()
+                if chunk:
+                    yield chunk
+                return
+
+            if i == 0:
+                # Janela sem tokens suficientes para um chunk (ex: muito espaço): amplia
+                window_chars *= 2
+                continue
+            window_chars = self.window_chars
+            pos += starts[i]
+
+    @staticmethod
+    def _cut(window: str, low: int, high: int) -> int:
+        """Posição de corte em [low, high]: parágrafo > frase > espaço > token"""
+        paragraph = window.rfind("\n\n", low, high)
+        if paragraph >= low:
+            return paragraph
+        sentence = None
+        for sentence in _SENTENCE_END.finditer(window, low, high):
+            pass
+        if sentence is not None:
+            return sentence.end() - 1
+        space = None
+        for space in _WHITESPACE.finditer(window, low, high):
+            pass
+        if space is not None:
+            return space.start()
+        return high
+
+    def _overlap_start(self, window: str, starts: List[int], current: int, following: int) -> int:
+        """
+        Token inicial do próximo chunk: até `overlap_tokens` antes do corte
+
+        Usa o primeiro início de palavra dentro da janela de overlap; sem
+        nenhum (texto sem espaços, comum em PDFs), começa exatamente
+        `overlap_tokens` antes do corte. Nunca recua além dessa janela.
+        """
+        lowest = max(current + 1, following - self.overlap_tokens)
+        for start in range(lowest, following):
+            if window[starts[start] - 1].isspace():
+                return start
+        return lowest
@@ -1,8 +1,8 @@
-import PyPDF2
-from docx import Document as DocxDocument
 from typing import Tuple
 import os
 
+# PyPDF2 e python-docx são importados no primeiro uso (startup mais rápido)
+
 class TextExtractor:
     """
     Extrai texto de documentos PDF e DOCX
@@ -19,6 +19,8 @@ class TextExtractor:
         Extrai texto de PDF
         Retorna: (texto_completo, número_de_páginas)
         """
+        import PyPDF2
+
         text_content = []
 
         with open(file_path, 'rb') as file:
@@ -39,6 +41,8 @@ class TextExtractor:
         Extrai texto de DOCX
         Retorna: (texto_completo, número_de_parágrafos)
         """
+        from docx import Document as DocxDocument
+
         doc = DocxDocument(file_path)
 
         paragraphs = []
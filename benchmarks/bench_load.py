@@ -0,0 +1,439 @@
+"""
+Teste de carga HTTP com tráfego misto (login, upload, busca e chat)
+
+Gerador em malha aberta: as chegadas seguem um processo de Poisson a
+--rate req/s, independente de quanto a API demora a responder, e cada
+chegada sorteia a operação pela proporção de --mix. A latência é medida a
+partir do instante agendado da chegada, então fila no cliente também conta
+(sem "coordinated omission"). Chegadas acima de --max-in-flight requisições
+em andamento são descartadas e contadas como "dropped".
+
+Antes da carga, cria --users usuários e sobe --corpus-docs documentos
+sintéticos (PDF/DOCX gerados, ver benchmarks/fixtures.py) para a busca e o
+chat terem o que encontrar.
+
+Com --fake-llm sobe scripts/fake_ollama.py com latência configurável; com
+--start-server sobe a API (uvicorn) já apontando para ele e com o throttle
+de login e o rate limit por usuário desligados. Sem --start-server, a API em
+--base-url precisa estar configurada com LLM_BACKENDS apontando para o fake,
+LOGIN_RATE_LIMIT_ENABLED=false e API_RATE_LIMIT_ENABLED=false: com os
+limites padrão o setup já recebe 429 no 4º upload de cada usuário e, na
+carga, os 429 dominam a taxa de erro.
+
+Relatório por operação: requisições, sucesso, erros por status, taxa de
+erro, throughput e latência p50/p95/p99/máx. --slo define limites (ms) e
+--max-error-rate a taxa máxima de erro; violações fazem o processo sair com
+código 1.
+
+Uso:
+    python benchmarks/bench_load.py --start-server --fake-llm --rate 20 --duration 60
+    python benchmarks/bench_load.py --start-server --fake-llm --mix search=6,chat=2,upload=1,login=1 \\
+        --slo search:p95=300,chat:p99=3000 --max-error-rate 0.01 --output load.json
+    python benchmarks/bench_load.py --base-url http://staging:8000 --rate 50 --duration 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import generate_text, write_docx, write_pdf  # noqa: E402
+
+OPERATIONS = ("login", "upload", "search", "chat")
+PASSWORD = "load-test-password"
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def parse_mix(spec: str) -> dict:
+    """"search=6,chat=2" -> {"search": 0.75, "chat": 0.25}"""
+    weights = {}
+    for entry in spec.split(","):
+        name, _, weight = entry.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"Operação desconhecida em --mix: {name} (use {', '.join(OPERATIONS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items() if weight > 0}
+
+
+def parse_slo(spec: str) -> list:
+    """"search:p95=300,chat:p99=3000" -> [("search", "p95", 300.0), ...]"""
+    slos = []
+    for entry in filter(None, (e.strip() for e in (spec or "").split(","))):
+        target, _, limit = entry.partition("=")
+        operation, _, stat = target.partition(":")
+        if operation not in OPERATIONS + ("all",) or stat not in ("p50", "p95", "p99", "max"):
+            raise SystemExit(f"SLO inválido: {entry} (formato operação:p95=ms)")
+        slos.append((operation, stat, float(limit)))
+    return slos
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_http(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Timeout esperando {url}")
+
+
+def start_fake_llm(args) -> tuple:
+    port = free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT, "scripts", "fake_ollama.py"),
+            "--port", str(port), "--latency", str(args.llm_latency),
+            "--jitter", str(args.llm_jitter), "--error-rate", str(args.llm_error_rate),
+        ],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    wait_http(f"{url}/api/tags", 10)
+    return proc, url
+
+
+def start_server(args, llm_url: str) -> tuple:
+    port = free_port()
+    env = dict(os.environ)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    # Os usuários do teste fazem login repetidamente do mesmo IP
+    env["LOGIN_RATE_LIMIT_ENABLED"] = "false"
+    # Poucos usuários gerando muita carga: o rate limit por usuário mediria só os 429
+    env["API_RATE_LIMIT_ENABLED"] = "false"
+    if llm_url:
+        env["LLM_BACKENDS"] = f"fake={llm_url}"
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    wait_http(f"{url}/health", args.startup_timeout)
+    return proc, url
+
+
+def build_corpus_files(directory: str) -> list:
+    """Arquivos pequenos usados no corpus inicial e nos uploads da carga"""
+    files = []
+    for i, words in enumerate((800, 1500, 3000)):
+        text = generate_text(words, seed=i)
+        for file_type, writer, mime in (
+            ("pdf", write_pdf, "application/pdf"),
+            ("docx", write_docx, "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        ):
+            path = os.path.join(directory, f"load-{words}.{file_type}")
+            writer(path, text)
+            with open(path, "rb") as f:
+                files.append((os.path.basename(path), f.read(), mime))
+    return files
+
+
+class LoadTest:
+    """
+    Gerador de carga em malha aberta
+
+    Responsabilidades:
+    - Preparar usuários, tokens e corpus
+    - Agendar chegadas (Poisson) e sortear a operação de cada uma
+    - Registrar latência, status e descartes por operação
+    """
+
+    def __init__(self, client: httpx.AsyncClient, args, mix: dict, files: list):
+        self.client = client
+        self.args = args
+        self.mix = mix
+        self.files = files
+        self.rng = random.Random(args.seed)
+        self.words = generate_text(400, seed=99).split()
+        self.users: list = []  # (username, token)
+        self.latencies = {op: [] for op in OPERATIONS}
+        self.statuses = {op: Counter() for op in OPERATIONS}
+        self.dropped = Counter()
+        self.in_flight = 0
+
+    async def setup(self) -> dict:
+        start = time.perf_counter()
+        run_id = uuid.uuid4().hex[:8]
+        for i in range(self.args.users):
+            username = f"load-{run_id}-{i}"
+            response = await self.client.post("/api/v1/auth/register", json={
+                "email": f"{username}@example.com", "username": username, "password": PASSWORD
+            })
+            response.raise_for_status()
+            self.users.append((username, await self._login(username)))
+
+        semaphore = asyncio.Semaphore(4)
+
+        async def upload_one(i: int):
+            async with semaphore:
+                _, token = self.users[i % len(self.users)]
+                response = await self.client.post(
+                    "/api/v1/documents/upload",
+                    files={"file": self.files[i % len(self.files)]},
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+                response.raise_for_status()
+
+        await asyncio.gather(*(upload_one(i) for i in range(self.args.corpus_docs)))
+        return {
+            "users": len(self.users),
+            "corpus_documents": self.args.corpus_docs,
+            "setup_seconds": round(time.perf_counter() - start, 2),
+        }
+
+    async def _login(self, username: str) -> str:
+        response = await self.client.post(
+            "/api/v1/auth/login", data={"username": username, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    def _query(self) -> str:
+        return " ".join(self.rng.sample(self.words, self.rng.randint(3, 10)))
+
+    async def _send(self, operation: str) -> httpx.Response:
+        username, token = self.rng.choice(self.users)
+        headers = {"Authorization": f"Bearer {token}"}
+        if operation == "login":
+            return await self.client.post(
+                "/api/v1/auth/login", data={"username": username, "password": PASSWORD}
+            )
+        if operation == "upload":
+            return await self.client.post(
+                "/api/v1/documents/upload", files={"file": self.rng.choice(self.files)}, headers=headers
+            )
+        if operation == "search":
+            return await self.client.post(
+                "/api/v1/search/", json={"query": self._query(), "top_k": 5}, headers=headers
+            )
+        return await self.client.post(
+            "/api/v1/chat/", json={"query": self._query(), "max_context_chunks": 3}, headers=headers
+        )
+
+    async def _request(self, operation: str, scheduled: float) -> None:
+        self.in_flight += 1
+        try:
+            response = await self._send(operation)
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        self.statuses[operation][status] += 1
+        if status.startswith("2"):
+            self.latencies[operation].append(time.perf_counter() - scheduled)
+
+    async def run(self) -> float:
+        operations, weights = zip(*self.mix.items())
+        tasks = set()
+        start = time.perf_counter()
+        offset = 0.0
+        while True:
+            offset += self.rng.expovariate(self.args.rate)
+            if offset >= self.args.duration:
+                break
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            operation = self.rng.choices(operations, weights)[0]
+            if self.in_flight >= self.args.max_in_flight:
+                self.dropped[operation] += 1
+                continue
+            task = asyncio.create_task(self._request(operation, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.args.drain_timeout)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> dict:
+        per_operation = {}
+        all_latencies = []
+        totals = Counter()
+        for operation in OPERATIONS:
+            statuses = self.statuses[operation]
+            sent = sum(statuses.values())
+            if not sent and not self.dropped[operation]:
+                continue
+            ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+            latencies = self.latencies[operation]
+            all_latencies.extend(latencies)
+            totals.update(sent=sent, ok=ok, dropped=self.dropped[operation])
+            per_operation[operation] = {
+                "requests": sent,
+                "ok": ok,
+                "dropped": self.dropped[operation],
+                "statuses": dict(statuses),
+                "error_rate": round((sent - ok) / sent, 4) if sent else 0.0,
+                "throughput_rps": round(ok / elapsed, 2),
+                **latency_stats(latencies),
+            }
+        per_operation["all"] = {
+            "requests": totals["sent"],
+            "ok": totals["ok"],
+            "dropped": totals["dropped"],
+            "statuses": dict(sum(self.statuses.values(), Counter())),
+            "error_rate": round((totals["sent"] - totals["ok"]) / totals["sent"], 4) if totals["sent"] else 0.0,
+            "throughput_rps": round(totals["ok"] / elapsed, 2),
+            **latency_stats(all_latencies),
+        }
+        return per_operation
+
+
+def latency_stats(latencies: list) -> dict:
+    ms = [v * 1000 for v in latencies]
+    return {
+        "p50_ms": round(statistics.median(ms), 1) if ms else None,
+        "p95_ms": round(percentile(ms, 0.95), 1) if ms else None,
+        "p99_ms": round(percentile(ms, 0.99), 1) if ms else None,
+        "max_ms": round(max(ms), 1) if ms else None,
+    }
+
+
+def check_slos(report: dict, slos: list, max_error_rate) -> list:
+    violations = []
+    for operation, stat, limit in slos:
+        value = report.get(operation, {}).get(f"{stat}_ms")
+        if value is not None and value > limit:
+            violations.append(f"{operation} {stat} = {value} ms > {limit} ms")
+    if max_error_rate is not None:
+        for operation, stats in report.items():
+            if stats["error_rate"] > max_error_rate:
+                violations.append(f"{operation} taxa de erro = {stats['error_rate']:.2%} > {max_error_rate:.2%}")
+    return violations
+
+
+def print_report(report: dict, elapsed: float) -> None:
+    print(f"Duração: {elapsed:.1f}s")
+    print(
+        f"{'operação':<10}{'req':>7}{'ok':>7}{'drop':>6}{'erro %':>8}{'req/s':>8}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}  status"
+    )
+    print("-" * 100)
+    for operation, s in report.items():
+        statuses = " ".join(f"{k}:{v}" for k, v in sorted(s["statuses"].items()))
+        print(
+            f"{operation:<10}{s['requests']:>7}{s['ok']:>7}{s['dropped']:>6}"
+            f"{s['error_rate'] * 100:>8.2f}{s['throughput_rps']:>8}"
+            f"{s['p50_ms'] or '-':>9}{s['p95_ms'] or '-':>9}{s['p99_ms'] or '-':>9}{s['max_ms'] or '-':>9}  {statuses}"
+        )
+
+
+async def run(args, base_url: str) -> dict:
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as directory:
+        files = build_corpus_files(directory)
+    limits = httpx.Limits(max_connections=args.max_in_flight + 8, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        load = LoadTest(client, args, mix, files)
+        setup = await load.setup()
+        print(f"Setup: {setup['users']} usuários, {setup['corpus_documents']} documentos em {setup['setup_seconds']}s")
+        elapsed = await load.run()
+    return {
+        "setup": setup,
+        "elapsed_seconds": round(elapsed, 2),
+        "report": load.report(elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com tráfego misto")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--start-server", action="store_true", help="Sobe a API (uvicorn) para o teste")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn com --start-server")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--fake-llm", action="store_true", help="Sobe scripts/fake_ollama.py")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Latência do LLM falso (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.3)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=10.0, help="Chegadas por segundo (Poisson)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Duração da fase de carga (s)")
+    parser.add_argument("--mix", default="search=6,chat=2,upload=1,login=1", help="Proporção das operações")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Acima disso, chegadas são descartadas")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--corpus-docs", type=int, default=20, help="Documentos enviados antes da carga")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout por requisição (s)")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="Espera pelas requisições em andamento")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--slo", help="Limites em ms, ex: search:p95=300,chat:p99=3000,all:p99=5000")
+    parser.add_argument("--max-error-rate", type=float, help="Taxa máxima de erro por operação (ex: 0.01)")
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    args = parser.parse_args()
+    slos = parse_slo(args.slo)
+
+    processes = []
+    try:
+        llm_url = None
+        if args.fake_llm:
+            proc, llm_url = start_fake_llm(args)
+            processes.append(proc)
+            if not args.start_server:
+                print(f"LLM falso em {llm_url}; a API precisa de LLM_BACKENDS=fake={llm_url}")
+        base_url = args.base_url
+        if args.start_server:
+            proc, base_url = start_server(args, llm_url)
+            processes.append(proc)
+
+        results = asyncio.run(run(args, base_url))
+    finally:
+        for proc in reversed(processes):
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    print_report(results["report"], results["elapsed_seconds"])
+    violations = check_slos(results["report"], slos, args.max_error_rate)
+    for violation in violations:
+        print(f"SLO violado: {violation}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "benchmark": "load",
+                "config": {
+                    "rate": args.rate, "duration": args.duration, "mix": parse_mix(args.mix),
+                    "workers": args.workers if args.start_server else None,
+                    "llm_latency": args.llm_latency if args.fake_llm else None,
+                },
+                **results,
+                "slo_violations": violations,
+            }, f, indent=2)
+
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Fixtures geradas para os benchmarks: texto, PDF e DOCX de vários tamanhos
+
+O texto é pseudoaleatório com semente fixa (mesmas palavras a cada
+execução) e só usa ASCII, para o PDF funcionar com a fonte padrão
+Helvetica sem embutir fontes. Os arquivos ficam em cache no diretório
+indicado e só são regerados se faltarem.
+"""
+import os
+import random
+from typing import Dict
+
+# Palavras por documento; ~500 palavras por página no PDF
+SIZES: Dict[str, int] = {
+    "small": 2_000,
+    "medium": 20_000,
+    "large": 100_000,
+}
+WORDS_PER_PAGE = 500
+WORDS_PER_LINE = 12
+WORDS_PER_PARAGRAPH = 80
+
+_VOCABULARY = (
+    "documento contrato clausula prazo pagamento servico cliente fornecedor "
+    "relatorio analise resultado receita custo projeto entrega equipe "
+    "sistema dados processo qualidade requisito politica seguranca acesso "
+    "usuario registro auditoria controle risco mercado produto venda compra "
+    "estoque logistica transporte nota fiscal imposto tributo garantia "
+    "responsabilidade rescisao multa reajuste indice vigencia assinatura "
+    "parte objeto valor total mensal anual trimestre meta indicador "
+    "desempenho operacao capacidade demanda previsao orcamento investimento"
+).split()
+
+
+def generate_text(words: int, seed: int = 42) -> str:
+    """Texto com `words` palavras, em frases de 8 a 20 palavras"""
+    rng = random.Random(seed + words)
+    out = []
+    count = 0
+    while count < words:
+        length = min(rng.randint(8, 20), words - count)
+        sentence = [rng.choice(_VOCABULARY) for _ in range(length)]
+        sentence[0] = sentence[0].capitalize()
+        out.append(" ".join(sentence) + ".")
+        count += length
+    return " ".join(out)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, text: str) -> int:
+    """
+    Escreve um PDF mínimo (uma página a cada WORDS_PER_PAGE palavras)
+
+    Retorna o número de páginas.
+    """
+    words = text.split()
+    pages = [words[i:i + WORDS_PER_PAGE] for i in range(0, len(words), WORDS_PER_PAGE)] or [[]]
+
+    # 1: catálogo, 2: árvore de páginas, 3: fonte; depois (página, conteúdo) por página
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_words in pages:
+        lines = [
+            " ".join(page_words[i:i + WORDS_PER_LINE])
+            for i in range(0, len(page_words), WORDS_PER_LINE)
+        ]
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td\n" + "".join(
+            f"({_pdf_escape(line)}) '\n" for line in lines
+        ) + "ET"
+        stream_bytes = stream.encode("latin-1")
+        page_id = len(objects) + 1
+        page_ids.append(page_id)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream_bytes)} >>\nstream\n".encode() + stream_bytes + b"\nendstream"
+        )
+
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        data += f"{offset:010d} 00000 n \n".encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(page_ids)
+
+
+def write_docx(path: str, text: str) -> int:
+    """Escreve um DOCX com um parágrafo a cada WORDS_PER_PARAGRAPH palavras"""
+    from docx import Document as DocxDocument
+
+    words = text.split()
+    doc = DocxDocument()
+    paragraphs = 0
+    for i in range(0, len(words), WORDS_PER_PARAGRAPH):
+        doc.add_paragraph(" ".join(words[i:i + WORDS_PER_PARAGRAPH]))
+        paragraphs += 1
+    doc.save(path)
+    return paragraphs
+
+
+def ensure_fixtures(directory: str) -> Dict[str, Dict[str, str]]:
+    """
+    Gera (se necessário) os arquivos de cada tamanho
+
+    Retorna {tamanho: {"pdf": caminho, "docx": caminho}}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for size, words in SIZES.items():
+        text = None
+        paths[size] = {}
+        for file_type, writer in (("pdf", write_pdf), ("docx", write_docx)):
+            path = os.path.join(directory, f"{size}.{file_type}")
+            if not os.path.exists(path):
+                text = text or generate_text(words)
+                writer(path, text)
+            paths[size][file_type] = path
+    return paths
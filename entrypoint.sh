@@ -58,4 +58,14 @@ echo "==================================="
 echo ""
 
 # Iniciar a aplicação
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+# SERVER_MODE=production: gunicorn com WEB_CONCURRENCY workers uvicorn (gunicorn.conf.py)
+# SERVER_MODE=development: um processo uvicorn com --reload
+SERVER_MODE=${SERVER_MODE:-production}
+
+if [ "$SERVER_MODE" = "development" ]; then
+    echo "Development mode: uvicorn --reload"
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+fi
+
+echo "Production mode: gunicorn with ${WEB_CONCURRENCY:-1} worker(s)"
+exec gunicorn -c gunicorn.conf.py app.main:app
@@ -0,0 +1,60 @@
+"""
+Configuração do gunicorn para produção (workers uvicorn)
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- O master importa a aplicação e carrega o modelo de embedding antes do
+  fork (preload_app): os workers compartilham essas páginas copy-on-write.
+- Threads de torch/BLAS são limitadas por worker (núcleos / workers).
+- Reload gracioso: `kill -HUP <master>` recria os workers (com preload, o
+  código não é relido); para publicar código novo use `kill -USR2 <master>`
+  (novo master) e depois `kill -QUIT <master antigo>`.
+"""
+import os
+from app.core.config import settings
+from app.core.worker import set_thread_env, threads_per_worker
+
+workers = settings.WEB_CONCURRENCY
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("BIND", "0.0.0.0:8000")
+preload_app = True
+timeout = settings.WORKER_TIMEOUT_SECONDS
+graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT_SECONDS
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+accesslog = None  # O logging_middleware já registra cada requisição
+
+_threads = threads_per_worker(workers)
+
+# Antes do preload: numpy/torch leem estas variáveis ao serem importados
+set_thread_env(_threads)
+
+
+def when_ready(server):
+    """Master pronto, antes de criar os workers"""
+    from app.core.logging import logger
+    from app.core.worker import memory_usage, preload_heavy_modules
+
+    preload_ms = preload_heavy_modules()
+    logger.info(
+        f"Master {os.getpid()}: modelo e dependências pré-carregados em {preload_ms:.0f} ms; "
+        f"{workers} worker(s) com {_threads} thread(s) torch/BLAS",
+        extra={"preload_ms": round(preload_ms, 1), **memory_usage()}
+    )
+
+
+def post_fork(server, worker):
+    """Roda no worker recém-criado"""
+    from app.core.worker import configure_torch_threads, mark_worker_forked
+    from app.db.database import async_engine, engine
+    from app.db.replicas import replica_router
+
+    mark_worker_forked()
+    configure_torch_threads(_threads)
+
+    # Conexões abertas no master não podem ser usadas por dois processos
+    engines = [engine] + [replica.engine for replica in replica_router.replicas]
+    async_engines = [async_engine] + [replica.async_engine for replica in replica_router.replicas]
+    engines += [e.sync_engine for e in async_engines if e is not None]
+    for e in engines:
+        e.dispose(close=False)
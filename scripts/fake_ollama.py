@@ -0,0 +1,92 @@
+"""
+Servidor Ollama falso para testes locais do roteador de LLM
+
+Implementa apenas POST /api/generate (stream=false) e GET /api/tags, com
+latência e taxa de erro configuráveis. Útil para testar failover, circuit
+breaker e hedge sem um modelo real.
+
+Uso:
+    python scripts/fake_ollama.py --port 11500 --latency 0.2 --jitter 0.1
+    python scripts/fake_ollama.py --port 11501 --latency 5 --error-rate 0.5
+
+    LLM_BACKENDS=rapido=http://localhost:11500,lento=http://localhost:11501
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def build_handler(args):
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": [{"name": args.model}]})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/api/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            time.sleep(max(0.0, args.latency + random.uniform(-args.jitter, args.jitter)))
+
+            if random.random() < args.error_rate:
+                self._send_json(500, {"error": "falha simulada"})
+                return
+
+            prompt = request.get("prompt", "")
+            context = request.get("context") or []
+            # Tokens aproximados por palavras; o contexto cresce a cada turno
+            prompt_tokens = len(prompt.split())
+            self._send_json(200, {
+                "model": request.get("model", args.model),
+                "response": f"[{args.name}] Resposta simulada para: {prompt[-120:]}",
+                "done": True,
+                "context": context + list(range(prompt_tokens)),
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": 32,
+            })
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+    return FakeOllamaHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Ollama falso")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--name", default="fake", help="Identificação nas respostas")
+    parser.add_argument("--model", default="fake-model")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência base (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variação da latência (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 500")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), build_handler(args))
+    print(f"Fake Ollama '{args.name}' em http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
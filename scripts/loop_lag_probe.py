@@ -0,0 +1,84 @@
+"""
+Mede o atraso do event loop da API sob carga
+
+Dispara requisições concorrentes contra um endpoint (login, busca ou
+upload) e, ao mesmo tempo, mede a latência de GET /health, que não faz
+trabalho algum: se o loop estiver bloqueado, /health fica lento. Ao final
+imprime a latência de /health e as estatísticas do monitor interno
+(event_loop_lag).
+
+Uso:
+    python scripts/loop_lag_probe.py --scenario login --concurrency 20 --duration 15
+    python scripts/loop_lag_probe.py --scenario search --token SEU_TOKEN
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+async def load_worker(client: httpx.AsyncClient, args, deadline: float, counters: dict):
+    while time.perf_counter() < deadline:
+        try:
+            if args.scenario == "login":
+                response = await client.post(
+                    "/api/v1/auth/login",
+                    data={"username": args.username, "password": args.password}
+                )
+            else:
+                response = await client.post(
+                    "/api/v1/search/",
+                    json={"query": "prazo de vigência do contrato", "top_k": 5},
+                    headers={"Authorization": f"Bearer {args.token}"}
+                )
+            counters["ok" if response.status_code < 400 else "errors"] += 1
+        except httpx.HTTPError:
+            counters["errors"] += 1
+
+
+async def health_probe(client: httpx.AsyncClient, deadline: float, latencies: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Atraso do event loop sob carga")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=["login", "search"], default="login")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--token", default="")
+    args = parser.parse_args()
+
+    counters = {"ok": 0, "errors": 0}
+    latencies: list = []
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            health_probe(client, deadline, latencies),
+            *[load_worker(client, args, deadline, counters) for _ in range(args.concurrency)]
+        )
+        health = (await client.get("/health")).json()
+
+    latencies.sort()
+    print(f"Cenário: {args.scenario}, concorrência {args.concurrency}, {args.duration:.0f}s")
+    print(f"Requisições: {counters['ok']} ok, {counters['errors']} erros")
+    if latencies:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"/health: p50={statistics.median(latencies):.1f} ms "
+            f"p99={p99:.1f} ms max={latencies[-1]:.1f} ms"
+        )
+    print(f"Monitor interno (event_loop_lag): {health.get('event_loop_lag')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Executado pelo initdb do container primário: libera conexões de replicação
+# para a réplica de docker-compose.replica.yml (apenas desenvolvimento).
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,97 @@
+"""
+Waterfall das requisições mais lentas a partir dos spans em JSONL
+
+Lê o arquivo do exportador JSONL (TRACING_JSONL_PATH), agrupa os spans por
+trace e imprime, para os N traces mais lentos, a árvore de spans com o
+deslocamento e a duração de cada um em relação ao início do trace.
+
+Uso:
+    python scripts/trace_waterfall.py traces/spans.jsonl --top 5
+    python scripts/trace_waterfall.py traces/spans.jsonl --trace-id <id>
+    python scripts/trace_waterfall.py traces/spans.jsonl --route "/api/v1/search/"
+"""
+import argparse
+import json
+from collections import defaultdict
+
+BAR_WIDTH = 40
+
+
+def load_traces(path: str) -> dict:
+    traces = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def trace_root(spans: list) -> dict:
+    """Span sem pai dentro do trace (o pai pode ser de outro serviço)"""
+    ids = {span["span_id"] for span in spans}
+    roots = [span for span in spans if span["parent_id"] not in ids]
+    return min(roots, key=lambda span: span["start_ns"])
+
+
+def print_waterfall(spans: list) -> None:
+    root = trace_root(spans)
+    children = defaultdict(list)
+    for span in spans:
+        children[span["parent_id"]].append(span)
+
+    start = min(span["start_ns"] for span in spans)
+    total = max(span["end_ns"] for span in spans) - start or 1
+    attrs = root["attributes"]
+    print(
+        f"\ntrace {root['trace_id']}  {root['name']}  {root['duration_ms']:.1f} ms"
+        f"  status={attrs.get('http.status_code', root['status'])}  request_id={attrs.get('request_id')}"
+    )
+
+    def walk(span: dict, depth: int) -> None:
+        offset = (span["start_ns"] - start) / total
+        width = max(1, round((span["end_ns"] - span["start_ns"]) / total * BAR_WIDTH))
+        bar = " " * round(offset * BAR_WIDTH) + "█" * width
+        error = " !" if span["status"] == "error" else ""
+        label = ("  " * depth + span["name"])[:48]
+        print(
+            f"  {label:<48} {(span['start_ns'] - start) / 1e6:>9.1f} "
+            f"{span['duration_ms']:>9.1f} ms  |{bar:<{BAR_WIDTH}}|{error}"
+        )
+        for child in sorted(children[span["span_id"]], key=lambda s: s["start_ns"]):
+            walk(child, depth + 1)
+
+    print(f"  {'span':<48} {'início':>9} {'duração':>12}")
+    walk(root, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Waterfall dos traces mais lentos")
+    parser.add_argument("path", help="Arquivo JSONL de spans")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--trace-id", help="Mostra apenas este trace")
+    parser.add_argument("--route", help="Filtra pelo template da rota (http.route)")
+    args = parser.parse_args()
+
+    traces = load_traces(args.path)
+    if args.trace_id:
+        selected = [traces[args.trace_id]] if args.trace_id in traces else []
+    else:
+        candidates = []
+        for spans in traces.values():
+            root = trace_root(spans)
+            if args.route and root["attributes"].get("http.route") != args.route:
+                continue
+            candidates.append((root["duration_ms"], spans))
+        candidates.sort(key=lambda item: -item[0])
+        selected = [spans for _, spans in candidates[:args.top]]
+
+    if not selected:
+        print("Nenhum trace encontrado")
+    for spans in selected:
+        print_waterfall(spans)
+
+
+if __name__ == "__main__":
+    main()
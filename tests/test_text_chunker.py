@@ -0,0 +1,99 @@
+import re
+
+import pytest
+
+from app.utils.text_chunker import TextChunker, TokenChunker
+
+
+class _Encoding:
+    def __init__(self, offsets):
+        self.offsets = offsets
+
+
+class PieceTokenizer:
+    """Tokenizer com offsets: palavras em pedaços de até 4 caracteres, pontuação separada"""
+
+    def encode(self, sequence, add_special_tokens=False):
+        offsets = []
+        for match in re.finditer(r"\w+|[^\w\s]", sequence):
+            start, end = match.span()
+            while start < end:
+                offsets.append((start, min(end, start + 4)))
+                start += 4
+        return _Encoding(offsets)
+
+
+def token_count(text):
+    return len(PieceTokenizer().encode(text).offsets)
+
+
+def sample_text(sentences=400):
+    words = ["contrato", "cláusula", "prazo", "multa", "rescisão", "pagamento", "fornecedor", "garantia"]
+    out = []
+    for i in range(sentences):
+        out.append(" ".join(words[(i + j) % len(words)] for j in range(5 + i % 9)).capitalize() + ".")
+        if i % 7 == 6:
+            out.append("\n\n")
+    return " ".join(out)
+
+
+@pytest.mark.parametrize("max_tokens,overlap", [(254, 32), (64, 0), (40, 10)])
+def test_chunks_fit_max_tokens(max_tokens, overlap):
+    chunks = TokenChunker(PieceTokenizer(), max_tokens, overlap, window_chars=2000).chunk_text(sample_text())
+
+    assert chunks
+    assert max(token_count(chunk) for chunk in chunks) <= max_tokens
+
+
+def test_without_overlap_chunks_cover_text_exactly():
+    text = sample_text()
+    chunks = TokenChunker(PieceTokenizer(), 50, 0, window_chars=500).chunk_text(text)
+
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_prefers_sentence_boundaries():
+    chunks = TokenChunker(PieceTokenizer(), 100, 0).chunk_text(sample_text())
+
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_progress_on_whitespace_free_input():
+    # Texto sem espaços (comum em PDFs): uma única "palavra" de ~5.000 tokens
+    text = "".join(f"{i:06d}" for i in range(3638))
+    max_tokens, overlap = 254, 32
+    chunks = TokenChunker(PieceTokenizer(), max_tokens, overlap).chunk_text(text)
+
+    starts = [text.index(chunk) for chunk in chunks]
+    for previous, current in zip(starts, starts[1:]):
+        assert token_count(text[previous:current]) >= max_tokens - overlap
+    assert len(chunks) <= token_count(text) // (max_tokens - overlap) + 1
+    assert max(token_count(chunk) for chunk in chunks) <= max_tokens
+
+
+def test_long_runs_without_spaces_do_not_multiply_chunks():
+    text = " ".join(f"{i}" * (3000 // len(str(i))) for i in range(1, 6))
+    max_tokens, overlap = 254, 32
+    chunks = TokenChunker(PieceTokenizer(), max_tokens, overlap).chunk_text(text)
+
+    # Sem espaço no alcance o chunk ainda avança ao menos metade do limite menos o overlap
+    assert len(chunks) <= token_count(text) // (max_tokens // 2 - overlap) + 1
+
+
+def test_overlap_starts_on_word_within_window():
+    chunks = TokenChunker(PieceTokenizer(), 40, 10).chunk_text(sample_text(60))
+
+    for previous, current in zip(chunks, chunks[1:]):
+        first_word = current.split()[0]
+        assert first_word in previous.split()
+
+
+def test_empty_and_blank_text():
+    chunker = TokenChunker(PieceTokenizer(), 50, 10)
+
+    assert chunker.chunk_text("") == []
+    assert chunker.chunk_text("   \n\n  ") == []
+
+
+def test_word_chunker_still_available():
+    assert len(TextChunker.chunk_text("palavra " * 1000)) == 3